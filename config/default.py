@@ -44,6 +44,12 @@ ASSETS_LOAD_DIR = os.path.join(base, 'skylines', 'frontend', 'static')
 ASSETS_LOAD_URL = '/'
 
 SKYLINES_FILES_PATH = os.path.join(base, 'htdocs', 'files')
+
+# store new IGC files compressed ('gzip' or None)
+SKYLINES_FILES_COMPRESSION = None
+
+# maximum size in bytes of the decompressed copies of compressed files
+SKYLINES_FILES_CACHE_SIZE = 512 * 1024 * 1024
 SKYLINES_ELEVATION_PATH = os.path.join(base, 'htdocs', 'srtm')
 
 SKYLINES_TEMPORARY_DIR = '/tmp'
@@ -55,6 +61,11 @@ SKYLINES_LISTS_DISPLAY_LENGTH = 50
 # this shall not be smaller than the display_lenght setting
 SKYLINES_LISTS_SERVER_SIDE = 250
 
+# count the entries of lists exactly only up to ... entries, the size of
+# larger lists is estimated and cached for ... seconds
+SKYLINES_LISTS_EXACT_COUNT = 10000
+SKYLINES_LISTS_COUNT_TIMEOUT = 10 * 60
+
 # mapproxy config file; if commented,
 # SKYLINES_MAP_TILE_URL is used instead
 #SKYLINES_MAPPROXY = os.path.join(base, 'mapserver', 'mapproxy', 'mapproxy.yaml')
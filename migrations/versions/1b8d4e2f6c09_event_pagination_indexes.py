@@ -0,0 +1,16 @@
+# revision identifiers, used by Alembic.
+revision = '1b8d4e2f6c09'
+down_revision = '4a7c2e9b1f53'
+
+from alembic import op
+
+
+def upgrade():
+    op.create_index('ix_events_time_id', 'events', ['time', 'id'])
+    op.create_index('ix_notifications_recipient_id', 'notifications',
+                    ['recipient_id', 'time_read'])
+
+
+def downgrade():
+    op.drop_index('ix_notifications_recipient_id', 'notifications')
+    op.drop_index('ix_events_time_id', 'events')
@@ -0,0 +1,47 @@
+# revision identifiers, used by Alembic.
+revision = '1e3d5a9c8f60'
+down_revision = '4b7e0c1f9a2d'
+
+from alembic import op
+import sqlalchemy as sa
+
+# entity types of RankingScore
+ENTITY_FIELDS = [(1, 'pilot_id'), (2, 'club_id'), (3, 'takeoff_airport_id')]
+
+
+def upgrade():
+    op.create_table(
+        'ranking_scores',
+        sa.Column('entity_type', sa.SmallInteger(), nullable=False),
+        sa.Column('entity_id', sa.Integer(), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('entity_type', 'entity_id', 'year')
+    )
+    op.create_index('ix_ranking_scores_total', 'ranking_scores',
+                    ['entity_type', 'year', 'total'])
+
+    years = [('0', ''), ('date_part(\'year\', flights.date_local)',
+                         ', date_part(\'year\', flights.date_local)')]
+
+    for entity_type, field in ENTITY_FIELDS:
+        for year, group_by_year in years:
+            op.execute('''
+                INSERT INTO ranking_scores
+                    (entity_type, entity_id, year, count, total)
+                SELECT {entity_type}, flights.{field}, {year}, count(*),
+                    coalesce(sum(CASE WHEN models.dmst_index > 0
+                        THEN flights.olc_plus_score * 100 / models.dmst_index
+                        ELSE flights.olc_plus_score END), 0)
+                FROM flights LEFT OUTER JOIN models
+                    ON models.id = flights.model_id
+                WHERE flights.{field} IS NOT NULL
+                GROUP BY flights.{field}{group_by_year}
+            '''.format(entity_type=entity_type, field=field, year=year,
+                       group_by_year=group_by_year))
+
+
+def downgrade():
+    op.drop_index('ix_ranking_scores_total', 'ranking_scores')
+    op.drop_table('ranking_scores')
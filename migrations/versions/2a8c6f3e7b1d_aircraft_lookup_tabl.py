@@ -0,0 +1,40 @@
+# revision identifiers, used by Alembic.
+revision = '2a8c6f3e7b1d'
+down_revision = '66650ad3d70'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'logger_aircraft',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('logger_manufacturer_id', sa.String(length=3), nullable=False),
+        sa.Column('logger_id', sa.String(length=3), nullable=False),
+        sa.Column('pilot_id', sa.Integer(), nullable=True),
+        sa.Column('registration', sa.Unicode(length=32), nullable=True),
+        sa.Column('registration_flight_id', sa.Integer(), nullable=True),
+        sa.Column('model_id', sa.Integer(), nullable=True),
+        sa.Column('model_flight_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['model_id'], ['models.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['pilot_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_logger_aircraft_logger', 'logger_aircraft',
+                    ['logger_manufacturer_id', 'logger_id'])
+
+    op.create_table(
+        'registration_models',
+        sa.Column('registration', sa.Unicode(length=32), nullable=False),
+        sa.Column('model_id', sa.Integer(), nullable=False),
+        sa.Column('flight_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['model_id'], ['models.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('registration')
+    )
+
+
+def downgrade():
+    op.drop_table('registration_models')
+    op.drop_index('ix_logger_aircraft_logger', 'logger_aircraft')
+    op.drop_table('logger_aircraft')
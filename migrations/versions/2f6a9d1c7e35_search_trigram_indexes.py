@@ -0,0 +1,30 @@
+# revision identifiers, used by Alembic.
+revision = '2f6a9d1c7e35'
+down_revision = '3d9b6f0a2c84'
+
+from alembic import op
+
+# must be the same expression as the User.name hybrid property
+USER_NAME = '''(CASE WHEN last_name IS NOT NULL
+                THEN first_name || ' ' || last_name
+                ELSE first_name END)'''
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    op.execute('CREATE INDEX ix_users_name_trgm ON users '
+               'USING gin ({} gin_trgm_ops)'.format(USER_NAME))
+    op.execute('CREATE INDEX ix_clubs_name_trgm ON clubs '
+               'USING gin (name gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_airports_name_trgm ON airports '
+               'USING gin (name gin_trgm_ops)')
+    op.execute('CREATE INDEX ix_airports_icao_trgm ON airports '
+               'USING gin (icao gin_trgm_ops)')
+
+
+def downgrade():
+    op.drop_index('ix_airports_icao_trgm', 'airports')
+    op.drop_index('ix_airports_name_trgm', 'airports')
+    op.drop_index('ix_clubs_name_trgm', 'clubs')
+    op.drop_index('ix_users_name_trgm', 'users')
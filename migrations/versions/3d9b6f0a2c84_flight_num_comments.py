@@ -0,0 +1,22 @@
+# revision identifiers, used by Alembic.
+revision = '3d9b6f0a2c84'
+down_revision = '5c2f8e4d6a17'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('flights', sa.Column('num_comments', sa.Integer(),
+                                       nullable=False, server_default='0'))
+
+    op.execute('''
+        UPDATE flights SET num_comments = comments.count
+        FROM (SELECT flight_id, count(*) AS count
+              FROM flight_comments GROUP BY flight_id) AS comments
+        WHERE flights.id = comments.flight_id
+    ''')
+
+
+def downgrade():
+    op.drop_column('flights', 'num_comments')
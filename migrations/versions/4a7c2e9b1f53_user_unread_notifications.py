@@ -0,0 +1,20 @@
+# revision identifiers, used by Alembic.
+revision = '4a7c2e9b1f53'
+down_revision = '2f6a9d1c7e35'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('users', sa.Column('unread_notifications', sa.Integer()))
+
+    op.execute('''
+        UPDATE users SET unread_notifications = (
+            SELECT count(*) FROM notifications
+            WHERE recipient_id = users.id AND time_read IS NULL)
+    ''')
+
+
+def downgrade():
+    op.drop_column('users', 'unread_notifications')
@@ -0,0 +1,29 @@
+# revision identifiers, used by Alembic.
+revision = '4b7e0c1f9a2d'
+down_revision = '2a8c6f3e7b1d'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'pilot_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('tracks_uploaded', sa.Integer(), nullable=False),
+        sa.Column('users_followed', sa.Integer(), nullable=False),
+        sa.Column('followers_attracted', sa.Integer(), nullable=False),
+        sa.Column('comments_made', sa.Integer(), nullable=False),
+        sa.Column('distance', sa.BigInteger(), nullable=False),
+        sa.Column('takeoff_airport_count', sa.Integer(), nullable=False),
+        sa.Column('takeoff_country_count', sa.Integer(), nullable=False),
+        sa.Column('aircraft_model_count', sa.Integer(), nullable=False),
+        sa.Column('pic_seconds', sa.BigInteger(), nullable=False),
+        sa.Column('copilot_seconds', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+
+
+def downgrade():
+    op.drop_table('pilot_stats')
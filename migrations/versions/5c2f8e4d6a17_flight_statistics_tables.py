@@ -0,0 +1,67 @@
+# revision identifiers, used by Alembic.
+revision = '5c2f8e4d6a17'
+down_revision = '1e3d5a9c8f60'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'flight_statistics',
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('pilot_id', sa.Integer(), nullable=False),
+        sa.Column('club_id', sa.Integer(), nullable=False),
+        sa.Column('takeoff_airport_id', sa.Integer(), nullable=False),
+        sa.Column('flights', sa.Integer(), nullable=False),
+        sa.Column('distance', sa.BigInteger(), nullable=False),
+        sa.Column('duration', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('year', 'pilot_id', 'club_id',
+                                'takeoff_airport_id')
+    )
+    op.create_index('ix_flight_statistics_pilot_id', 'flight_statistics',
+                    ['pilot_id'])
+    op.create_index('ix_flight_statistics_club_id', 'flight_statistics',
+                    ['club_id'])
+    op.create_index('ix_flight_statistics_takeoff_airport_id',
+                    'flight_statistics', ['takeoff_airport_id'])
+
+    op.create_table(
+        'year_statistics',
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('flights', sa.Integer(), nullable=False),
+        sa.Column('pilots', sa.Integer(), nullable=False),
+        sa.Column('distance', sa.BigInteger(), nullable=False),
+        sa.Column('duration', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('year')
+    )
+
+    op.execute('''
+        INSERT INTO flight_statistics (year, pilot_id, club_id,
+            takeoff_airport_id, flights, distance, duration)
+        SELECT date_part('year', date_local), coalesce(pilot_id, 0),
+            coalesce(club_id, 0), coalesce(takeoff_airport_id, 0), count(*),
+            coalesce(sum(olc_classic_distance), 0),
+            coalesce(date_part('epoch', sum(landing_time - takeoff_time)), 0)
+        FROM flights
+        GROUP BY date_part('year', date_local), coalesce(pilot_id, 0),
+            coalesce(club_id, 0), coalesce(takeoff_airport_id, 0)
+    ''')
+
+    op.execute('''
+        INSERT INTO year_statistics (year, flights, pilots, distance, duration)
+        SELECT year, sum(flights),
+            count(DISTINCT CASE WHEN pilot_id != 0 THEN pilot_id END),
+            sum(distance), sum(duration)
+        FROM flight_statistics
+        GROUP BY year
+    ''')
+
+
+def downgrade():
+    op.drop_table('year_statistics')
+    op.drop_index('ix_flight_statistics_takeoff_airport_id',
+                  'flight_statistics')
+    op.drop_index('ix_flight_statistics_club_id', 'flight_statistics')
+    op.drop_index('ix_flight_statistics_pilot_id', 'flight_statistics')
+    op.drop_table('flight_statistics')
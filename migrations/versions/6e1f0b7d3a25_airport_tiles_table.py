@@ -0,0 +1,21 @@
+# revision identifiers, used by Alembic.
+revision = '6e1f0b7d3a25'
+down_revision = '1b8d4e2f6c09'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table(
+        'airport_tiles',
+        sa.Column('x', sa.Integer(), nullable=False),
+        sa.Column('y', sa.Integer(), nullable=False),
+        sa.Column('airports', sa.Text(), nullable=False),
+        sa.Column('time_modified', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('x', 'y')
+    )
+
+
+def downgrade():
+    op.drop_table('airport_tiles')
@@ -0,0 +1,77 @@
+# revision identifiers, used by Alembic.
+revision = 'ce972bc70982'
+down_revision = '6e1f0b7d3a25'
+
+from alembic import op
+
+
+def upgrade():
+    # The same statistics as computed by PilotStats.rebuild(), first the
+    # counters of the missing rows...
+    op.execute('''
+        INSERT INTO pilot_stats (
+            user_id, tracks_uploaded, users_followed, followers_attracted,
+            comments_made, distance, takeoff_airport_count,
+            takeoff_country_count, aircraft_model_count, pic_seconds,
+            copilot_seconds)
+        SELECT
+            users.id,
+            (SELECT count(*) FROM igc_files
+             WHERE igc_files.owner_id = users.id),
+            (SELECT count(*) FROM followers
+             WHERE followers.source_id = users.id),
+            (SELECT count(*) FROM followers
+             WHERE followers.destination_id = users.id),
+            (SELECT count(*) FROM flight_comments
+             WHERE flight_comments.user_id = users.id),
+            0, 0, 0, 0, 0, 0
+        FROM users
+        WHERE NOT EXISTS (
+            SELECT 1 FROM pilot_stats WHERE pilot_stats.user_id = users.id)
+    ''')
+
+    # ...then the flight statistics of all rows, which count every flight
+    # once per user, even if pilot and co-pilot are equal
+    op.execute('''
+        UPDATE pilot_stats SET
+            distance = stats.distance,
+            takeoff_airport_count = stats.takeoff_airport_count,
+            takeoff_country_count = stats.takeoff_country_count,
+            aircraft_model_count = stats.aircraft_model_count,
+            pic_seconds = stats.pic_seconds,
+            copilot_seconds = stats.copilot_seconds
+        FROM (
+            SELECT
+                pairs.user_id,
+                coalesce(sum(flights.olc_classic_distance), 0) AS distance,
+                count(DISTINCT flights.takeoff_airport_id)
+                    AS takeoff_airport_count,
+                count(DISTINCT airports.country_code)
+                    AS takeoff_country_count,
+                count(DISTINCT flights.model_id) AS aircraft_model_count,
+                coalesce(trunc(extract(epoch FROM sum(
+                    CASE WHEN flights.pilot_id = pairs.user_id
+                    THEN flights.landing_time - flights.takeoff_time END))),
+                    0) AS pic_seconds,
+                coalesce(trunc(extract(epoch FROM sum(
+                    CASE WHEN flights.co_pilot_id = pairs.user_id
+                    THEN flights.landing_time - flights.takeoff_time END))),
+                    0) AS copilot_seconds
+            FROM flights
+            JOIN (
+                SELECT pilot_id AS user_id, id AS flight_id FROM flights
+                WHERE pilot_id IS NOT NULL
+                UNION
+                SELECT co_pilot_id AS user_id, id AS flight_id FROM flights
+                WHERE co_pilot_id IS NOT NULL
+            ) AS pairs ON pairs.flight_id = flights.id
+            LEFT OUTER JOIN airports
+                ON airports.id = flights.takeoff_airport_id
+            GROUP BY pairs.user_id
+        ) AS stats
+        WHERE pilot_stats.user_id = stats.user_id
+    ''')
+
+
+def downgrade():
+    pass
@@ -20,10 +20,11 @@ requirements = [
     'skylinespolyencode==0.1.3',
     'psycopg2==2.4.6',
     'geoalchemy2==0.2.1',
-    'shapely==1.2.18',
+    'shapely>=1.4,<2.0',
     'crc16==0.1.1',
     'markdown==2.3.1',
     'pytz',
+    'numpy',
     'webassets==0.8',
     'cssmin==0.1.4',
     'twisted==13.1',
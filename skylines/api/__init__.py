@@ -1,5 +1,5 @@
 # flake8: noqa
 
-from airports import get_airports_by_bbox, get_airport
-from airspace import get_airspaces_by_location
-from waves import get_waves_by_location
+from airports import get_airports_by_bbox, get_airports_by_tile, get_airport
+from airspace import get_airspaces_by_location, get_airspaces_by_locations
+from waves import get_waves_by_location, get_waves_by_locations
@@ -1,4 +1,10 @@
-from skylines.model import Airport, Bounds
+import json
+
+from skylines.model import Airport, AirportTile, Bounds
+
+# the lowest zoom level of the airport tiles, which combine up to 64 of the
+# precomputed tiles
+MIN_TILE_ZOOM = AirportTile.ZOOM - 3
 
 
 def get_airports_by_bbox(bbox):
@@ -12,6 +18,20 @@ def get_airports_by_bbox(bbox):
     return map(airport_to_dict, Airport.by_bbox(bbox))
 
 
+def get_airports_by_tile(zoom, x, y):
+    if zoom < MIN_TILE_ZOOM:
+        raise ValueError('Requested tile is too large.')
+
+    if not (0 <= x < 2 ** zoom and 0 <= y < 2 ** zoom):
+        raise ValueError('Invalid tile.')
+
+    airports = []
+    for tile in AirportTile.by_tile(zoom, x, y):
+        airports.extend(json.loads(tile.airports))
+
+    return airports
+
+
 def get_airport(id):
     airport = Airport.get(id)
     if not airport:
@@ -9,6 +9,14 @@ def get_airspaces_by_location(location):
     return map(airspace_to_dict, airspaces)
 
 
+def get_airspaces_by_locations(locations):
+    if not all(isinstance(location, Location) for location in locations):
+        raise TypeError('Invalid `locations` parameter.')
+
+    return [map(airspace_to_dict, airspaces)
+            for airspaces in Airspace.by_locations(locations)]
+
+
 def airspace_to_dict(airspace):
     return {
         'name': airspace.name,
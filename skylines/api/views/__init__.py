@@ -1,4 +1,5 @@
 from .errors import register as register_error_handlers
+from .indexes import register as register_indexes
 from .airports import airports_blueprint
 from .airspace import airspace_blueprint
 from .mapitems import mapitems_blueprint
@@ -7,6 +8,7 @@ from .waves import waves_blueprint
 
 def register(app):
     register_error_handlers(app)
+    register_indexes(app)
 
     app.register_blueprint(airports_blueprint, url_prefix='/airports')
     app.register_blueprint(airspace_blueprint, url_prefix='/airspace')
@@ -1,12 +1,21 @@
 from flask import Blueprint, request
 from werkzeug.exceptions import BadRequest
 
-from skylines.model import Bounds
+from skylines.model import Airport, AirportTile, Bounds
 from skylines import api
-from .json import jsonify
+from .json import cached_jsonify
 
 airports_blueprint = Blueprint('airports', 'skylines')
 
+# precision in degrees that the requested bounding boxes are extended to,
+# so that similar requests can be answered from the cache
+BBOX_PRECISION = 0.1
+
+# time in seconds that the clients may cache the airport tiles, which only
+# change with the airport imports. After an import the clients may keep
+# showing the old airports of a changed tile for up to this long.
+TILE_MAX_AGE = 60 * 60
+
 
 @airports_blueprint.route('/')
 def list():
@@ -14,11 +23,25 @@ def list():
     if not bbox:
         raise BadRequest('Invalid `bbox` parameter.')
 
-    airports = api.get_airports_by_bbox(bbox)
-    return jsonify(airports)
+    bbox = bbox.quantize(BBOX_PRECISION)
+
+    key = 'airports_{}_{}_{}_{}'.format(
+        bbox.southwest.longitude, bbox.southwest.latitude,
+        bbox.northeast.longitude, bbox.northeast.latitude)
+
+    return cached_jsonify([Airport], key,
+                          lambda: api.get_airports_by_bbox(bbox))
+
+
+@airports_blueprint.route('/tiles/<int:z>/<int:x>/<int:y>')
+def tile(z, x, y):
+    key = 'airport_tile_{}_{}_{}'.format(z, x, y)
+    return cached_jsonify([AirportTile], key,
+                          lambda: api.get_airports_by_tile(z, x, y),
+                          max_age=TILE_MAX_AGE)
 
 
 @airports_blueprint.route('/<int:id>')
 def details(id):
-    airport = api.get_airport(id)
-    return jsonify(airport)
+    return cached_jsonify([Airport], 'airport_{}'.format(id),
+                          lambda: api.get_airport(id))
@@ -1,7 +1,8 @@
 from flask import Blueprint, request
 
 from skylines import api
-from .json import jsonify
+from skylines.model import Airspace
+from .json import cached_jsonify
 from .parser import parse_location
 
 airspace_blueprint = Blueprint('airspace', 'skylines')
@@ -10,4 +11,7 @@ airspace_blueprint = Blueprint('airspace', 'skylines')
 @airspace_blueprint.route('/')
 def list():
     location = parse_location(request.args)
-    return jsonify(api.get_airspaces_by_location(location))
+
+    key = 'airspace_{}_{}'.format(location.latitude, location.longitude)
+    return cached_jsonify([Airspace], key,
+                          lambda: api.get_airspaces_by_location(location))
@@ -0,0 +1,43 @@
+import threading
+
+from skylines.model import Airspace, MountainWaveProject
+from .json import get_data_version
+
+
+def register(app):
+    """ Keep the in-process spatial indexes of the airspaces and mountain
+    waves up to date with their tables, which are replaced by the imports.
+
+    The indexes are loaded by a background thread. Until it has finished,
+    the requests are answered by the previous index or by the database. """
+
+    versions = {}
+    lock = threading.Lock()
+
+    def load_indexes(changed):
+        try:
+            with app.app_context():
+                for model, version in changed:
+                    model.load_index()
+                    versions[model] = version
+
+        except Exception:
+            app.logger.exception('Loading the spatial indexes failed')
+
+        finally:
+            lock.release()
+
+    @app.before_request
+    def update_indexes():
+        changed = []
+        for model in (Airspace, MountainWaveProject):
+            version = get_data_version(model)
+            if versions.get(model) != version:
+                changed.append((model, version))
+
+        if not changed or not lock.acquire(False):
+            return
+
+        thread = threading.Thread(target=load_indexes, args=(changed,))
+        thread.daemon = True
+        thread.start()
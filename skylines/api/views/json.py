@@ -1,4 +1,18 @@
+import zlib
+from hashlib import md5
+
 from flask import request, json, current_app
+from sqlalchemy import func
+
+from skylines.model import db
+
+# responses smaller than this are not compressed
+GZIP_MIN_SIZE = 1024
+
+# time in seconds until the modification times of the tables are checked
+# again, and until cached data is discarded
+DATA_VERSION_TIMEOUT = 60
+DATA_CACHE_TIMEOUT = 60 * 60
 
 
 def jsonify(data, status=200):
@@ -26,5 +40,87 @@ def jsonify(data, status=200):
         content = json.dumps(data, indent=indent)
         mimetype = 'application/json'
 
-    return current_app.response_class(
-        content, mimetype=mimetype), status
+    response = current_app.response_class(content, mimetype=mimetype)
+
+    # Compress the response if the client supports it
+    response.vary.add('Accept-Encoding')
+    if len(content) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        response.data = compressor.compress(content) + compressor.flush()
+        response.headers['Content-Encoding'] = 'gzip'
+
+    return response, status
+
+
+def get_data_version(*models):
+    """
+    Returns the time of the last modification of the tables of the models
+    and an identifier of their current contents. Both are cached for
+    `DATA_VERSION_TIMEOUT` seconds.
+
+    The models need to have a `time_modified` column, which is updated by
+    the imports.
+    """
+
+    key = 'data_version_' + '_'.join(model.__tablename__ for model in models)
+
+    version = current_app.cache.get(key)
+    if version is None:
+        rows = [db.session.query(func.max(model.time_modified),
+                                 func.count()).one()
+                for model in models]
+
+        times = [row[0] for row in rows if row[0] is not None]
+        last_modified = max(times).replace(microsecond=0) if times else None
+
+        version = (last_modified, md5(repr(rows)).hexdigest())
+        current_app.cache.set(key, version, timeout=DATA_VERSION_TIMEOUT)
+
+    return version
+
+
+def cached_jsonify(models, key, get_data, max_age=None):
+    """
+    Returns a conditional JSON response with the data that is returned by
+    `get_data()`, which may only depend on the tables of the models.
+
+    If the client already has the current data (`If-None-Match` or
+    `If-Modified-Since`) an empty "304 Not Modified" response is returned.
+    Otherwise the data is taken from the cache if it has been requested
+    with the same `key` since the tables were modified.
+
+    Without `max_age` the clients have to check for modifications on every
+    request.
+    """
+
+    last_modified, etag = get_data_version(*models)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = (last_modified is not None and
+                        request.if_modified_since is not None and
+                        request.if_modified_since >= last_modified)
+
+    if not_modified:
+        response = current_app.response_class(status=304)
+    else:
+        key = 'data_{}_{}'.format(etag, key)
+
+        data = current_app.cache.get(key)
+        if data is None:
+            data = get_data()
+            current_app.cache.set(key, data, timeout=DATA_CACHE_TIMEOUT)
+
+        response, status = jsonify(data)
+
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    response.cache_control.public = True
+
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+
+    return response
@@ -1,8 +1,9 @@
 from flask import Blueprint, request
 
 from skylines import api
-from .json import jsonify
-from .parser import parse_location
+from skylines.model import Airspace, MountainWaveProject
+from .json import cached_jsonify, jsonify
+from .parser import parse_location, parse_locations
 
 mapitems_blueprint = Blueprint('mapitems', 'skylines')
 
@@ -10,7 +11,44 @@ mapitems_blueprint = Blueprint('mapitems', 'skylines')
 @mapitems_blueprint.route('/')
 def list():
     location = parse_location(request.args)
-    return jsonify({
-        'airspaces': api.get_airspaces_by_location(location),
-        'waves': api.get_waves_by_location(location),
-    })
+
+    def get_mapitems():
+        return {
+            'airspaces': api.get_airspaces_by_location(location),
+            'waves': api.get_waves_by_location(location),
+        }
+
+    key = 'mapitems_{}_{}'.format(location.latitude, location.longitude)
+    return cached_jsonify([Airspace, MountainWaveProject], key, get_mapitems)
+
+
+@mapitems_blueprint.route('/', methods=['POST'])
+def batch():
+    """
+    Looks up the map items for many locations at once, e.g. for the
+    turnpoints of a task or the fixes of a flight. The request body is
+    `{"locations": [{"lat": ..., "lon": ...}, ...]}` and the response
+    contains the map items for each of the locations in the same order.
+    """
+
+    locations = parse_locations(request.get_json(force=True))
+
+    # nearby locations are equal after parsing, so each of them only needs
+    # to be looked up once
+    unique = {}
+    for location in locations:
+        unique.setdefault((location.latitude, location.longitude), location)
+
+    unique = unique.values()
+    airspaces = api.get_airspaces_by_locations(unique)
+    waves = api.get_waves_by_locations(unique)
+
+    mapitems = {}
+    for i, location in enumerate(unique):
+        mapitems[(location.latitude, location.longitude)] = {
+            'airspaces': airspaces[i],
+            'waves': waves[i],
+        }
+
+    return jsonify([mapitems[(location.latitude, location.longitude)]
+                    for location in locations])
@@ -1,12 +1,37 @@
 from flask import abort
 from skylines.model import Location
 
+# precision in degrees that the requested locations are rounded to, so that
+# lookups of nearby locations can be answered from the cache
+LOCATION_PRECISION = 0.001
+
+# maximum number of locations that can be looked up by a single request
+MAX_LOCATIONS = 1000
+
 
 def parse_location(args):
     try:
         latitude = float(args['lat'])
         longitude = float(args['lon'])
-        return Location(latitude=latitude, longitude=longitude)
+        location = Location(latitude=latitude, longitude=longitude)
+        return location.quantize(LOCATION_PRECISION)
 
     except (KeyError, ValueError):
         abort(400)
+
+
+def parse_locations(data):
+    if not isinstance(data, dict) or not isinstance(data.get('locations'), list):
+        abort(400)
+
+    if len(data['locations']) > MAX_LOCATIONS:
+        raise ValueError('Too many `locations` requested.')
+
+    locations = []
+    for location in data['locations']:
+        if not isinstance(location, dict):
+            abort(400)
+
+        locations.append(parse_location(location))
+
+    return locations
@@ -1,7 +1,8 @@
 from flask import Blueprint, request
 
 from skylines import api
-from .json import jsonify
+from skylines.model import MountainWaveProject
+from .json import cached_jsonify
 from .parser import parse_location
 
 waves_blueprint = Blueprint('waves', 'skylines')
@@ -10,4 +11,7 @@ waves_blueprint = Blueprint('waves', 'skylines')
 @waves_blueprint.route('/')
 def list():
     location = parse_location(request.args)
-    return jsonify(api.get_waves_by_location(location))
+
+    key = 'waves_{}_{}'.format(location.latitude, location.longitude)
+    return cached_jsonify([MountainWaveProject], key,
+                          lambda: api.get_waves_by_location(location))
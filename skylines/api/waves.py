@@ -12,6 +12,14 @@ def get_waves_by_location(location):
     return map(wave_to_dict, waves)
 
 
+def get_waves_by_locations(locations):
+    if not all(isinstance(location, Location) for location in locations):
+        raise TypeError('Invalid `locations` parameter.')
+
+    return [map(wave_to_dict, waves)
+            for waves in MountainWaveProject.by_locations(locations)]
+
+
 def wave_to_dict(wave):
     wind_direction = wave.main_wind_direction or ''
     if isnumeric(wind_direction):
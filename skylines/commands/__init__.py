@@ -6,10 +6,12 @@ from flask.ext.migrate import MigrateCommand
 from .shell import Shell
 from .server import Server
 
+from .achievements import manager as achievements_manager
 from .assets import manager as assets_manager
 from .babel import manager as babel_manager
 from .celery import manager as celery_manager
 from .database import manager as database_manager
+from .files import manager as files_manager
 from .flights import manager as flights_manager
 from .import_ import manager as import_manager
 from .notifications import manager as notifications_manager
@@ -36,10 +38,12 @@ manager.add_command("shell", Shell())
 manager.add_command("runserver", Server())
 manager.add_command("migrate", MigrateCommand)
 
+manager.add_command("achievements", achievements_manager)
 manager.add_command("assets", assets_manager)
 manager.add_command("babel", babel_manager)
 manager.add_command("celery", celery_manager)
 manager.add_command("db", database_manager)
+manager.add_command("files", files_manager)
 manager.add_command("flights", flights_manager)
 manager.add_command("import", import_manager)
 manager.add_command("notifications", notifications_manager)
@@ -0,0 +1,6 @@
+from flask.ext.script import Manager
+
+from .recompute import Recompute
+
+manager = Manager(help="Perform operations related to achievements")
+manager.add_command('recompute', Recompute())
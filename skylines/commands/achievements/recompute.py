@@ -0,0 +1,254 @@
+from flask.ext.script import Command, Option
+
+import time
+from datetime import datetime
+from fnmatch import fnmatchcase
+from multiprocessing import Pool
+from sqlalchemy.sql.expression import bindparam
+from skylines.model import db, Flight, Event, Notification, PilotStats
+from skylines.model.achievement import (UnlockedAchievement,
+                                        insert_unlocked_achievements)
+from skylines.lib.achievements import (ACHIEVEMENT_BY_NAME,
+                                       FLIGHT_ACHIEVEMENTS, FlightMetrics,
+                                       get_achievement)
+
+BATCH_SIZE = 1000
+
+# the flight achievements evaluated by a worker process
+_definitions = None
+
+
+def init_worker(names):
+    global _definitions
+    _definitions = [get_achievement(name) for name in names]
+
+
+def evaluate_flight(flight_id):
+    """Returns (flight_id, pilot_id, landing_time, achieved names) or
+    None instead of the names if the flight could not be evaluated."""
+
+    try:
+        flight = Flight.get(flight_id)
+        context = FlightMetrics(flight)
+        achieved = [a.name for a in _definitions if a.is_achieved(context)]
+        return flight_id, flight.pilot_id, flight.landing_time, achieved
+
+    except Exception as e:
+        print 'Evaluating flight {} failed: {}'.format(flight_id, e)
+        return flight_id, None, None, None
+
+    finally:
+        db.session.remove()
+
+
+class Recompute(Command):
+    """ Evaluate achievements for all pilots and flights and unlock the
+    missing ones """
+
+    option_list = (
+        Option('--jobs', '-j', type=int, default=4,
+               help='number of parallel worker processes'),
+        Option('--dry-run', '-n', action='store_true',
+               help='only print the changes'),
+        Option('--revoke', action='store_true',
+               help='remove unlocked achievements that are not achieved '
+                    'anymore'),
+        Option('names', metavar='NAME', nargs='*',
+               help='achievement names or patterns like "triangle-*" '
+                    '(default: all)'),
+    )
+
+    def run(self, jobs, dry_run, revoke, names):
+        names = select_names(names)
+        if not names:
+            print 'No matching achievements found'
+            return
+
+        flight_names = [a.name for a in FLIGHT_ACHIEVEMENTS
+                        if a.name in names]
+        user_names = sorted(names.difference(flight_names))
+
+        achieved = {}
+        failed = set()
+        if flight_names:
+            flights_achieved, failed = \
+                self.evaluate_flights(flight_names, jobs)
+            achieved.update(flights_achieved)
+        if user_names:
+            achieved.update(self.evaluate_users(user_names))
+
+        new, moved, obsolete = diff(achieved, names, failed)
+
+        if dry_run:
+            for pilot_id, name, flight_id, time_achieved in new:
+                print '+ {} pilot={} flight={}'.format(name, pilot_id, flight_id)
+            for achievement, flight_id, time_achieved in moved:
+                print '~ {} pilot={} flight={} -> {}'.format(
+                    achievement.name, achievement.pilot_id,
+                    achievement.flight_id, flight_id)
+            if revoke:
+                for achievement in obsolete:
+                    print '- {} pilot={} flight={}'.format(
+                        achievement.name, achievement.pilot_id,
+                        achievement.flight_id)
+        else:
+            start = time.time()
+            self.apply(new, moved, obsolete if revoke else [])
+            print 'Stored changes in {:.1f}s'.format(time.time() - start)
+
+        print 'New: {}, moved: {}, not achieved anymore: {}{}'.format(
+            len(new), len(moved), len(obsolete),
+            '' if revoke else ' (use --revoke to remove them)')
+
+    def evaluate_flights(self, names, jobs):
+        """Returns the earliest (flight_id, landing_time) of every
+        (pilot_id, name) that is achieved by a flight, and the set of
+        flight ids that could not be evaluated."""
+
+        flight_ids = [id for id, in db.session.query(Flight.id)
+                      .filter(Flight.pilot_id != None)
+                      .order_by(Flight.id)]
+
+        # don't share the database connections with the worker processes
+        db.session.close()
+        db.engine.dispose()
+
+        result = {}
+        failed = set()
+        start = time.time()
+
+        pool = Pool(jobs, init_worker, (names,))
+        try:
+            for i, (flight_id, pilot_id, landing_time, achieved) in enumerate(
+                    pool.imap_unordered(evaluate_flight, flight_ids,
+                                        chunksize=20)):
+                if achieved is None:
+                    failed.add(flight_id)
+                    continue
+
+                for name in achieved:
+                    key = (pilot_id, name)
+                    if key in result:
+                        other_id, other_time = result[key]
+                        if (other_time, other_id) < (landing_time, flight_id):
+                            continue
+
+                    result[key] = (flight_id, landing_time)
+
+                if (i + 1) % 1000 == 0:
+                    print '{} / {}'.format(i + 1, len(flight_ids))
+        finally:
+            pool.close()
+            pool.join()
+
+        duration = time.time() - start
+        print 'Evaluated {} flights in {:.1f}s ({:.1f} flights/s), ' \
+            'failed: {}'.format(len(flight_ids), duration,
+                                len(flight_ids) / max(duration, 0.001),
+                                len(failed))
+
+        return result, failed
+
+    def evaluate_users(self, names):
+        """Returns the (None, now) of every (user_id, name) that is
+        achieved by the activities of a user."""
+
+        definitions = [get_achievement(name) for name in names]
+        now = datetime.utcnow()
+        start = time.time()
+
+        stats = PilotStats.compute_many()
+        stats.pop(None, None)
+
+        result = {}
+        for user_id, context in stats.iteritems():
+            for a in definitions:
+                if a.is_achieved(context):
+                    result[(user_id, a.name)] = (None, now)
+
+        print 'Evaluated {} users in {:.1f}s' \
+            .format(len(stats), time.time() - start)
+
+        return result
+
+    def apply(self, new, moved, obsolete):
+        for i in range(0, len(new), BATCH_SIZE):
+            insert_unlocked_achievements(new[i:i + BATCH_SIZE])
+
+        if moved:
+            achievements = UnlockedAchievement.__table__
+            db.session.execute(
+                achievements.update()
+                .where(achievements.c.id == bindparam('_id'))
+                .values(flight_id=bindparam('_flight_id'),
+                        time_achieved=bindparam('_time_achieved')),
+                [dict(_id=achievement.id, _flight_id=flight_id,
+                      _time_achieved=time_achieved)
+                 for achievement, flight_id, time_achieved in moved])
+
+            events = Event.__table__
+            db.session.execute(
+                events.update()
+                .where(events.c.achievement_id == bindparam('_id'))
+                .values(flight_id=bindparam('_flight_id')),
+                [dict(_id=achievement.id, _flight_id=flight_id)
+                 for achievement, flight_id, time_achieved in moved])
+
+        if obsolete:
+            Notification.invalidate_unread_counts(Event.achievement_id.in_(
+                [achievement.id for achievement in obsolete]))
+
+            UnlockedAchievement.query() \
+                .filter(UnlockedAchievement.id.in_(
+                    [achievement.id for achievement in obsolete])) \
+                .delete(synchronize_session=False)
+
+        db.session.commit()
+
+
+def select_names(patterns):
+    if not patterns:
+        return set(ACHIEVEMENT_BY_NAME)
+
+    return set(name for name in ACHIEVEMENT_BY_NAME
+               if any(fnmatchcase(name, pattern) for pattern in patterns))
+
+
+def diff(achieved, names, failed_flights=()):
+    """Compares the `achieved` (pilot_id, name) -> (flight_id, time) dict
+    with the unlocked achievements of the given names.
+
+    Unlocked achievements of the `failed_flights`, which could not be
+    evaluated, are never considered obsolete.
+
+    Returns the new achievements as (pilot_id, name, flight_id, time)
+    tuples, the unlocked achievements that were achieved by an earlier
+    flight as (row, flight_id, time) tuples and the rows of the unlocked
+    achievements that are not achieved anymore.
+    """
+
+    unlocked = db.session.query(UnlockedAchievement.id,
+                                UnlockedAchievement.pilot_id,
+                                UnlockedAchievement.name,
+                                UnlockedAchievement.flight_id,
+                                UnlockedAchievement.time_achieved) \
+        .filter(UnlockedAchievement.name.in_(names))
+
+    unlocked = dict(((a.pilot_id, a.name), a) for a in unlocked)
+
+    new, moved = [], []
+    for (pilot_id, name), (flight_id, time_achieved) \
+            in sorted(achieved.iteritems()):
+        achievement = unlocked.get((pilot_id, name))
+        if achievement is None:
+            new.append((pilot_id, name, flight_id, time_achieved))
+
+        elif flight_id is not None and \
+                achievement.time_achieved > time_achieved:
+            moved.append((achievement, flight_id, time_achieved))
+
+    obsolete = [a for key, a in sorted(unlocked.iteritems())
+                if key not in achieved and
+                a.flight_id not in failed_flights]
+
+    return new, moved, obsolete
@@ -0,0 +1,6 @@
+from flask.ext.script import Manager
+
+from .migrate import Migrate
+
+manager = Manager(help="Perform operations related to stored IGC files")
+manager.add_command('migrate', Migrate())
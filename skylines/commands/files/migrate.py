@@ -0,0 +1,73 @@
+from flask.ext.script import Command, Option
+
+import os
+from multiprocessing import Pool
+from flask import current_app
+from skylines.model import db, IGCFile
+from skylines.lib.files import key_to_path, store_file, compress_file
+
+
+def migrate_file(args):
+    root, filename, md5, compress = args
+
+    compressed_path = key_to_path(md5, root, compressed=True)
+    if os.path.exists(compressed_path):
+        return 'done'
+
+    path = key_to_path(md5, root)
+    if os.path.exists(path):
+        if not compress:
+            return 'done'
+
+        src = path
+    else:
+        src = os.path.join(root, filename)
+        if not os.path.exists(src):
+            return 'missing'
+
+    if compress:
+        compress_file(src, compressed_path)
+    else:
+        store_file(src, path)
+
+    return 'moved'
+
+
+class Migrate(Command):
+    """ Move IGC files from the flat folder into the sharded storage and
+    optionally compress them """
+
+    option_list = (
+        Option('--jobs', '-j', type=int, default=4,
+               help='number of parallel worker processes'),
+        Option('--compress', action='store_true',
+               help='compress the files (default if '
+                    'SKYLINES_FILES_COMPRESSION is set)'),
+    )
+
+    def run(self, jobs, compress):
+        root = current_app.config['SKYLINES_FILES_PATH']
+        compress = compress or \
+            current_app.config.get('SKYLINES_FILES_COMPRESSION') == 'gzip'
+
+        query = db.session.query(IGCFile.filename, IGCFile.md5) \
+            .order_by(IGCFile.id)
+
+        jobs_args = [(root, filename, md5, compress)
+                     for filename, md5 in query]
+
+        result = dict(moved=0, missing=0, done=0)
+
+        pool = Pool(jobs)
+        try:
+            for i, status in enumerate(pool.imap_unordered(
+                    migrate_file, jobs_args, chunksize=100)):
+                result[status] += 1
+                if (i + 1) % 1000 == 0:
+                    print '{} / {}'.format(i + 1, len(jobs_args))
+        finally:
+            pool.close()
+            pool.join()
+
+        print 'Moved: {moved}, missing: {missing}, already done: {done}' \
+            .format(**result)
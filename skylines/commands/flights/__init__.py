@@ -1,8 +1,12 @@
 from flask.ext.script import Manager
 
+from .aircraft_lookup import RebuildAircraftLookup
 from .analysis import Analyze, AnalyzeDelayed
+from .comment_counts import RebuildCommentCounts
 from .copy_flights import CopyFlights
 from .delete_flights import DeleteFlights
+from .rankings import RebuildRankings
+from .statistics import RebuildStatistics
 from .update_flight_paths import UpdateFlightPaths
 
 manager = Manager(help="Perform operations related to recorded flights")
@@ -11,3 +15,7 @@ manager.add_command('analyze-delayed', AnalyzeDelayed())
 manager.add_command('copy-flights', CopyFlights())
 manager.add_command('delete-flights', DeleteFlights())
 manager.add_command('update-flight-paths', UpdateFlightPaths())
+manager.add_command('rebuild-aircraft-lookup', RebuildAircraftLookup())
+manager.add_command('rebuild-rankings', RebuildRankings())
+manager.add_command('rebuild-statistics', RebuildStatistics())
+manager.add_command('rebuild-comment-counts', RebuildCommentCounts())
@@ -0,0 +1,15 @@
+from flask.ext.script import Command
+
+from skylines.model import db
+from skylines.model.aircraft_lookup import rebuild_aircraft_lookup
+
+
+class RebuildAircraftLookup(Command):
+    """ Rebuild the logger and registration tables for aircraft guessing """
+
+    def run(self):
+        n_loggers, n_registrations = rebuild_aircraft_lookup()
+        db.session.commit()
+
+        print 'Loggers: {}, registrations: {}' \
+            .format(n_loggers, n_registrations)
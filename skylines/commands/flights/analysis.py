@@ -2,7 +2,7 @@ from flask.ext.script import Command, Option
 
 from flask import current_app
 from sqlalchemy.orm import joinedload
-from skylines.model import db, Flight
+from skylines.model import db, Flight, TimeZone
 from skylines.lib.xcsoar_ import analyse_flight
 from skylines.worker import tasks
 
@@ -27,6 +27,9 @@ class Analyze(Command):
         if ids:
             self.apply_and_commit(self.do, q.filter(Flight.id.in_(ids)))
         else:
+            # avoid a time zone query for every flight
+            TimeZone.load_index()
+
             self.incremental(self.do, q.filter(Flight.needs_analysis == True))
 
     def do(self, flight):
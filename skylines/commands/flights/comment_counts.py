@@ -0,0 +1,13 @@
+from flask.ext.script import Command
+
+from skylines.model import db, Flight
+
+
+class RebuildCommentCounts(Command):
+    """ Recount the comments of all flights """
+
+    def run(self):
+        count = Flight.update_num_comments()
+        db.session.commit()
+
+        print 'Repaired comment counts: {}'.format(count)
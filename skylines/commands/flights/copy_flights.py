@@ -4,7 +4,6 @@ import os
 import shutil
 from datetime import datetime
 from time import mktime, strptime
-from flask import current_app
 from sqlalchemy import func
 from skylines.model import db, Airport, Flight, IGCFile
 
@@ -72,8 +71,6 @@ class CopyFlights(Command):
 
         for flight in query:
             print "Flight: " + str(flight.id) + " " + flight.igc_file.filename
-            src = os.path.join(
-                current_app.config['SKYLINES_FILES_PATH'],
-                flight.igc_file.filename
-            )
-            shutil.copy(src, dest)
+            with flight.igc_file.open() as src, \
+                    open(os.path.join(dest, flight.igc_file.filename), 'wb') as f:
+                shutil.copyfileobj(src, f)
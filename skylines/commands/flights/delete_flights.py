@@ -4,7 +4,8 @@ import sys
 from datetime import datetime
 from time import mktime, strptime
 from sqlalchemy import func
-from skylines.model import db, Airport, Flight, IGCFile
+from skylines.model import db, Airport, Flight, IGCFile, PilotStats, \
+    RankingScore, FlightStatistics, Notification, Event
 from skylines.lib import files
 
 
@@ -66,7 +67,18 @@ class DeleteFlights(Command):
 
         for flight in query:
             print "Flight: " + str(flight.id) + " " + flight.igc_file.filename
-            files.delete_file(flight.igc_file.filename)
+            files.delete_file(flight.igc_file.md5, flight.igc_file.filename)
+            PilotStats.increment(flight.igc_file.owner_id, tracks_uploaded=-1)
+            PilotStats.remove_flight_comments([flight.id])
+
+            pilot_ids = [flight.pilot_id, flight.co_pilot_id]
+            ranking_scores = RankingScore.scores_for_flight(flight)
+            statistics_key = FlightStatistics.key_for_flight(flight)
+            Notification.invalidate_unread_counts(Event.flight_id == flight.id)
             db.session.delete(flight)
             db.session.delete(flight.igc_file)
+            PilotStats.update_flight_stats(pilot_ids)
+            RankingScore.update([ranking_scores])
+            FlightStatistics.update([statistics_key])
+
             db.session.commit()
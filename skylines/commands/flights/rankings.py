@@ -0,0 +1,13 @@
+from flask.ext.script import Command
+
+from skylines.model import db, RankingScore
+
+
+class RebuildRankings(Command):
+    """ Recompute the ranking scores of all pilots, clubs and airports """
+
+    def run(self):
+        count = RankingScore.rebuild()
+        db.session.commit()
+
+        print 'Ranking scores: {}'.format(count)
@@ -0,0 +1,13 @@
+from flask.ext.script import Command
+
+from skylines.model import db, FlightStatistics
+
+
+class RebuildStatistics(Command):
+    """ Recompute the flight statistics of all years """
+
+    def run(self):
+        count = FlightStatistics.rebuild()
+        db.session.commit()
+
+        print 'Flight statistics: {}'.format(count)
@@ -1,5 +1,6 @@
 from flask.ext.script import Manager
 
+from .airport_tiles import RebuildAirportTiles
 from .airspace import AirspaceCommand
 from .dmst_index import DMStIndex
 from .mwp import MWP
@@ -12,3 +13,4 @@ manager.add_command('dmst-index', DMStIndex())
 manager.add_command('mwp', MWP())
 manager.add_command('srtm', SRTM())
 manager.add_command('welt2000', Welt2000())
+manager.add_command('rebuild-airport-tiles', RebuildAirportTiles())
@@ -0,0 +1,13 @@
+from flask.ext.script import Command
+
+from skylines.model import db, AirportTile
+
+
+class RebuildAirportTiles(Command):
+    """ Recompute the airport lists of the map tiles """
+
+    def run(self):
+        count = AirportTile.rebuild()
+        db.session.commit()
+
+        print 'Changed airport tiles: {}'.format(count)
@@ -1,6 +1,6 @@
 from flask.ext.script import Command, Option
 
-from skylines.model import db, Airport
+from skylines.model import db, Airport, AirportTile
 from skylines.lib.waypoints.welt2000 import get_database
 from datetime import datetime
 from sqlalchemy.sql.expression import or_
@@ -71,6 +71,10 @@ class Welt2000(Command):
         if commit:
             db.session.commit()
 
+            print "Updating airport tiles..."
+            AirportTile.rebuild()
+            db.session.commit()
+
     def add_airport(self, airport_w2k):
         airport = Airport()
         self.update_airport(airport, airport_w2k)
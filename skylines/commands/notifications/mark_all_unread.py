@@ -1,5 +1,5 @@
 from flask.ext.script import Command
-from skylines.model import db, Notification
+from skylines.model import db, User, Notification
 
 
 class MarkAllUnread(Command):
@@ -7,4 +7,5 @@ class MarkAllUnread(Command):
 
     def run(self):
         Notification.query().update(dict(time_read=None))
+        User.query().update(dict(unread_notifications=None))
         db.session.commit()
@@ -1,6 +1,8 @@
 from flask.ext.script import Manager
 
 from .merge import Merge
+from .stats import RebuildStats
 
 manager = Manager(help="Perform operations related to user accounts")
 manager.add_command('merge', Merge())
+manager.add_command('rebuild-stats', RebuildStats())
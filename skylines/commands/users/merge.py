@@ -1,7 +1,9 @@
 from flask.ext.script import Command, Option
 
 import sys
-from skylines.model import db, User, Club, IGCFile, Flight, TrackingFix
+from sqlalchemy import or_
+from skylines.model import db, User, Club, IGCFile, Flight, TrackingFix, PilotStats, \
+    RankingScore, FlightStatistics, Notification, Event
 
 
 class Merge(Command):
@@ -25,11 +27,19 @@ class Merge(Command):
             print >>sys.stderr, "Different club;", old.club, new.club
             sys.exit(1)
 
+        statistics_keys = FlightStatistics.keys_for_pilot(old_id)
+
         db.session.query(Club).filter_by(owner_id=old_id).update({'owner_id': new_id})
         db.session.query(IGCFile).filter_by(owner_id=old_id).update({'owner_id': new_id})
         db.session.query(Flight).filter_by(pilot_id=old_id).update({'pilot_id': new_id})
         db.session.query(Flight).filter_by(co_pilot_id=old_id).update({'co_pilot_id': new_id})
         db.session.query(TrackingFix).filter_by(pilot_id=old_id).update({'pilot_id': new_id})
+        PilotStats.recompute([new_id])
+        RankingScore.update_entities(RankingScore.EntityType.PILOT,
+                                     [new_id, old_id])
+        FlightStatistics.update(statistics_keys | set(
+            (year, new_id, club_id, airport_id)
+            for year, pilot_id, club_id, airport_id in statistics_keys))
         db.session.flush()
         db.session.commit()
 
@@ -37,6 +47,8 @@ class Merge(Command):
         old = db.session.query(User).get(old_id)
         assert new and old
 
+        Notification.invalidate_unread_counts(
+            or_(Event.actor_id == old_id, Event.user_id == old_id))
         db.session.delete(old)
         db.session.flush()
 
@@ -0,0 +1,13 @@
+from flask.ext.script import Command
+
+from skylines.model import db, PilotStats
+
+
+class RebuildStats(Command):
+    """ Recompute the activity statistics of all users """
+
+    def run(self):
+        count = PilotStats.rebuild()
+        db.session.commit()
+
+        print 'Statistics of {} users rebuilt'.format(count)
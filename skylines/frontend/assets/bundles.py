@@ -106,6 +106,7 @@ all_js = Bundle(
     'vendor/jquery/jquery.cookie.js',
     'vendor/jquery/jquery.timeago.js',
     'js/general.js',
+    'js/typeahead.js',
     bootstrap_js,
     filters='rjsmin',
     output='js/skylines-%(version)s.js')
@@ -41,6 +41,16 @@ class ClubPilotsSelectField(GroupSelectField):
 
         super(ClubPilotsSelectField, self).process(*args, **kwargs)
 
+    def __call__(self, **kwargs):
+        # the members of large clubs can be found by typing their names
+        club_id = g.current_user.club_id
+        if club_id:
+            kwargs.setdefault('data-typeahead-club', club_id)
+            kwargs.setdefault('data-typeahead-placeholder',
+                              l_('Find a club member...'))
+
+        return super(ClubPilotsSelectField, self).__call__(**kwargs)
+
 
 class ChangePasswordForm(Form):
     current_password = PasswordField(l_('Current Password'))
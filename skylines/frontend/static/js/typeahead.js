@@ -0,0 +1,143 @@
+/**
+ * Shows the results of the /search/typeahead endpoint in a dropdown menu
+ * below a text field while the user is typing.
+ *
+ * @param {jQuery} input The text input field.
+ * @param {Object} options The `type` and `club` of the results and the
+ *   `select` callback, which is called with the chosen result.
+ */
+function initTypeahead(input, options) {
+  var menu = $('<ul class="dropdown-menu typeahead-menu"></ul>');
+  var request = null;
+  var results = [];
+  var active = -1;
+
+  input.attr('autocomplete', 'off').after(menu);
+  input.parent().css('position', 'relative');
+
+  function hide() {
+    menu.hide();
+    active = -1;
+  }
+
+  function show(data) {
+    results = data.results;
+    active = -1;
+
+    menu.empty();
+    $.each(results, function(i, result) {
+      var link = $('<a href="#"></a>').text(result.name);
+      link.on('mousedown', function(e) {
+        e.preventDefault();
+        choose(i);
+      });
+
+      menu.append($('<li></li>').append(link));
+    });
+
+    menu.toggle(results.length > 0);
+  }
+
+  function choose(i) {
+    hide();
+    if (i >= 0 && i < results.length) options.select(results[i]);
+  }
+
+  function highlight(i) {
+    active = (i + results.length) % results.length;
+    menu.children().removeClass('active').eq(active).addClass('active');
+  }
+
+  function update() {
+    var text = $.trim(input.val());
+    if (request) request.abort();
+
+    if (!text) {
+      hide();
+      return;
+    }
+
+    if (options.type) text = 'type:' + options.type + ' ' + text;
+
+    var params = { text: text };
+    if (options.club) params.club = options.club;
+
+    request = $.getJSON('/search/typeahead', params, show);
+  }
+
+  input.on('keydown', function(e) {
+    if (!menu.is(':visible')) return;
+
+    if (e.which == 40) {
+      highlight(active + 1);
+    } else if (e.which == 38) {
+      highlight(active - 1);
+    } else if (e.which == 13 && active >= 0) {
+      choose(active);
+    } else if (e.which == 27) {
+      hide();
+    } else {
+      return;
+    }
+
+    e.preventDefault();
+  });
+
+  input.on('input', update);
+  input.on('blur', hide);
+}
+
+
+/**
+ * Opens the page of the chosen result of the search field.
+ *
+ * @param {jQuery} input The search field.
+ */
+function initSearchTypeahead(input) {
+  var urls = {
+    User: '/users/',
+    Club: '/clubs/',
+    Airport: '/flights/airport/'
+  };
+
+  initTypeahead(input, {
+    select: function(result) {
+      window.location = urls[result.model] + result.id;
+    }
+  });
+}
+
+
+/**
+ * Adds a field above a pilot select box, which finds the pilots of the
+ * club by their name and selects the chosen one.
+ *
+ * @param {jQuery} select The pilot select box with a data-typeahead-club
+ *   attribute.
+ */
+function initPilotTypeahead(select) {
+  var input = $('<input type="text" class="form-control">')
+      .attr('placeholder', select.data('typeahead-placeholder'));
+
+  select.before($('<div class="typeahead-pilot"></div>').append(input));
+
+  initTypeahead(input, {
+    type: 'user',
+    club: select.data('typeahead-club'),
+    select: function(result) {
+      input.val(result.name);
+      select.val(result.id).trigger('change');
+    }
+  });
+}
+
+
+$(function() {
+  $('.navbar-search input[name=text]').each(function() {
+    initSearchTypeahead($(this));
+  });
+
+  $('select[data-typeahead-club]').each(function() {
+    initPilotTypeahead($(this));
+  });
+});
@@ -1,9 +1,63 @@
-from flask import Blueprint, current_app, send_from_directory
+from flask import (Blueprint, current_app, request, send_file,
+                   send_from_directory)
+
+from skylines.lib import files
+from skylines.model import IGCFile
 
 files_blueprint = Blueprint('files', 'skylines')
 
 
+def _send_igc_file(igc_file, filename):
+    path = igc_file.path
+    kwargs = dict(mimetype='text/plain', as_attachment=True,
+                  attachment_filename=filename, add_etags=False)
+
+    # the files are stored by the MD5 hash of their content, which makes it
+    # a strong ETag of the uncompressed file
+    etag = igc_file.md5
+
+    if not files.is_compressed(path):
+        response = send_file(path, **kwargs)
+
+    else:
+        if 'gzip' in request.accept_encodings:
+            # let the client decompress the stored file
+            response = send_file(path, **kwargs)
+            response.headers['Content-Encoding'] = 'gzip'
+            etag += '-gzip'
+        else:
+            response = send_file(igc_file.open(), **kwargs)
+
+        response.vary.add('Accept-Encoding')
+
+    response.set_etag(etag)
+    response = response.make_conditional(request)
+
+    # don't send x-sendfile for servers that ignore the 304 status code
+    if response.status_code == 304:
+        response.headers.pop('x-sendfile', None)
+
+    return response
+
+
+@files_blueprint.route('/<md5>/<filename>')
+def download(md5, filename):
+    igc_file = IGCFile.by_md5(md5)
+    if not igc_file:
+        # an old link into a subfolder of the files folder
+        return index(md5 + '/' + filename)
+
+    return _send_igc_file(igc_file, filename)
+
+
 @files_blueprint.route('/<path:filename>')
 def index(filename):
-    path = current_app.config.get('SKYLINES_FILES_PATH')
-    return send_from_directory(path, filename)
+    # old download links contain only the file name
+    igc_file = IGCFile.query(filename=filename) \
+        .order_by(IGCFile.id).first()
+    if igc_file:
+        return _send_igc_file(igc_file, filename)
+
+    # other links into the files folder keep working
+    return send_from_directory(
+        current_app.config['SKYLINES_FILES_PATH'], filename)
@@ -19,14 +19,16 @@ from skylines.lib.geo import METERS_PER_DEGREE
 from skylines.lib.achievements import COMMENT_ACHIEVEMENTS
 from skylines.model import (
     db, User, Flight, FlightPhase, Location, FlightComment,
-    Notification, Event
+    Notification, Event, PilotStats, RankingScore, FlightStatistics
 )
+from skylines.model.aircraft_lookup import update_aircraft_lookup
 from skylines.model.achievement import unlock_user_achievements
 from skylines.model.event import create_flight_comment_notifications
 from skylines.model.flight import get_elevations_for_flight
 from skylines.worker import tasks
 from redis.exceptions import ConnectionError
 from skylinespolyencode import SkyLinesPolyEncoder
+from .notifications import mark_notifications_read
 
 flight_blueprint = Blueprint('flight', 'skylines')
 
@@ -174,17 +176,6 @@ def format_phase(phase):
     return r
 
 
-def mark_flight_notifications_read(flight):
-    if not g.current_user:
-        return
-
-    def add_flight_filter(query):
-        return query.filter(Event.flight_id == flight.id)
-
-    Notification.mark_all_read(g.current_user, filter_func=add_flight_filter)
-    db.session.commit()
-
-
 @flight_blueprint.route('/')
 def index():
     def add_flight_path(flight):
@@ -193,7 +184,7 @@ def index():
 
     other_flights = map(add_flight_path, g.other_flights)
 
-    mark_flight_notifications_read(g.flight)
+    mark_notifications_read(flight_id=g.flight.id)
 
     return render_template(
         'flights/view.jinja',
@@ -215,7 +206,7 @@ def map_():
 
     other_flights = map(add_flight_path, g.other_flights)
 
-    mark_flight_notifications_read(g.flight)
+    mark_notifications_read(flight_id=g.flight.id)
 
     return render_template(
         'flights/map.jinja',
@@ -341,6 +332,10 @@ def change_pilot():
 
 
 def change_pilot_post(form):
+    old_pilot_ids = [g.flight.pilot_id, g.flight.co_pilot_id]
+    ranking_scores = RankingScore.scores_for_flight(g.flight)
+    statistics_key = FlightStatistics.key_for_flight(g.flight)
+
     pilot_id = form.pilot_id.data if form.pilot_id.data != 0 else None
     if g.flight.pilot_id != pilot_id:
         g.flight.pilot_id = pilot_id
@@ -355,6 +350,15 @@ def change_pilot_post(form):
     g.flight.co_pilot_name = form.co_pilot_name.data if form.co_pilot_name.data else None
 
     g.flight.time_modified = datetime.utcnow()
+
+    PilotStats.update_flight_stats(
+        old_pilot_ids + [g.flight.pilot_id, g.flight.co_pilot_id])
+
+    RankingScore.update([ranking_scores],
+                        [RankingScore.scores_for_flight(g.flight)])
+    FlightStatistics.update(
+        [statistics_key, FlightStatistics.key_for_flight(g.flight)])
+
     db.session.commit()
 
     return redirect(url_for('.index'))
@@ -402,10 +406,16 @@ def change_aircraft_post(form):
         if len(registration) == 0:
             registration = None
 
+    ranking_scores = RankingScore.scores_for_flight(g.flight)
+
     g.flight.model_id = form.model_id.data or None
     g.flight.registration = registration
     g.flight.competition_id = form.competition_id.data or None
     g.flight.time_modified = datetime.utcnow()
+    update_aircraft_lookup(g.flight)
+    PilotStats.update_flight_stats([g.flight.pilot_id, g.flight.co_pilot_id])
+    RankingScore.update([ranking_scores],
+                        [RankingScore.scores_for_flight(g.flight)])
     db.session.commit()
 
     return redirect(url_for('.index'))
@@ -417,9 +427,20 @@ def delete():
         abort(403)
 
     if request.method == 'POST':
-        files.delete_file(g.flight.igc_file.filename)
+        files.delete_file(g.flight.igc_file.md5, g.flight.igc_file.filename)
+        PilotStats.increment(g.flight.igc_file.owner_id, tracks_uploaded=-1)
+        PilotStats.remove_flight_comments([g.flight.id])
+
+        pilot_ids = [g.flight.pilot_id, g.flight.co_pilot_id]
+        ranking_scores = RankingScore.scores_for_flight(g.flight)
+        statistics_key = FlightStatistics.key_for_flight(g.flight)
+        Notification.invalidate_unread_counts(Event.flight_id == g.flight.id)
         db.session.delete(g.flight)
         db.session.delete(g.flight.igc_file)
+        PilotStats.update_flight_stats(pilot_ids)
+        RankingScore.update([ranking_scores])
+        FlightStatistics.update([statistics_key])
+
         db.session.commit()
 
         return redirect(url_for('flights.index'))
@@ -450,6 +471,7 @@ def add_comment():
 
     db.session.flush()
 
+    PilotStats.increment(g.current_user.id, comments_made=1)
     unlock_user_achievements(g.current_user, COMMENT_ACHIEVEMENTS)
 
     db.session.commit()
@@ -1,6 +1,7 @@
+import json
 from datetime import datetime
 
-from flask import Blueprint, request, render_template, redirect, url_for, abort, current_app, jsonify, g
+from flask import Blueprint, request, render_template, redirect, url_for, abort, current_app, g, Response
 from babel.dates import format_date
 
 from sqlalchemy import func
@@ -8,53 +9,30 @@ from sqlalchemy.sql.expression import or_, and_
 from sqlalchemy.orm import joinedload, contains_eager
 from sqlalchemy.orm.util import aliased
 
-from skylines.lib.datatables import GetDatatableRecords
+from skylines.lib.datatables import GetDatatableRecords, count_records
 from skylines.lib.dbutil import get_requested_record
 from skylines.lib.helpers import truncate, country_name, format_decimal
 from skylines.model import (
     db, User, Club, Flight, IGCFile, AircraftModel,
-    Airport, FlightComment,
-    Notification, Event,
+    Airport,
 )
+from .notifications import mark_notifications_read
 
 flights_blueprint = Blueprint('flights', 'skylines')
 
 
-def mark_flight_notifications_read(pilot):
-    if not g.current_user:
-        return
-
-    def add_flight_filter(query):
-        return query.filter(Event.actor_id == pilot.id)
-
-    Notification.mark_all_read(g.current_user, filter_func=add_flight_filter)
-    db.session.commit()
-
-
 def _create_list(tab, kw, date=None, pilot=None, club=None, airport=None,
                  pinned=None, filter=None, columns=None):
     pilot_alias = aliased(User, name='pilot')
     owner_alias = aliased(User, name='owner')
 
-    subq = db.session \
-        .query(FlightComment.flight_id, func.count('*').label('count')) \
-        .group_by(FlightComment.flight_id).subquery()
-
-    flights = db.session.query(Flight, subq.c.count) \
+    flights = db.session.query(Flight) \
         .join(Flight.igc_file) \
-        .options(contains_eager(Flight.igc_file)) \
         .join(owner_alias, IGCFile.owner) \
-        .options(contains_eager(Flight.igc_file, IGCFile.owner, alias=owner_alias)) \
         .outerjoin(pilot_alias, Flight.pilot) \
-        .options(contains_eager(Flight.pilot, alias=pilot_alias)) \
-        .options(joinedload(Flight.co_pilot)) \
         .outerjoin(Flight.club) \
-        .options(contains_eager(Flight.club)) \
         .outerjoin(Flight.takeoff_airport) \
-        .options(contains_eager(Flight.takeoff_airport)) \
-        .outerjoin(Flight.model) \
-        .options(contains_eager(Flight.model)) \
-        .outerjoin((subq, Flight.comments))
+        .outerjoin(Flight.model)
 
     if date:
         flights = flights.filter(Flight.date_local == date)
@@ -89,41 +67,45 @@ def _create_list(tab, kw, date=None, pilot=None, club=None, airport=None,
                 9: (Flight, 'num_comments'),
             }
 
-        flights, response_dict = GetDatatableRecords(kw, flights, columns)
-
-        aaData = []
-        for flight, num_comments in flights:
-            aaData.append(dict(takeoff_time=flight.takeoff_time.strftime('%H:%M'),
-                               landing_time=flight.landing_time.strftime('%H:%M'),
-                               date=flight.date_local.strftime('%d.%m.%Y'),
-                               date_formatted=format_date(flight.date_local),
-                               index_score=format_decimal(flight.index_score, format='0'),
-                               olc_classic_distance=flight.olc_classic_distance,
-                               pilot_id=flight.pilot_id,
-                               pilot=flight.pilot and flight.pilot.name,
-                               pilot_name=flight.pilot_name,
-                               co_pilot_id=flight.co_pilot_id,
-                               co_pilot=flight.co_pilot and flight.co_pilot.name,
-                               co_pilot_name=flight.co_pilot_name,
-                               club_id=flight.club_id,
-                               club=flight.club and truncate(flight.club.name, 25),
-                               owner=flight.igc_file.owner.name,
-                               takeoff_airport=flight.takeoff_airport and flight.takeoff_airport.name,
-                               takeoff_airport_id=flight.takeoff_airport and flight.takeoff_airport.id,
-                               takeoff_airport_country_code=flight.takeoff_airport and flight.takeoff_airport.country_code.lower(),
-                               takeoff_airport_country_name=flight.takeoff_airport and country_name(flight.takeoff_airport.country_code),
-                               aircraft=(flight.model and flight.model.name) or (flight.igc_file.model and '[' + flight.igc_file.model + ']'),
-                               aircraft_reg=flight.registration or flight.igc_file.registration or "Unknown",
-                               flight_id=flight.id,
-                               num_comments=num_comments))
-
-        return jsonify(aaData=aaData, **response_dict)
+        # select only the columns of the JSON records instead of all
+        # the flight, file, user, club, airport and model objects
+        co_pilot_alias = aliased(User, name='co_pilot')
+
+        flights = flights.outerjoin(co_pilot_alias, Flight.co_pilot) \
+            .with_entities(
+                Flight.id, Flight.date_local, Flight.takeoff_time,
+                Flight.landing_time, Flight.index_score,
+                Flight.olc_classic_distance,
+                Flight.pilot_id, pilot_alias.name, Flight.pilot_name,
+                Flight.co_pilot_id, co_pilot_alias.name, Flight.co_pilot_name,
+                Flight.club_id, Club.name, owner_alias.name,
+                Airport.id, Airport.name, Airport.country_code,
+                AircraftModel.name, IGCFile.model,
+                Flight.registration, IGCFile.registration,
+                Flight.num_comments)
+
+        flights, response_dict = GetDatatableRecords(
+            kw, flights, columns, unique_column=Flight.id)
+
+        response_dict['aaData'] = _format_list_records(flights)
+
+        return Response(json.dumps(response_dict, separators=(',', ':')),
+                        mimetype='application/json')
 
     else:
         if not date:
             flights = flights.order_by(Flight.date_local.desc())
 
-        flights_count = flights.count()
+        flights = flights \
+            .options(contains_eager(Flight.igc_file)) \
+            .options(contains_eager(Flight.igc_file, IGCFile.owner, alias=owner_alias)) \
+            .options(contains_eager(Flight.pilot, alias=pilot_alias)) \
+            .options(joinedload(Flight.co_pilot)) \
+            .options(contains_eager(Flight.club)) \
+            .options(contains_eager(Flight.takeoff_airport)) \
+            .options(contains_eager(Flight.model))
+
+        flights_count = count_records(flights)
         if flights_count > int(current_app.config.get('SKYLINES_LISTS_SERVER_SIDE', 250)):
             limit = int(current_app.config.get('SKYLINES_LISTS_DISPLAY_LENGTH', 50))
         else:
@@ -138,6 +120,63 @@ def _create_list(tab, kw, date=None, pilot=None, club=None, airport=None,
                                flights_count=flights_count)
 
 
+def _format_list_records(rows):
+    """Returns the JSON records of the flight list rows. Dates, clubs and
+    countries are usually repeated in a list and only formatted once."""
+
+    dates = {}
+    clubs = {}
+    countries = {}
+
+    records = []
+    for (flight_id, date_local, takeoff_time, landing_time, index_score,
+         olc_classic_distance, pilot_id, pilot, pilot_name,
+         co_pilot_id, co_pilot, co_pilot_name, club_id, club, owner,
+         airport_id, airport, country_code, model, igc_model,
+         registration, igc_registration, num_comments) in rows:
+
+        if date_local not in dates:
+            dates[date_local] = (date_local.strftime('%d.%m.%Y'),
+                                 format_date(date_local))
+
+        if club_id not in clubs:
+            clubs[club_id] = club and truncate(club, 25)
+
+        if country_code not in countries:
+            countries[country_code] = country_code and \
+                (country_code.lower(), country_name(country_code))
+
+        date_text, date_formatted = dates[date_local]
+        country = countries[country_code] or (None, None)
+
+        records.append(dict(
+            takeoff_time=takeoff_time.strftime('%H:%M'),
+            landing_time=landing_time.strftime('%H:%M'),
+            date=date_text,
+            date_formatted=date_formatted,
+            index_score=format_decimal(index_score, format='0'),
+            olc_classic_distance=olc_classic_distance,
+            pilot_id=pilot_id,
+            pilot=pilot,
+            pilot_name=pilot_name,
+            co_pilot_id=co_pilot_id,
+            co_pilot=co_pilot,
+            co_pilot_name=co_pilot_name,
+            club_id=club_id,
+            club=clubs[club_id],
+            owner=owner,
+            takeoff_airport=airport,
+            takeoff_airport_id=airport_id,
+            takeoff_airport_country_code=country[0],
+            takeoff_airport_country_name=country[1],
+            aircraft=model or (igc_model and '[' + igc_model + ']'),
+            aircraft_reg=registration or igc_registration or "Unknown",
+            flight_id=flight_id,
+            num_comments=num_comments))
+
+    return records
+
+
 @flights_blueprint.route('/all.json')
 @flights_blueprint.route('/all')
 def all():
@@ -207,7 +246,7 @@ def pilot(id):
     pilot = get_requested_record(User, id)
     pilot_alias = aliased(User, name='pilot')
 
-    mark_flight_notifications_read(pilot)
+    mark_notifications_read(actor_id=pilot.id)
 
     columns = {
         0: (Flight, 'date_local'),
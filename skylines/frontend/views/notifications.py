@@ -1,13 +1,26 @@
-from flask import Blueprint, render_template, abort, request, url_for, redirect, g
+from datetime import datetime
+
+from flask import Blueprint, render_template, abort, request, url_for, redirect, g, current_app
 from sqlalchemy.orm import subqueryload, contains_eager
+from sqlalchemy.sql.expression import tuple_
 
 from skylines.lib.util import str_to_bool
 from skylines.model import db
-from skylines.model.event import Event, Notification, group_events
+from skylines.model.event import (
+    Event, Notification, group_events, filter_events
+)
+from skylines.worker import tasks
+from redis.exceptions import ConnectionError
 
 
 notifications_blueprint = Blueprint('notifications', 'skylines')
 
+# time in seconds until the same notifications are queued for being
+# marked as read again
+MARK_READ_TIMEOUT = 60
+
+CURSOR_TIME_FORMAT = '%Y%m%dT%H%M%S.%f'
+
 
 @notifications_blueprint.before_app_request
 def inject_notification_count():
@@ -18,6 +31,37 @@ def inject_notification_count():
         g.count_unread_notifications = count_unread_notifications
 
 
+def mark_notifications_read(**event_filter):
+    """
+    Marks the notifications of the current user about the events with the
+    given attribute values (e.g. `flight_id`) as read.
+
+    The notifications are marked by the worker, so that viewing a page
+    doesn't write to the database. Nothing is queued if there are no
+    matching unread notifications, or if the same notifications have been
+    queued within the last `MARK_READ_TIMEOUT` seconds.
+    """
+
+    if not g.current_user:
+        return
+
+    filter_func = filter_events(**event_filter)
+    if not Notification.has_unread(g.current_user, filter_func=filter_func):
+        return
+
+    key = 'mark_read_{}_{}'.format(
+        g.current_user.id, sorted(event_filter.iteritems()))
+    if not current_app.cache.add(key, True, timeout=MARK_READ_TIMEOUT):
+        return
+
+    try:
+        tasks.mark_notifications_read.delay(g.current_user.id, **event_filter)
+    except ConnectionError:
+        current_app.logger.info('Cannot connect to Redis server')
+        Notification.mark_all_read(g.current_user, filter_func=filter_func)
+        db.session.commit()
+
+
 def _filter_query(query, args):
     type_ = args.get('type', type=int)
     if type_:
@@ -27,9 +71,72 @@ def _filter_query(query, args):
     if user:
         query = query.filter(Event.actor_id == user)
 
+    club = args.get('club', type=int)
+    if club:
+        query = query.filter(Event.club_id == club)
+
     return query
 
 
+def _encode_cursor(event):
+    return '{}_{}'.format(event.time.strftime(CURSOR_TIME_FORMAT), event.id)
+
+
+def _decode_cursor(cursor):
+    try:
+        time, id = cursor.split('_')
+        return datetime.strptime(time, CURSOR_TIME_FORMAT), int(id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _paginate_query(query, args, per_page):
+    """
+    Returns the rows of the requested page of the query, which has to
+    select or join the events, and whether there are newer and older
+    pages.
+
+    Instead of skipping the rows of all previous pages with an OFFSET, the
+    pages are selected by the (time, id) of the event before (`before`)
+    or after (`after`) the page, which is passed as cursor argument.
+    """
+
+    before = _decode_cursor(args.get('before'))
+    after = _decode_cursor(args.get('after')) if not before else None
+
+    key = tuple_(Event.time, Event.id)
+    if after:
+        query = query.filter(key > tuple_(*after)) \
+            .order_by(Event.time, Event.id)
+    else:
+        if before:
+            query = query.filter(key < tuple_(*before))
+
+        query = query.order_by(Event.time.desc(), Event.id.desc())
+
+    rows = query.limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    if after:
+        rows.reverse()
+        return rows, more, True
+    else:
+        return rows, before is not None, more
+
+
+def _get_pager_vars(events, newer, older):
+    pager_vars = {}
+
+    if events and newer:
+        pager_vars['newer'] = _encode_cursor(events[0])
+    if events and older:
+        pager_vars['older'] = _encode_cursor(events[-1])
+
+    return pager_vars
+
+
 @notifications_blueprint.route('/')
 def index():
     if not g.current_user:
@@ -39,34 +146,27 @@ def index():
         .join('event') \
         .options(contains_eager('event')) \
         .options(subqueryload('event.actor')) \
-        .options(subqueryload('event.flight')) \
-        .order_by(Event.time.desc())
+        .options(subqueryload('event.flight'))
 
     query = _filter_query(query, request.args)
 
-    page = request.args.get('page', type=int, default=1)
     per_page = request.args.get('per_page', type=int, default=50)
-
-    query = query.limit(per_page)
-    query = query.offset((page - 1) * per_page)
+    notifications, newer, older = \
+        _paginate_query(query, request.args, per_page)
 
     def get_event(notification):
         event = notification.event
         event.unread = (notification.time_read is None)
         return event
 
-    events = map(get_event, query)
-    events_count = len(events)
+    events = map(get_event, notifications)
+
+    template_vars = _get_pager_vars(events, newer, older)
 
     if request.args.get('grouped', True, type=str_to_bool):
         events = group_events(events)
 
-    template_vars = dict(events=events, types=Event.Type)
-
-    if page > 1:
-        template_vars['prev_page'] = page - 1
-    if events_count == per_page:
-        template_vars['next_page'] = page + 1
+    template_vars.update(events=events, types=Event.Type)
 
     return render_template('notifications/list.jinja', **template_vars)
 
@@ -1,49 +1,88 @@
 from datetime import date
 
-from flask import Blueprint, request, redirect, url_for, render_template
-from sqlalchemy import func
-from sqlalchemy.sql.expression import desc, over
+from flask import (
+    Blueprint, request, redirect, url_for, render_template, g, current_app
+)
+from sqlalchemy.sql.expression import desc, and_
 from sqlalchemy.orm import subqueryload
 
-from skylines.model import db, User, Club, Flight, Airport
+from skylines.model import db, User, Club, Airport, RankingScore
 from skylines.lib.paginate import Pager
 
 ranking_blueprint = Blueprint('ranking', 'skylines')
 
 
-def _get_result(model, flight_field, year=None):
-    subq = db.session \
-        .query(getattr(Flight, flight_field),
-               func.count('*').label('count'),
-               func.sum(Flight.index_score).label('total')) \
-        .group_by(getattr(Flight, flight_field)) \
-        .outerjoin(Flight.model)
-
-    if isinstance(year, int):
-        year_start = date(year, 1, 1)
-        year_end = date(year, 12, 31)
-        subq = subq.filter(Flight.date_local >= year_start) \
-                   .filter(Flight.date_local <= year_end)
-
-    subq = subq.subquery()
-
+def _get_result(model, entity_type, year):
     result = db.session \
-        .query(model, subq.c.count, subq.c.total,
-               over(func.rank(), order_by=desc('total')).label('rank')) \
-        .join((subq, getattr(subq.c, flight_field) == model.id))
+        .query(model, RankingScore.count, RankingScore.total) \
+        .join((RankingScore, and_(RankingScore.entity_id == model.id,
+                                  RankingScore.entity_type == entity_type,
+                                  RankingScore.year == year)))
 
     if model == User:
         result = result.options(subqueryload(model.club))
 
-    result = result.order_by(desc('total'))
+    result = result.order_by(desc(RankingScore.total), model.id)
+    return result
+
+
+def _get_count(model, entity_type, year):
+    """Returns the number of rows of a ranking, which is cached to avoid
+    counting them for every page"""
+
+    key = 'ranking_count_{}_{}'.format(entity_type, year)
+
+    count = current_app.cache.get(key)
+    if count is None:
+        count = _get_result(model, entity_type, year).order_by(None).count()
+        current_app.cache.set(key, count, timeout=int(
+            current_app.config.get('SKYLINES_LISTS_COUNT_TIMEOUT', 600)))
+
+    return count
+
+
+def _add_ranks(rows, model, entity_type, year, offset):
+    """Appends the rank to the rows of a ranking page
+
+    Only the rank of the first row is counted in the database, the ranks
+    of the following rows are derived from their position.
+    """
+    if not rows:
+        return []
+
+    first_total = rows[0][2]
+
+    rank = db.session.query(RankingScore) \
+        .join((model, model.id == RankingScore.entity_id)) \
+        .filter(RankingScore.entity_type == entity_type) \
+        .filter(RankingScore.year == year) \
+        .filter(RankingScore.total > first_total) \
+        .count() + 1
+
+    result = []
+    for i, (entity, count, total) in enumerate(rows):
+        if total != first_total:
+            first_total = total
+            rank = offset + i + 1
+
+        result.append((entity, count, total, rank))
+
     return result
 
 
-def _handle_request(model, flight_field):
+def _handle_request(model, entity_type):
     current_year = date.today().year
     year = _parse_year()
-    result = _get_result(model, flight_field, year=year)
-    result = Pager.paginate(result, 'result')
+    score_year = year if isinstance(year, int) else RankingScore.ALL_TIME
+
+    result = _get_result(model, entity_type, score_year)
+    count = _get_count(model, entity_type, score_year)
+    result = Pager.paginate(result, 'result', count=count)
+
+    pager = g.paginators['result']
+    offset = (pager.page - 1) * pager.items_per_page
+    result = _add_ranks(result.all(), model, entity_type, score_year, offset)
+
     return dict(year=year, current_year=current_year, result=result)
 
 
@@ -69,18 +108,18 @@ def index():
 def pilots():
     return render_template('ranking/pilots.jinja',
                            active_header_tab='pilots',
-                           **_handle_request(User, 'pilot_id'))
+                           **_handle_request(User, RankingScore.EntityType.PILOT))
 
 
 @ranking_blueprint.route('/clubs')
 def clubs():
     return render_template('ranking/clubs.jinja',
                            active_header_tab='clubs',
-                           **_handle_request(Club, 'club_id'))
+                           **_handle_request(Club, RankingScore.EntityType.CLUB))
 
 
 @ranking_blueprint.route('/airports')
 def airports():
     return render_template('ranking/airports.jinja',
                            active_header_tab='airports',
-                           **_handle_request(Airport, 'takeoff_airport_id'))
+                           **_handle_request(Airport, RankingScore.EntityType.AIRPORT))
@@ -1,9 +1,9 @@
-from flask import Blueprint, request, render_template
+from flask import Blueprint, request, render_template, jsonify
 
 from skylines.model import User, Club, Airport
 from skylines.model.search import (
     combined_search_query, text_to_tokens, escape_tokens,
-    process_result_details
+    process_result_details, process_type_option, typeahead
 )
 
 search_blueprint = Blueprint('search', 'skylines')
@@ -32,3 +32,18 @@ def index():
     return render_template('search/list.jinja',
                            search_text=search_text,
                            results=results)
+
+
+@search_blueprint.route('/typeahead')
+def typeahead_json():
+    search_text = request.values.get('text', '').strip()
+    club_id = request.values.get('club', type=int)
+    limit = max(1, min(request.values.get('limit', 10, type=int), 20))
+
+    # Filter the models by the type: tokens
+    models, tokens = process_type_option(MODELS, text_to_tokens(search_text))
+
+    results = typeahead(models, ' '.join(tokens), limit=limit, group=club_id)
+
+    return jsonify(results=[dict(model=model, id=id, name=name)
+                            for model, id, name in results])
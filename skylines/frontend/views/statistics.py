@@ -1,8 +1,11 @@
+from datetime import timedelta
+
 from flask import Blueprint, render_template, abort
-from sqlalchemy import func, distinct
 
 from skylines.lib.dbutil import get_requested_record
-from skylines.model import db, User, Club, Flight, Airport
+from skylines.model import (
+    User, Club, Airport, FlightStatistics, YearStatistics
+)
 
 statistics_blueprint = Blueprint('statistics', 'skylines')
 
@@ -14,28 +17,23 @@ def index(page=None, id=None):
     pilot = None
     airport = None
 
-    query = db.session.query(Flight.year.label('year'),
-                             func.count('*').label('flights'),
-                             func.count(distinct(Flight.pilot_id)).label('pilots'),
-                             func.sum(Flight.olc_classic_distance).label('distance'),
-                             func.sum(Flight.duration).label('duration'))
-
     if page == 'pilot':
         pilot = get_requested_record(User, id)
-        query = query.filter(Flight.pilot_id == pilot.id)
+        query = FlightStatistics.by_year(pilot_id=pilot.id)
 
     elif page == 'club':
         club = get_requested_record(Club, id)
-        query = query.filter(Flight.club_id == club.id)
+        query = FlightStatistics.by_year(club_id=club.id)
 
     elif page == 'airport':
         airport = get_requested_record(Airport, id)
-        query = query.filter(Flight.takeoff_airport_id == airport.id)
+        query = FlightStatistics.by_year(takeoff_airport_id=airport.id)
 
-    elif page is not None:
-        abort(404)
+    elif page is None:
+        query = YearStatistics.by_year()
 
-    query = query.group_by(Flight.year).order_by(Flight.year.desc())
+    else:
+        abort(404)
 
     max_flights = 1
     max_pilots = 1
@@ -47,20 +45,26 @@ def index(page=None, id=None):
     sum_duration = 0
 
     list = []
-    for row in query:
-        row.average_distance = row.distance / row.flights
-        row.average_duration = row.duration / row.flights
+    for year, flights, pilots, distance, duration in query:
+        row = dict(year=year,
+                   flights=int(flights),
+                   pilots=int(pilots),
+                   distance=int(distance),
+                   duration=timedelta(seconds=int(duration)))
+
+        row['average_distance'] = row['distance'] / row['flights']
+        row['average_duration'] = row['duration'] / row['flights']
 
         list.append(row)
 
-        max_flights = max(max_flights, row.flights)
-        max_pilots = max(max_pilots, row.pilots)
-        max_distance = max(max_distance, row.distance)
-        max_duration = max(max_duration, row.duration.total_seconds())
+        max_flights = max(max_flights, row['flights'])
+        max_pilots = max(max_pilots, row['pilots'])
+        max_distance = max(max_distance, row['distance'])
+        max_duration = max(max_duration, row['duration'].total_seconds())
 
-        sum_flights = sum_flights + row.flights
-        sum_distance = sum_distance + row.distance
-        sum_duration = sum_duration + row.duration.total_seconds()
+        sum_flights = sum_flights + row['flights']
+        sum_distance = sum_distance + row['distance']
+        sum_duration = sum_duration + row['duration'].total_seconds()
 
     return render_template('statistics/years.jinja',
                            years=list,
@@ -1,41 +1,92 @@
-from flask import Blueprint, render_template, request
+from flask import Blueprint, render_template, request, g, current_app
+from flask.ext.babel import get_locale
+from jinja2 import Markup
 from sqlalchemy.orm import subqueryload
+from werkzeug.datastructures import MultiDict
 
 from skylines.lib.util import str_to_bool
+from skylines.model import User
 from skylines.model.event import Event, group_events
-from .notifications import _filter_query
+from .notifications import (
+    _filter_query, _paginate_query, _get_pager_vars, _decode_cursor
+)
 
 timeline_blueprint = Blueprint('timeline', 'skylines')
 
+# time in seconds that the timeline pages are cached for anonymous users
+TIMELINE_CACHE_TIMEOUT = 60
 
-@timeline_blueprint.route('/')
-def index():
+TIMELINE_MAX_PER_PAGE = 100
+
+
+def _parse_args():
+    """Returns the validated arguments of the timeline, which are all that
+    the rendered events depend on"""
+
+    per_page = request.args.get('per_page', type=int, default=50)
+
+    args = dict(
+        type=request.args.get('type', type=int),
+        user=request.args.get('user', type=int),
+        club=request.args.get('club', type=int),
+        per_page=max(1, min(per_page, TIMELINE_MAX_PER_PAGE)),
+        grouped=request.args.get('grouped', True, type=str_to_bool),
+    )
+
+    # only the first valid cursor is used by _paginate_query()
+    for name in ('before', 'after'):
+        cursor = request.args.get(name)
+        if _decode_cursor(cursor):
+            args[name] = cursor
+            break
+
+    return args
+
+
+def _render_events(args):
     query = Event.query() \
         .options(subqueryload('actor')) \
         .options(subqueryload('user')) \
         .options(subqueryload('club')) \
-        .options(subqueryload('flight')) \
-        .order_by(Event.time.desc())
+        .options(subqueryload('flight'))
 
-    query = _filter_query(query, request.args)
+    filter_args = MultiDict((name, value) for name, value in args.iteritems()
+                            if value is not None)
 
-    page = request.args.get('page', type=int, default=1)
-    per_page = request.args.get('per_page', type=int, default=50)
+    query = _filter_query(query, filter_args)
 
-    query = query.limit(per_page)
-    query = query.offset((page - 1) * per_page)
+    events, newer, older = \
+        _paginate_query(query, filter_args, args['per_page'])
 
-    events = query.all()
-    events_count = len(events)
+    template_vars = _get_pager_vars(events, newer, older)
 
-    if request.args.get('grouped', True, type=str_to_bool):
+    if args['grouped']:
         events = group_events(events)
 
-    template_vars = dict(events=events, types=Event.Type)
+    template_vars.update(events=events, types=Event.Type)
+
+    return render_template('timeline/events.jinja', **template_vars)
+
+
+@timeline_blueprint.route('/')
+def index():
+    args = _parse_args()
+
+    if g.current_user:
+        content = _render_events(args)
+    else:
+        # the timeline looks the same for all anonymous users, so the
+        # rendered events are shared by all of them for a short time
+        key = 'timeline_{}_{}'.format(get_locale(), sorted(args.iteritems()))
+
+        content = current_app.cache.get(key)
+        if content is None:
+            content = _render_events(args)
+            current_app.cache.set(key, content, timeout=TIMELINE_CACHE_TIMEOUT)
 
-    if page > 1:
-        template_vars['prev_page'] = page - 1
-    if events_count == per_page:
-        template_vars['next_page'] = page + 1
+    actor = args['user']
+    if actor:
+        actor = User.get(actor)
 
-    return render_template('timeline/list.jinja', **template_vars)
+    return render_template(
+        'timeline/list.jinja', content=Markup(content), actor=actor)
@@ -9,10 +9,12 @@ from redis.exceptions import ConnectionError
 from skylines.frontend.forms import UploadForm, AircraftModelSelectField
 from skylines.lib import files
 from skylines.lib.decorators import login_required
-from skylines.lib.md5 import file_md5
 from skylines.lib.xcsoar_ import analyse_flight
-from skylines.model import db, User, Flight, IGCFile
+from skylines.model import (
+    db, User, Flight, IGCFile, PilotStats, RankingScore, FlightStatistics
+)
 from skylines.lib.achievements import UPLOAD_ACHIEVEMENTS
+from skylines.model.aircraft_lookup import update_aircraft_lookup
 from skylines.model.event import create_flight_notifications
 from skylines.model.achievement import unlock_user_achievements
 from skylines.worker import tasks
@@ -60,6 +62,16 @@ def IterateUploadFiles(upload):
             yield x
 
 
+def _delete_rejected_file(md5):
+    # the files are stored by their content, so the file might belong to
+    # a concurrent upload of the same file that has been accepted already
+    with db.session.no_autoflush:
+        if IGCFile.by_md5(md5):
+            return
+
+    files.delete_file(md5)
+
+
 @upload_blueprint.route('/', methods=('GET', 'POST'))
 @login_required(l_("You have to login to upload flights."))
 def index():
@@ -84,18 +96,22 @@ def index_post(form):
     flights = []
     success = False
 
-    for name, f in IterateUploadFiles(form.file.raw_data):
-        filename = files.sanitise_filename(name)
-        filename = files.add_file(filename, f)
+    # hash all uploaded files while writing them to temporary files
+    uploads = [(name,) + files.write_temporary_file(f)
+               for name, f in IterateUploadFiles(form.file.raw_data)]
+
+    # check which of the files already exist
+    existing_flights = Flight.by_md5s([upload[2] for upload in uploads])
 
-        # check if the file already exists
-        with files.open_file(filename) as f:
-            md5 = file_md5(f)
-            other = Flight.by_md5(md5)
-            if other:
-                files.delete_file(filename)
-                flights.append((name, other, _('Duplicate file')))
-                continue
+    for name, path, md5 in uploads:
+        other = existing_flights.get(md5)
+        if other:
+            files.delete_temporary_file(path)
+            flights.append((name, other, _('Duplicate file')))
+            continue
+
+        files.store_temporary_file(path, md5)
+        filename = files.sanitise_filename(name)
 
         igc_file = IGCFile()
         igc_file.owner = user
@@ -104,7 +120,7 @@ def index_post(form):
         igc_file.update_igc_headers()
 
         if igc_file.date_utc is None:
-            files.delete_file(filename)
+            _delete_rejected_file(md5)
             flights.append((name, None, _('Date missing in IGC file')))
             continue
 
@@ -124,17 +140,17 @@ def index_post(form):
         flight.competition_id = igc_file.competition_id
 
         if not analyse_flight(flight):
-            files.delete_file(filename)
+            _delete_rejected_file(md5)
             flights.append((name, None, _('Failed to parse file')))
             continue
 
         if not flight.takeoff_time or not flight.landing_time:
-            files.delete_file(filename)
+            _delete_rejected_file(md5)
             flights.append((name, None, _('No flight found in file')))
             continue
 
         if not flight.update_flight_path():
-            files.delete_file(filename)
+            _delete_rejected_file(md5)
             flights.append((name, None, _('No flight found in file')))
             continue
 
@@ -144,13 +160,27 @@ def index_post(form):
 
         create_flight_notifications(flight)
 
-        # flush data to make sure we don't get duplicate files from ZIP files
-        db.session.flush()
+        # detect duplicate files within ZIP files
+        existing_flights[md5] = flight
 
         success = True
 
     db.session.flush()
 
+    new_flights = [entry[1] for entry in flights if entry[2] is None]
+    for flight in new_flights:
+        update_aircraft_lookup(flight)
+
+    PilotStats.increment(user.id, tracks_uploaded=len(new_flights))
+    PilotStats.update_flight_stats(
+        new_flight.pilot_id for new_flight in new_flights)
+    RankingScore.update(new_scores=[
+        RankingScore.scores_for_flight(new_flight)
+        for new_flight in new_flights])
+    FlightStatistics.update(
+        FlightStatistics.key_for_flight(new_flight)
+        for new_flight in new_flights)
+
     unlock_user_achievements(user, UPLOAD_ACHIEVEMENTS)
 
     db.session.commit()
@@ -223,11 +253,18 @@ def update():
 
         # Set new values
 
+        ranking_scores = RankingScore.scores_for_flight(flight)
+
         flight.model_id = model_id
         flight.registration = registration
         flight.competition_id = competition_id
         flight.time_modified = datetime.utcnow()
 
+        update_aircraft_lookup(flight)
+        PilotStats.update_flight_stats([flight.pilot_id, flight.co_pilot_id])
+        RankingScore.update([ranking_scores],
+                            [RankingScore.scores_for_flight(flight)])
+
     db.session.commit()
 
     flash(_('Your flight(s) have been successfully updated.'))
@@ -9,10 +9,11 @@ from sqlalchemy.orm import contains_eager, subqueryload
 from skylines.lib.dbutil import get_requested_record
 from skylines.lib.achievements import FOLLOW_ACHIEVEMENTS, FOLLOWER_ACHIEVEMENTS
 from skylines.model import (
-    db, User, Flight, Follower, Location, Notification, Event
+    db, User, Flight, Follower, Location
 )
 from skylines.model.event import create_follower_notification
 from skylines.model.achievement import unlock_user_achievements
+from .notifications import mark_notifications_read
 
 user_blueprint = Blueprint('user', 'skylines')
 
@@ -88,20 +89,9 @@ def _get_takeoff_locations():
                                             filter=(Flight.pilot == g.user))
 
 
-def mark_user_notifications_read(user):
-    if not g.current_user:
-        return
-
-    def add_user_filter(query):
-        return query.filter(Event.actor_id == user.id)
-
-    Notification.mark_all_read(g.current_user, filter_func=add_user_filter)
-    db.session.commit()
-
-
 @user_blueprint.route('/')
 def index():
-    mark_user_notifications_read(g.user)
+    mark_notifications_read(actor_id=g.user.id)
 
     return render_template(
         'users/view.jinja',
@@ -1,16 +1,10 @@
 import itertools
-import bisect
 
+import numpy
 from flask.ext.babel import _
-from sqlalchemy import func, distinct
-
-from skylines.model import db
-from skylines.model.flight import Flight, get_elevations_for_flight
-from skylines.model.airport import Airport
-from skylines.model.igcfile import IGCFile
-from skylines.model.follower import Follower
-from skylines.model.flight_comment import FlightComment
+
 from skylines.model.flight_phase import FlightPhase
+from skylines.model.pilot_stats import PilotStats
 
 from skylines.lib.decorators import reify
 
@@ -18,9 +12,14 @@ from skylines.lib.decorators import reify
 class FlightMetrics(object):
     """Collect information useful for detecting achievements.
 
+    The fixes and ground elevations are taken from the shared `trajectory`
+    context, that is created for the flight if not passed in.
     """
-    def __init__(self, flight):
+    def __init__(self, flight, trajectory=None):
+        from skylines.lib.trajectory import FlightTrajectory
+
         self.flight = flight
+        self.trajectory = trajectory or FlightTrajectory(flight)
 
     @reify
     def distance(self):
@@ -77,45 +76,39 @@ class FlightMetrics(object):
             # as first phase. That might not be too reliable though.
             return 0
 
-        start_sod = self._release_time
+        start_sod = self._release_time or 0
+
+        times = self.trajectory.times
+        altitudes = self.trajectory.altitudes
 
-        fpath = self._flight_path
-        if not fpath:
+        start_idx = numpy.searchsorted(times, start_sod, side='right')
+        if start_idx >= len(times):
             return 0
 
-        start_idx = bisect.bisect([f.seconds_of_day for f in fpath], start_sod)
-        release_alt = fpath[start_idx].altitude
-        max_alt = max(f.altitude for f in fpath[start_idx:])
+        release_alt = altitudes[start_idx]
+        max_alt = altitudes[start_idx:].max()
 
-        return max(max_alt - release_alt, 0)
+        return max(int(max_alt - release_alt), 0)
 
     @reify
     def time_below_400_m(self):
         """Time (in seconds) below 400 m AGL
         """
         TARGET_AGL = 140
-        last_ts = None
-        time_below_target = 0
 
-        for ts, agl in self._agls:
-            if self._release_time and ts < self._release_time:
-                # Do not count time before release
-                continue
+        times, agls = self.trajectory.agls
 
-            if last_ts is None:
-                # Skip first record - we don't know how long it lasted
-                last_ts = ts
-                continue
+        if self._release_time:
+            # Do not count time before release
+            mask = times >= self._release_time
+            times, agls = times[mask], agls[mask]
 
-            if agl < TARGET_AGL:
-                # We assume pilot spent at `agl` all the time, since the last
-                # fix.  Fixes are usually separated by short amount of time
-                # (1-5s), so this is acceptable approximation.
-                time_below_target += ts - last_ts
-
-            last_ts = ts
-
-        return time_below_target
+        # We assume pilot spent at `agl` all the time, since the last fix.
+        # Fixes are usually separated by short amount of time (1-5s), so
+        # this is acceptable approximation. The first record is skipped,
+        # we don't know how long it lasted.
+        durations = numpy.diff(times)
+        return int(durations[agls[1:] < TARGET_AGL].sum())
 
     @reify
     def circling_percentage(self):
@@ -132,47 +125,9 @@ class FlightMetrics(object):
 
         return cp.fraction
 
-    @reify
-    def _flight_path(self):
-        from skylines.lib.xcsoar_.flightpath import flight_path
-
-        if not self.flight.igc_file:
-            return []
-
-        return flight_path(self.flight.igc_file)
-
-    @reify
-    def _elevations(self):
-        return list(get_elevations_for_flight(self.flight))
-
-    @reify
-    def _agls(self):
-        """Calculate AGL height for each flight fix
-
-        Return list of pairs: (seconds_after_midnight, agl).  Return only
-        points, for which ground elevation is available.
-        """
-        if not self._flight_path:
-            return []
-
-        fpath = iter(self._flight_path)
-
-        # We expect elevation times to be subset of flight path times, so for
-        # each elevation point there exist corresponding flight path fix.
-        agls = []
-        for etime, elev in self._elevations:
-            fix = fpath.next()
-            while etime != fix.seconds_of_day:
-                assert fix.seconds_of_day < etime
-                fix = fpath.next()
-
-            agls.append((etime, fix.altitude - elev))
-
-        return agls
-
     @reify
     def _release_time(self):
-        """Find release time (in seconds after midnight)
+        """Find release time (in the time format of the trajectory)
         """
         # Skip all phases until the last powered one. We will start counting
         # altitude gain after last powered phase.
@@ -185,81 +140,7 @@ class FlightMetrics(object):
         if not free_phase:
             return None
 
-        stime = free_phase.start_time
-        return stime.hour * 3600 + stime.minute * 60 + stime.second
-
-
-class PilotMetrics(object):
-    """Collect statistics about skylines-related user activity
-    """
-
-    def __init__(self, user):
-        self.user = user
-
-    @reify
-    def tracks_uploaded(self):
-        return IGCFile.query().filter_by(owner=self.user).count()
-
-    @reify
-    def users_followed(self):
-        return Follower.query().filter_by(source=self.user).count()
-
-    @reify
-    def followers_attracted(self):
-        return Follower.query().filter_by(destination=self.user).count()
-
-    @reify
-    def comments_made(self):
-        return FlightComment.query().filter_by(user=self.user).count()
-
-    @reify
-    def total_distance(self):
-        """Total distance in km"""
-        c = db.session.query(func.sum(Flight.olc_classic_distance)) \
-            .filter(self._pilot_or_copilot())
-
-        return (c.scalar() or 0) / 1000.0
-
-    @reify
-    def takeoff_airport_count(self):
-        c = db.session.query(func.count(distinct(Flight.takeoff_airport_id))) \
-            .filter(self._pilot_or_copilot()) \
-            .scalar()
-        return c
-
-    @reify
-    def takeoff_country_count(self):
-        c = db.session.query(func.count(distinct(Airport.country_code))) \
-            .join(Flight, Flight.takeoff_airport_id == Airport.id) \
-            .filter(self._pilot_or_copilot()) \
-            .scalar()
-        return c
-
-    @reify
-    def pic_hours(self):
-        return self._hours(Flight.pilot)
-
-    @reify
-    def aircraft_model_count(self):
-        c = db.session.query(func.count(distinct(Flight.model_id))) \
-            .filter(self._pilot_or_copilot()) \
-            .scalar()
-        return c
-
-    @reify
-    def copilot_hours(self):
-        return self._hours(Flight.co_pilot)
-
-    def _hours(self, attr):
-        flight_time = Flight.landing_time - Flight.takeoff_time
-        td = db.session.query(func.sum(flight_time)) \
-            .filter(attr == self.user) \
-            .scalar()
-
-        return td.total_seconds() / 60 / 60 if td else 0
-
-    def _pilot_or_copilot(self):
-        return (Flight.pilot == self.user) | (Flight.co_pilot == self.user)
+        return self.trajectory.to_seconds(free_phase.start_time)
 
 
 class Achievement(object):
@@ -331,7 +212,7 @@ class CommentAchievement(Achievement):
         return _("%(number)s comments made on SkyLines", **self.params)
 
     def is_achieved(self, context):
-        # Assume PilotMetrics as context
+        # Assume PilotStats as context
         return context.comments_made >= self.params['number']
 
 
@@ -355,7 +236,7 @@ class TracksUploadedAchievement(Achievement):
         return _("%(number)s tracks uploaded on SkyLines", **self.params)
 
     def is_achieved(self, context):
-        # Assume PilotMetrics as context
+        # Assume PilotStats as context
         return context.tracks_uploaded >= self.params['number']
 
 
@@ -367,7 +248,7 @@ class UsersFollowedAchievement(Achievement):
         return _("%(number)s users followed on SkyLines", **self.params)
 
     def is_achieved(self, context):
-        # Assume PilotMetrics as context
+        # Assume PilotStats as context
         return context.users_followed >= self.params['number']
 
 
@@ -379,7 +260,7 @@ class FollowersAttractedAchievement(Achievement):
         return _("Attracted %(number)s followers on SkyLines", **self.params)
 
     def is_achieved(self, context):
-        # Assume PilotMetrics as context
+        # Assume PilotStats as context
         return context.followers_attracted >= self.params['number']
 
 
@@ -389,7 +270,7 @@ class TotalDistanceAchievement(Achievement):
         return _("Log a total distance of %(number)s km", **self.params)
 
     def is_achieved(self, context):
-        # Assume PilotMetrics as context
+        # Assume PilotStats as context
         return context.total_distance >= self.params['number']
 
 
@@ -593,10 +474,10 @@ def calculate_achievements(context, ach_definitions):
 
 
 def get_user_achievements(user, ach_definitions):
-    context = PilotMetrics(user)
+    context = PilotStats.for_user(user)
     return calculate_achievements(context, ach_definitions)
 
 
-def get_flight_achievements(flight):
-    context = FlightMetrics(flight)
+def get_flight_achievements(flight, trajectory=None):
+    context = FlightMetrics(flight, trajectory)
     return calculate_achievements(context, FLIGHT_ACHIEVEMENTS)
@@ -0,0 +1,73 @@
+import re
+from collections import defaultdict
+
+
+def normalise_text(name):
+    return re.sub(r'[^a-z]', ' ', name.lower()).split()
+
+
+def normalise_digits(name):
+    return re.sub(r'[^0-9]', ' ', name.lower()).split()
+
+
+def normalise(name):
+    return re.sub(r'[^a-z0-9]', '', name.lower())
+
+
+def levenshtein(a, b):
+    if len(a) < len(b):
+        a, b = b, a
+
+    previous = range(len(b) + 1)
+    for i, ca in enumerate(a):
+        current = [i + 1]
+        for j, cb in enumerate(b):
+            current.append(min(previous[j + 1] + 1,
+                               current[j] + 1,
+                               previous[j] + (ca != cb)))
+        previous = current
+
+    return previous[-1]
+
+
+class AircraftNameIndex(object):
+    """ An index of aircraft model names for guessing the model from the
+    glider type header of an IGC file (e.g. "LS-8/18" or "Discus2b").
+
+    Candidates are the models that share a word with the glider type and
+    contain all of its numbers. They are ranked by the edit distance of
+    the normalised names. """
+
+    def __init__(self, models):
+        """ `models` is an iterable of (id, name) tuples """
+
+        self.names = {}
+        self.digits = {}
+        self.words = defaultdict(set)
+
+        for id, name in models:
+            self.names[id] = normalise(name)
+            self.digits[id] = ' '.join(normalise_digits(name))
+
+            for word in normalise_text(name):
+                self.words[word].add(id)
+
+    def guess(self, glider_type):
+        """ Returns the id of the best matching model or None """
+
+        words = normalise_text(glider_type)
+        digits = normalise_digits(glider_type)
+
+        candidates = set()
+        for word in words:
+            candidates.update(self.words.get(word, ()))
+
+        candidates = [id for id in candidates
+                      if all(d in self.digits[id] for d in digits)]
+
+        if not candidates:
+            return None
+
+        name = normalise(glider_type)
+        return min(candidates,
+                   key=lambda id: (levenshtein(self.names[id], name), id))
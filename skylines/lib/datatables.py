@@ -1,14 +1,28 @@
 # -*- coding: utf-8 -*-
 
-from sqlalchemy.sql.expression import desc
+from __future__ import absolute_import
 
+import json
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import date, datetime
+from hashlib import md5
 
-def GetDatatableRecords(kw, querySet, columnIndexNameMap):
+from flask import current_app
+from sqlalchemy import func
+from sqlalchemy.sql.expression import desc, and_, or_
+
+from skylines.model import db
+
+
+def GetDatatableRecords(kw, querySet, columnIndexNameMap, unique_column=None):
     """
     Usage:
             kw: args passed from dataTables query
             querySet: query set to draw data from.
             columnIndexNameMap: field names in order to be displayed.
+            unique_column: unique column that is used as last sort column
+                so that the next page can be found by the sort values of
+                the last record (keyset pagination) instead of an OFFSET.
 
     """
 
@@ -28,6 +42,7 @@ def GetDatatableRecords(kw, querySet, columnIndexNameMap):
     # Ordering data
     iSortingCols = int(kw.get('iSortingCols', 0))
     asortingCols = []
+    sortSpec = []
 
     if iSortingCols:
         for sortedColIndex in range(0, iSortingCols):
@@ -36,23 +51,180 @@ def GetDatatableRecords(kw, querySet, columnIndexNameMap):
             if kw.get('bSortable_{0}'.format(sortedColID), 'false') == 'true':
                 sortedColName = columnIndexNameMap[sortedColID]
                 sortingDirection = kw.get('sSortDir_' + str(sortedColIndex), 'asc')
-                if sortingDirection == 'desc':
-                    asortingCols.append(desc(getattr(sortedColName[0], sortedColName[1])))
-                else:
-                    asortingCols.append(getattr(sortedColName[0], sortedColName[1]))
-
-        querySet = querySet.order_by(*asortingCols)
+                column = getattr(sortedColName[0], sortedColName[1])
+                asortingCols.append((column, sortingDirection == 'desc'))
+                sortSpec.append('{0}{1}'.format(sortedColID, sortingDirection))
 
     # count how many records match the final criteria
-    iTotalRecords = iTotalDisplayRecords = querySet.count()
+    iTotalRecords = iTotalDisplayRecords = count_records(querySet)
+
+    if asortingCols and unique_column is not None:
+        asortingCols.append((unique_column, False))
+
+    if asortingCols:
+        querySet = querySet.order_by(*[desc(c) if descending else c
+                                       for c, descending in asortingCols])
+
+    # the values of the last record of the previous page, if the client
+    # sent the cursor of that page
+    sortSpec = ','.join(sortSpec)
+    cursor = None
+    if unique_column is not None and asortingCols:
+        cursor = decode_cursor(kw.get('sCursor'), startRecord, sortSpec)
+
     # get the slice
-    querySet = querySet[startRecord:endRecord]
+    entities = len(querySet.column_descriptions)
+    querySet = querySet.add_columns(*[c for c, descending in asortingCols])
+
+    if cursor is not None:
+        querySet = querySet.filter(_seek_filter(asortingCols, cursor)) \
+                           .limit(iDisplayLength)
+    else:
+        querySet = querySet[startRecord:endRecord]
+
+    rows = list(querySet)
+    records = [row[:entities] if entities > 1 else row[0] for row in rows]
+
+    sCursor = None
+    if unique_column is not None and asortingCols and \
+            len(rows) == iDisplayLength:
+        sCursor = encode_cursor(endRecord, sortSpec, rows[-1][entities:])
+
     # required echo response
     sEcho = int(kw.get('sEcho', 0))
 
     response_dict = {}
     response_dict.update({'sEcho': sEcho, 'iTotalRecords': iTotalRecords,
                           'iTotalDisplayRecords': iTotalDisplayRecords,
-                          'sColumns': sColumns})
+                          'sColumns': sColumns, 'sCursor': sCursor})
+
+    return (records, response_dict)
+
+
+def count_records(query):
+    """Returns the number of records of the query.
+
+    Counting stops after `SKYLINES_LISTS_EXACT_COUNT` records. The number
+    of records of larger queries is estimated by the query planner and
+    cached, so that it stays the same while paging through the list.
+    """
+
+    limit = int(current_app.config.get('SKYLINES_LISTS_EXACT_COUNT', 10000))
+
+    query = query.order_by(None)
+
+    count = db.session.query(func.count('*')) \
+        .select_from(query.limit(limit + 1).subquery(with_labels=True)) \
+        .scalar()
+
+    if count <= limit:
+        return count
+
+    statement = query.with_labels().statement \
+        .compile(dialect=db.engine.dialect)
+
+    key = 'count:' + md5(unicode(statement).encode('utf-8') +
+                         repr(sorted(statement.params.items()))).hexdigest()
+
+    count = current_app.cache.get(key)
+    if count is None:
+        count = max(_estimate_count(statement), limit + 1)
+        current_app.cache.set(key, count, timeout=int(
+            current_app.config.get('SKYLINES_LISTS_COUNT_TIMEOUT', 600)))
+
+    return count
+
+
+def _estimate_count(statement):
+    result = db.session.connection().execute(
+        'EXPLAIN (FORMAT JSON) ' + unicode(statement), statement.params)
+
+    plan = result.scalar()
+    if isinstance(plan, basestring):
+        plan = json.loads(plan)
+
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def encode_cursor(start, sort_spec, values):
+    """Returns the cursor of the page that starts at `start`. `values`
+    are the sort values of the last record of the previous page."""
+
+    data = [start, sort_spec, [_encode_value(value) for value in values]]
+    return urlsafe_b64encode(json.dumps(data, separators=(',', ':')))
+
+
+def decode_cursor(cursor, start, sort_spec):
+    """Returns the sort values of the cursor or None if the cursor is
+    invalid or does not belong to the requested page and ordering."""
+
+    if not cursor:
+        return None
+
+    try:
+        cursor_start, cursor_sort_spec, values = \
+            json.loads(urlsafe_b64decode(str(cursor)))
+
+        if cursor_start != start or cursor_sort_spec != sort_spec:
+            return None
+
+        return [_decode_value(value) for value in values]
+
+    except (TypeError, ValueError):
+        return None
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'datetime': list(value.timetuple()[:6]) + [value.microsecond]}
+    elif isinstance(value, date):
+        return {'date': [value.year, value.month, value.day]}
+    else:
+        return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'datetime' in value:
+            return datetime(*value['datetime'])
+        elif 'date' in value:
+            return date(*value['date'])
+        else:
+            raise ValueError('Invalid cursor value')
+
+    return value
+
+
+def _seek_filter(columns, values):
+    """Returns a filter for the records after the one with the given sort
+    values in the order of `columns`, a list of (column, descending)
+    tuples. The last column is the unique column which is never NULL."""
+
+    clauses = []
+    for i, ((column, descending), value) in enumerate(zip(columns, values)):
+        nullable = i < len(columns) - 1
+        after = _after(column, descending, value, nullable)
+        if after is None:
+            continue
+
+        equal = [_equal(c, v) for (c, d), v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*(equal + [after])))
+
+    return or_(*clauses)
+
+
+def _equal(column, value):
+    return column == None if value is None else column == value
+
 
-    return (querySet, response_dict)
+def _after(column, descending, value, nullable=True):
+    # PostgreSQL sorts NULL values after all other values, or before them
+    # in descending order
+    if value is None:
+        return column != None if descending else None
+    elif descending:
+        return column < value
+    elif nullable:
+        return or_(column > value, column == None)
+    else:
+        return column > value
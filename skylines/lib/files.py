@@ -1,13 +1,42 @@
 # -*- coding: utf-8 -*-
-"""This library helps storing data files in the server file system."""
+"""This library helps storing data files in the server file system.
+
+Files are stored by the MD5 hash of their content in sharded
+subdirectories (e.g. ``ab/cd/abcd...ef.igc``) below the
+``SKYLINES_FILES_PATH`` folder. The original file name is only kept as
+metadata in the database. Files of the old flat layout (stored by their
+name directly in ``SKYLINES_FILES_PATH``) are still found until they have
+been moved by the ``files migrate`` command.
+
+If ``SKYLINES_FILES_COMPRESSION`` is set to ``'gzip'``, new files are
+stored compressed (``abcd...ef.igc.gz``). The MD5 hash is always computed
+from the uncompressed content. Use :func:`open_file` to read a stored file
+and :func:`local_file` for external tools that need the path of an
+uncompressed file. The decompressed copies are kept in a cache of at most
+``SKYLINES_FILES_CACHE_SIZE`` bytes."""
 
 import os
-import shutil
 import re
+import gzip
+import time
+import shutil
+import hashlib
+from tempfile import NamedTemporaryFile
 
 from flask import current_app
 
-igc_filename_numbers_regex = re.compile(r"([\w_-]+)_(\d+)")
+# NamedTemporaryFile() creates the files with mode 0600, but the stored files
+# should get the default mode of the process, e.g. for being served by the
+# web server
+_umask = os.umask(0)
+os.umask(_umask)
+
+# default size of the cache of decompressed files in bytes
+CACHE_SIZE = 512 * 1024 * 1024
+
+# decompressed copies that were used within this number of seconds are never
+# removed from the cache, because they might be read by an external tool
+CACHE_MIN_AGE = 10 * 60
 
 
 def sanitise_filename(name):
@@ -35,55 +64,236 @@ def sanitise_filename(name):
 
 
 def filename_to_path(name):
+    """Returns the path of a file in the old flat storage layout."""
+
     assert isinstance(name, str) or isinstance(name, unicode)
 
     return os.path.join(current_app.config['SKYLINES_FILES_PATH'], name)
 
 
-def open_file(name):
-    assert isinstance(name, str) or isinstance(name, unicode)
+def key_to_path(key, root=None, compressed=False):
+    """Returns the sharded storage path of the file with the given MD5
+    hash."""
 
-    return file(filename_to_path(name))
+    assert isinstance(key, str) or isinstance(key, unicode)
 
+    if root is None:
+        root = current_app.config['SKYLINES_FILES_PATH']
 
-def next_filename(name):
-    assert isinstance(name, str) or isinstance(name, unicode)
+    path = os.path.join(root, key[0:2], key[2:4], key + '.igc')
+    if compressed:
+        path += '.gz'
 
-    i = name.rfind('.')
+    return path
 
-    match = igc_filename_numbers_regex.match(name[:i])
 
-    try:
-        number = int(match.group(2))
-        return "%s_%i%s" % (match.group(1), number + 1, name[i:])
+def is_compressed(path):
+    return path.endswith('.gz')
 
-    except AttributeError:
-        pass
 
-    return "%s_1%s" % (name[:i], name[i:])
+def find_file(key, name=None):
+    """Returns the path of a stored file, which may be compressed. If the
+    file has not been moved to the sharded storage yet, the path in the
+    flat storage layout is returned instead."""
 
+    compressed_path = key_to_path(key, compressed=True)
+    if os.path.exists(compressed_path):
+        return compressed_path
+
+    path = key_to_path(key)
+    if name is not None and not os.path.exists(path):
+        legacy_path = filename_to_path(name)
+        if os.path.exists(legacy_path):
+            return legacy_path
+
+    return path
+
+
+def open_file(key, name=None):
+    """Opens a stored file for reading. Compressed files are decompressed
+    on the fly."""
+
+    path = find_file(key, name)
+    if is_compressed(path):
+        return gzip.open(path, 'rb')
+
+    return open(path, 'rb')
 
-def add_file(name, f):
-    assert isinstance(name, str) or isinstance(name, unicode)
 
-    while True:
-        path = filename_to_path(name)
-        if not os.access(path, os.F_OK):
+def local_file(key, name=None):
+    """Returns the path of an uncompressed copy of a stored file. For
+    compressed files a decompressed copy is kept in the temporary folder and
+    reused by subsequent calls, until it is removed by :func:`clean_cache`."""
+
+    path = find_file(key, name)
+    if not is_compressed(path):
+        return path
+
+    cache_path = _cache_path(key)
+    cache_dir = os.path.dirname(cache_path)
+
+    if os.path.exists(cache_path):
+        # keep recently used copies from being cleaned up
+        os.utime(cache_path, None)
+        return cache_path
+
+    _makedirs(cache_dir)
+    with gzip.open(path, 'rb') as src, \
+            NamedTemporaryFile(dir=cache_dir, delete=False) as dest:
+        shutil.copyfileobj(src, dest)
+
+    os.rename(dest.name, cache_path)
+
+    clean_cache()
+    return cache_path
+
+
+def clean_cache():
+    """Removes the least recently used decompressed copies until the
+    cache is not larger than ``SKYLINES_FILES_CACHE_SIZE`` anymore."""
+
+    max_size = current_app.config.get('SKYLINES_FILES_CACHE_SIZE', CACHE_SIZE)
+
+    entries = []
+    for dirpath, dirnames, filenames in os.walk(_cache_root()):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # removed by a concurrent process
+                continue
+
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    size = sum(entry[1] for entry in entries)
+    min_time = time.time() - CACHE_MIN_AGE
+
+    for mtime, file_size, path in sorted(entries):
+        if size <= max_size or mtime > min_time:
             break
-        name = next_filename(name)
 
-    dest = file(path, 'w')
-    shutil.copyfileobj(f, dest)
-    dest.close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
 
-    return name
+        size -= file_size
 
 
-def delete_file(name):
-    assert isinstance(name, str) or isinstance(name, unicode)
+def add_file(f):
+    """Stores the content of the file-like object and returns its MD5 hash,
+    which is the key of the stored file."""
+
+    path, key = write_temporary_file(f)
+    store_temporary_file(path, key)
+    return key
 
-    path = filename_to_path(name)
+
+def write_temporary_file(f):
+    """Writes the content of the file-like object to a temporary file in the
+    storage folder and returns its path and the MD5 hash of the content.
+
+    The content is hashed (and compressed, if enabled) while it is written,
+    so the caller can check the hash before the file is moved into its
+    final place with :func:`store_temporary_file` or discarded with
+    :func:`delete_temporary_file`."""
+
+    root = current_app.config['SKYLINES_FILES_PATH']
+    compressed = \
+        current_app.config.get('SKYLINES_FILES_COMPRESSION') == 'gzip'
+
+    md5 = hashlib.md5()
+    with NamedTemporaryFile(dir=root, prefix='.upload-',
+                            suffix='.gz' if compressed else '',
+                            delete=False) as dest:
+        out = gzip.GzipFile('', 'wb', fileobj=dest) if compressed else dest
+        for chunk in iter(lambda: f.read(16384), b''):
+            md5.update(chunk)
+            out.write(chunk)
+
+        if compressed:
+            out.close()
+
+    return dest.name, md5.hexdigest()
+
+
+def store_temporary_file(path, key):
+    root = current_app.config['SKYLINES_FILES_PATH']
+    compressed = is_compressed(path)
+
+    if os.path.exists(key_to_path(key, root, compressed=not compressed)):
+        # the same content is already stored in the other format
+        os.unlink(path)
+    else:
+        store_file(path, key_to_path(key, root, compressed=compressed))
+
+
+def delete_temporary_file(path):
     try:
         os.unlink(path)
     except OSError:
         pass
+
+
+def compress_file(src, path):
+    """Stores a gzip compressed copy of the file `src` at `path` and
+    removes `src`."""
+
+    dirname = os.path.dirname(path)
+    _makedirs(dirname)
+
+    with open(src, 'rb') as f, \
+            NamedTemporaryFile(dir=dirname, delete=False) as dest:
+        with gzip.GzipFile('', 'wb', fileobj=dest) as out:
+            shutil.copyfileobj(f, out)
+
+    store_file(dest.name, path)
+    os.unlink(src)
+
+
+def store_file(src, path):
+    """Moves the file `src` to `path`, unless a file with the same content
+    is already stored there."""
+
+    if os.path.exists(path):
+        os.unlink(src)
+        return
+
+    os.chmod(src, 0666 & ~_umask)
+
+    _makedirs(os.path.dirname(path))
+    os.rename(src, path)
+
+
+def delete_file(key, name=None):
+    assert isinstance(key, str) or isinstance(key, unicode)
+
+    paths = [find_file(key, name)]
+    if is_compressed(paths[0]):
+        paths.append(_cache_path(key))
+
+    for path in paths:
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def _cache_root():
+    return os.path.join(current_app.config['SKYLINES_TEMPORARY_DIR'],
+                        'skylines-files')
+
+
+def _cache_path(key):
+    return os.path.join(_cache_root(), key[0:2], key + '.igc')
+
+
+def _makedirs(path):
+    if not os.path.exists(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            # the folder might have been created by a concurrent process
+            if not os.path.isdir(path):
+                raise
@@ -5,6 +5,9 @@ import math
 EARTH_RADIUS = 6367009
 METERS_PER_DEGREE = 111319.0
 
+# the latitude limit of the Web Mercator projection
+MAX_MERCATOR_LATITUDE = 85.0511287798
+
 
 def geographic_distance(loc1, loc2):
     """
@@ -25,3 +28,20 @@ def geographic_distance(loc1, loc2):
     c = 2 * math.asin(math.sqrt(a))
 
     return EARTH_RADIUS * c
+
+
+def get_tile(latitude, longitude, zoom):
+    """
+    Returns the (x, y) numbers of the Web Mercator map tile of the zoom
+    level that contains the location
+    """
+    n = 2 ** zoom
+
+    latitude = max(min(latitude, MAX_MERCATOR_LATITUDE), -MAX_MERCATOR_LATITUDE)
+    lat = math.radians(latitude)
+
+    x = int((longitude + 180.0) / 360.0 * n)
+    y = int((1.0 - math.log(math.tan(lat) + 1 / math.cos(lat)) / math.pi) /
+            2.0 * n)
+
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
@@ -3,8 +3,11 @@
 from __future__ import absolute_import
 
 import re
+import mmap
 from datetime import datetime
 
+import numpy
+
 from . import base36
 from .string import import_ascii, import_alnum
 
@@ -13,6 +16,19 @@ hfgid_re = re.compile(r'HFGID\s*GLIDER\s*ID\s*:(.*)', re.IGNORECASE)
 hfgty_re = re.compile(r'HFGTY\s*GLIDER\s*TYPE\s*:(.*)', re.IGNORECASE)
 hfcid_re = re.compile(r'HFCID.*:(.*)', re.IGNORECASE)
 afil_re = re.compile(r'AFIL(\d*)FLIGHT', re.IGNORECASE)
+irecord_re = re.compile(r'(\d{2})(\d{2})([A-Z0-9]{3})')
+
+# Width of the mandatory part of a B record (without line break)
+B_RECORD_LENGTH = 35
+
+FIX_FIELDS = [
+    ('time', numpy.int32),
+    ('latitude', numpy.float64),
+    ('longitude', numpy.float64),
+    ('valid', numpy.bool_),
+    ('pressure_altitude', numpy.int32),
+    ('gps_altitude', numpy.int32),
+]
 
 
 def read_igc_headers(f):
@@ -91,3 +107,156 @@ def parse_date(line):
         return datetime.strptime(date_str, '%d%m%y').date()
     except ValueError:
         return None
+
+
+def read_igc_fixes(f):
+    ''' Read the B records (fixes) of an IGC file into a NumPy structured
+    array. The parameter may be a path, a file-like object or a list of
+    strings. Paths are memory-mapped and read in a single pass.
+
+    Besides the FIX_FIELDS columns the array contains an integer column for
+    every extension declared in the I record (e.g. `enl`). The `time` column
+    holds the seconds of day of the fix and keeps counting past 86400 if the
+    flight crosses midnight (UTC). '''
+
+    if isinstance(f, str) or isinstance(f, unicode):
+        try:
+            with open(f, 'rb') as fp:
+                try:
+                    data = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # empty files can't be mapped
+                    return parse_b_records([])
+
+                try:
+                    return parse_b_records(iter(data.readline, ''))
+                finally:
+                    data.close()
+
+        except IOError:
+            return None
+
+    return parse_b_records(f)
+
+
+def parse_i_record(line):
+    ''' Returns a list of (name, start, end) tuples for the B record
+    extensions declared by an I record. start and end are zero-based and
+    the end is exclusive. '''
+
+    extensions = []
+    names = set()
+
+    try:
+        count = int(line[1:3])
+    except ValueError:
+        return extensions
+
+    for i in range(count):
+        match = irecord_re.match(line, 3 + i * 7)
+        if not match:
+            break
+
+        start, end = int(match.group(1)) - 1, int(match.group(2))
+        name = match.group(3).lower()
+
+        if start < B_RECORD_LENGTH or end <= start or name in names:
+            continue
+
+        names.add(name)
+        extensions.append((name, start, end))
+
+    return extensions
+
+
+def parse_b_records(lines):
+    extensions = []
+    records = []
+
+    for line in lines:
+        if line.startswith('B'):
+            records.append(line.rstrip('\r\n'))
+        elif line.startswith('I') and not records:
+            extensions = parse_i_record(line)
+
+    width = max([B_RECORD_LENGTH] + [end for _, _, end in extensions])
+
+    dtype = FIX_FIELDS + [(name, numpy.int32) for name, _, _ in extensions]
+
+    if not records:
+        return numpy.zeros(0, dtype=dtype)
+
+    # Convert the records into a (n, width) byte matrix
+    data = ''.join(r[:width].ljust(width) for r in records)
+    chars = numpy.frombuffer(data, dtype=numpy.uint8).reshape(-1, width)
+
+    # Drop records with broken mandatory fields
+    mask = _is_digit(chars[:, 1:14]).all(axis=1) & \
+        _is_digit(chars[:, 15:23]).all(axis=1) & \
+        _is_signed_int(chars[:, 25:30]) & \
+        _is_signed_int(chars[:, 30:35])
+
+    chars = chars[mask]
+
+    fixes = numpy.zeros(len(chars), dtype=dtype)
+
+    time = _to_int(chars[:, 1:3]) * 3600 + \
+        _to_int(chars[:, 3:5]) * 60 + \
+        _to_int(chars[:, 5:7])
+
+    # Handle the midnight rollover
+    if len(time) > 1:
+        rollover = numpy.diff(time) < -12 * 3600
+        time[1:] += numpy.cumsum(rollover) * 86400
+
+    fixes['time'] = time
+
+    latitude = _to_int(chars[:, 7:9]) + \
+        _to_int(chars[:, 9:14]) / 60000.
+    latitude[chars[:, 14] == ord('S')] *= -1
+    fixes['latitude'] = latitude
+
+    longitude = _to_int(chars[:, 15:18]) + \
+        _to_int(chars[:, 18:23]) / 60000.
+    longitude[chars[:, 23] == ord('W')] *= -1
+    fixes['longitude'] = longitude
+
+    fixes['valid'] = chars[:, 24] == ord('A')
+    fixes['pressure_altitude'] = _to_signed_int(chars[:, 25:30])
+    fixes['gps_altitude'] = _to_signed_int(chars[:, 30:35])
+
+    for name, start, end in extensions:
+        column = chars[:, start:end]
+
+        # Missing or broken extension values are stored as zero
+        values = _to_int(column)
+        values[~_is_digit(column).all(axis=1)] = 0
+        fixes[name] = values
+
+    return fixes
+
+
+def _is_digit(chars):
+    return (chars >= ord('0')) & (chars <= ord('9'))
+
+
+def _is_signed_int(chars):
+    return (_is_digit(chars[:, 1:]).all(axis=1) &
+            (_is_digit(chars[:, 0]) | (chars[:, 0] == ord('-'))))
+
+
+def _to_int(chars):
+    digits = chars.astype(numpy.int64) - ord('0')
+    factors = 10 ** numpy.arange(chars.shape[1] - 1, -1, -1)
+    return digits.dot(factors)
+
+
+def _to_signed_int(chars):
+    negative = chars[:, 0] == ord('-')
+
+    chars = chars.copy()
+    chars[negative, 0] = ord('0')
+
+    values = _to_int(chars)
+    values[negative] *= -1
+    return values
@@ -15,8 +15,9 @@ class Pager:
         self.page = max(min(page, self.last_page), self.first_page)
 
     @classmethod
-    def paginate(cls, query, name, items_per_page=20):
-        count = query.count()
+    def paginate(cls, query, name, items_per_page=20, count=None):
+        if count is None:
+            count = query.count()
 
         try:
             page = int(request.args.get('page', 1))
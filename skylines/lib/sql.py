@@ -1,4 +1,5 @@
 from sqlalchemy.sql import func, ColumnElement, literal_column, cast, and_
+from sqlalchemy.sql.expression import Executable, ClauseElement
 from sqlalchemy.types import String, Integer
 from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm.properties import ColumnProperty
@@ -22,6 +23,24 @@ def compile(expr, compiler, **kw):
     return compiler.process(expr.array) + '[' + str(expr.index) + ']'
 
 
+class InsertFromSelect(Executable, ClauseElement):
+    """ INSERT INTO table (columns) SELECT ... """
+
+    def __init__(self, table, columns, select):
+        self.table = table
+        self.columns = columns
+        self.select = select
+
+
+@compiles(InsertFromSelect)
+def compile_insert_from_select(element, compiler, **kw):
+    return 'INSERT INTO %s (%s) %s' % (
+        compiler.process(element.table, asfrom=True),
+        ', '.join(compiler.preparer.quote(column, None)
+                  for column in element.columns),
+        compiler.process(element.select))
+
+
 def weighted_ilike(self, value, weight=1):
     """ Calls the ILIKE operator and returns either 0 or the given weight. """
 
@@ -0,0 +1,118 @@
+from __future__ import absolute_import
+
+from datetime import datetime, time
+
+import numpy
+
+from skylines.model.flight import get_elevations_for_flight
+from skylines.lib.decorators import reify
+from skylines.lib.igc import read_igc_fixes
+
+
+class FlightTrajectory(object):
+    """The fixes of a flight and data derived from them.
+
+    Everything is computed lazily and only once, so that the same context
+    can be shared by the analysis and everything that evaluates the flight
+    afterwards (e.g. the achievements).
+
+    All times are in seconds after midnight (UTC) of the day of the IGC
+    file and keep counting past 86400 if the flight crosses midnight.
+    """
+
+    def __init__(self, flight):
+        self.flight = flight
+
+    @property
+    def phases(self):
+        return self.flight.phases
+
+    @reify
+    def local_path(self):
+        """Path of the uncompressed IGC file, which is read by the analysis
+        and for the fixes
+        """
+        if not self.flight.igc_file:
+            return None
+
+        return self.flight.igc_file.local_path
+
+    @reify
+    def midnight(self):
+        """The reference of the times of the trajectory"""
+        if self.flight.igc_file:
+            date = self.flight.igc_file.date_utc
+        else:
+            date = self.flight.takeoff_time.date()
+
+        return datetime.combine(date, time(0, 0, 0))
+
+    def to_seconds(self, timestamp):
+        """Converts a datetime into the time format of the trajectory"""
+        return int((timestamp - self.midnight).total_seconds())
+
+    @reify
+    def fixes(self):
+        """The valid fixes of the IGC file as NumPy array (see
+        :func:`skylines.lib.igc.read_igc_fixes`)
+        """
+        fixes = None
+
+        if self.local_path:
+            try:
+                fixes = read_igc_fixes(self.local_path)
+            except IOError:
+                pass
+
+        if fixes is None or len(fixes) == 0:
+            return numpy.zeros(0, dtype=[('time', numpy.int32),
+                                         ('gps_altitude', numpy.int32),
+                                         ('pressure_altitude', numpy.int32)])
+
+        return fixes[fixes['valid']]
+
+    @reify
+    def times(self):
+        """Time of every fix"""
+        return self.fixes['time']
+
+    @reify
+    def altitudes(self):
+        """GPS altitude of every fix, or the pressure altitude if the logger
+        did not record GPS altitudes
+        """
+        gps_altitudes = self.fixes['gps_altitude']
+        if gps_altitudes.any():
+            return gps_altitudes
+
+        return self.fixes['pressure_altitude']
+
+    @reify
+    def elevations(self):
+        """Pairs of arrays (time, ground elevation) for the points of the
+        stored flight path that have elevation data
+        """
+        elevations = list(get_elevations_for_flight(
+            self.flight, midnight=self.midnight))
+        if not elevations:
+            return numpy.zeros(0, numpy.int32), numpy.zeros(0)
+
+        times, elevations = zip(*elevations)
+        return numpy.array(times, numpy.int32), numpy.array(elevations)
+
+    @reify
+    def agls(self):
+        """Pair of arrays (time, agl) with the height above
+        ground at the points of :attr:`elevations`
+        """
+        if len(self.times) == 0:
+            return numpy.zeros(0, numpy.int32), numpy.zeros(0)
+
+        times, elevations = self.elevations
+
+        # only use points within the recorded fixes
+        mask = (times >= self.times[0]) & (times <= self.times[-1])
+        times, elevations = times[mask], elevations[mask]
+
+        altitudes = numpy.interp(times, self.times, self.altitudes)
+        return times, altitudes - elevations
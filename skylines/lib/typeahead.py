@@ -0,0 +1,100 @@
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+
+def normalise(text):
+    """ Returns the lowercase words of the text without accents """
+
+    if isinstance(text, str):
+        text = text.decode('utf-8', 'replace')
+
+    text = unicodedata.normalize('NFKD', text)
+    text = u''.join(c for c in text if not unicodedata.combining(c))
+    return re.findall(r'\w+', text.lower(), re.UNICODE)
+
+
+class PrefixIndex(object):
+    """ An in-memory index of names for completing the words that are
+    typed into a search field.
+
+    Every word of a name is stored in a sorted array, so that the names
+    with a word starting with the typed text can be found by a binary
+    search. The names of every group (e.g. the members of a club) are
+    indexed separately as well. """
+
+    def __init__(self, entries):
+        """ `entries` is an iterable of (id, name, group, text) tuples, the
+        words of the text are indexed for the name """
+
+        self.entries = []
+
+        words = []
+        groups = defaultdict(list)
+
+        for id, name, group, text in entries:
+            normalised = normalise(text)
+
+            index = len(self.entries)
+            self.entries.append((id, name, normalised))
+
+            for word in set(normalised):
+                words.append((word, index))
+                if group is not None:
+                    groups[group].append((word, index))
+
+        self.words = _sorted_words(words)
+        self.groups = dict((group, _sorted_words(group_words))
+                           for group, group_words in groups.iteritems())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, text, limit=10, group=None):
+        """ Returns up to `limit` (id, name) tuples of the names that have
+        a word starting with every word of the text """
+
+        words = normalise(text)
+        if not words:
+            return []
+
+        if group is None:
+            keys, indices = self.words
+        elif group in self.groups:
+            keys, indices = self.groups[group]
+        else:
+            return []
+
+        # find the candidates by the longest word, the others are checked
+        # for every candidate
+        prefix = max(words, key=len)
+        others = [word for word in words if word != prefix]
+
+        result = []
+        seen = set()
+
+        for i in xrange(bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+
+            index = indices[i]
+            if index in seen:
+                continue
+
+            seen.add(index)
+
+            id, name, normalised = self.entries[index]
+            if all(any(word.startswith(other) for word in normalised)
+                   for other in others):
+                result.append((id, name))
+
+                if len(result) >= limit:
+                    break
+
+        return result
+
+
+def _sorted_words(words):
+    words.sort()
+    return [word for word, index in words], [index for word, index in words]
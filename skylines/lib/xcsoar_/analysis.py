@@ -3,11 +3,13 @@ import resource
 
 import xcsoar
 from flask import current_app
+from sqlalchemy.event import listens_for
+from sqlalchemy.sql.expression import bindparam
 from skylines.model import db
-from skylines.lib import files
 from skylines.lib.datetime import from_seconds_of_day
 from skylines.model import (
-    Airport, Trace, FlightPhase, TimeZone, Location
+    Airport, Flight, Trace, FlightPhase, TimeZone, Location, PilotStats,
+    RankingScore, FlightStatistics
 )
 
 
@@ -78,17 +80,9 @@ def read_time_of_day(turnpoint, flight):
                                int(turnpoint['time']))
 
 
-def delete_trace(contest_name, trace_name, flight):
-    q = Trace.query(
-        flight=flight, contest_type=contest_name, trace_type=trace_name)
-    q.delete()
-
-
-def save_trace(contest_name, trace_name, node, flight):
-    delete_trace(contest_name, trace_name, flight)
-
+def read_trace(contest_name, trace_name, node, flight):
     if 'turnpoints' not in node:
-        return
+        return None
 
     locations = []
     times = []
@@ -103,43 +97,46 @@ def save_trace(contest_name, trace_name, node, flight):
         times.append(time)
 
     if len(locations) < 2 or len(times) < 2:
-        return
+        return None
 
-    trace = Trace()
-    trace.contest_type = contest_name
-    trace.trace_type = trace_name
-    trace.locations = locations
-    trace.times = times
+    trace = dict(contest_type=contest_name,
+                 trace_type=trace_name,
+                 locations=locations,
+                 times=times,
+                 duration=None,
+                 distance=None)
 
     if 'duration' in node:
-        trace.duration = datetime.timedelta(seconds=int(node['duration']))
+        trace['duration'] = datetime.timedelta(seconds=int(node['duration']))
 
     if 'distance' in node:
-        trace.distance = int(node['distance'])
-
-    flight.traces.append(trace)
-
+        trace['distance'] = int(node['distance'])
 
-def save_contest(contest_name, traces, flight):
-    for trace_name, trace in traces.iteritems():
-        save_trace(contest_name, trace_name, trace, flight)
+    return trace
 
 
-def save_contests(root, flight):
+def read_contests(root, flight):
     if 'contests' not in root or flight.takeoff_time is None:
         # The takeoff_time is needed to convert the
         # time integer to a DateTime instance
-        return
+        return []
+
+    traces = []
+    for contest_name, contest in root['contests'].iteritems():
+        for trace_name, node in contest.iteritems():
+            trace = read_trace(contest_name, trace_name, node, flight)
+            if trace is not None:
+                traces.append(trace)
 
-    for contest_name, traces in root['contests'].iteritems():
-        save_contest(contest_name, traces, flight)
+    return traces
 
 
 def get_takeoff_date(flight):
     if flight.takeoff_location is None:
         return flight.takeoff_time
 
-    timezone = TimeZone.by_location(flight.takeoff_location)
+    timezone = TimeZone.by_location(flight.takeoff_location,
+                                    airport=flight.takeoff_airport)
     if timezone is None:
         return flight.takeoff_time
 
@@ -171,11 +168,25 @@ def save_events(events, flight):
         save_landing(events['landing'], flight)
 
 
-def save_phases(root, flight):
-    flight.delete_phases()
+PHASE_COLUMNS = ['aggregate', 'start_time', 'end_time', 'phase_type',
+                 'circling_direction', 'alt_diff', 'duration', 'fraction',
+                 'distance', 'speed', 'vario', 'glide_rate', 'count']
 
+
+def create_phase(**kw):
+    """
+    Returns a flight phase row with a value (or None) for every column,
+    which is required for executemany() inserts.
+    """
+
+    phase = dict.fromkeys(PHASE_COLUMNS)
+    phase.update(kw)
+    return phase
+
+
+def read_phases(root):
     if 'phases' not in root or 'performance' not in root:
-        return
+        return []
 
     PT_IDX = {'': None,
               'powered': FlightPhase.PT_POWERED,
@@ -188,53 +199,116 @@ def save_phases(root, flight):
               'right': FlightPhase.CD_RIGHT,
               'total': FlightPhase.CD_TOTAL}
 
+    phases = []
+
     for phdata in root['phases']:
-        ph = FlightPhase()
-        ph.flight = flight
-        ph.aggregate = False
-        ph.start_time = import_datetime_attribute(phdata, 'start_time')
-        ph.end_time = import_datetime_attribute(phdata, 'end_time')
-        ph.phase_type = PT_IDX[phdata['type']]
-        ph.circling_direction = CD_IDX[phdata['circling_direction']]
-        ph.alt_diff = phdata['alt_diff']
-        ph.duration = datetime.timedelta(seconds=phdata['duration'])
-        ph.distance = phdata['distance']
-        ph.speed = phdata['speed']
-        ph.vario = phdata['vario']
-        ph.glide_rate = phdata['glide_rate']
-        ph.count = 1
-
-        db.session.add(ph)
+        phases.append(create_phase(
+            aggregate=False,
+            start_time=import_datetime_attribute(phdata, 'start_time'),
+            end_time=import_datetime_attribute(phdata, 'end_time'),
+            phase_type=PT_IDX[phdata['type']],
+            circling_direction=CD_IDX[phdata['circling_direction']],
+            alt_diff=phdata['alt_diff'],
+            duration=datetime.timedelta(seconds=phdata['duration']),
+            distance=phdata['distance'],
+            speed=phdata['speed'],
+            vario=phdata['vario'],
+            glide_rate=phdata['glide_rate'],
+            count=1))
 
     for statname in ["total", "left", "right", "mixed"]:
         phdata = root['performance']["circling_%s" % statname]
-        ph = FlightPhase(flight=flight)
-        ph.aggregate = True
-        ph.phase_type = FlightPhase.PT_CIRCLING
-        ph.fraction = round(phdata['fraction'] * 100)
-        ph.circling_direction = CD_IDX[statname]
-        ph.alt_diff = phdata['alt_diff']
-        ph.duration = datetime.timedelta(seconds=phdata['duration'])
-        ph.vario = phdata['vario']
-        ph.count = phdata['count']
-
-        db.session.add(ph)
+        phases.append(create_phase(
+            aggregate=True,
+            phase_type=FlightPhase.PT_CIRCLING,
+            fraction=round(phdata['fraction'] * 100),
+            circling_direction=CD_IDX[statname],
+            alt_diff=phdata['alt_diff'],
+            duration=datetime.timedelta(seconds=phdata['duration']),
+            vario=phdata['vario'],
+            count=phdata['count']))
 
     phdata = root['performance']['cruise_total']
-    ph = FlightPhase(flight=flight)
-    ph.aggregate = True
-    ph.phase_type = FlightPhase.PT_CRUISE
-    ph.circling_direction = FlightPhase.CD_TOTAL
-    ph.alt_diff = phdata['alt_diff']
-    ph.duration = datetime.timedelta(seconds=phdata['duration'])
-    ph.fraction = round(phdata['fraction'] * 100)
-    ph.distance = phdata['distance']
-    ph.speed = phdata['speed']
-    ph.vario = phdata['vario']
-    ph.glide_rate = phdata['glide_rate']
-    ph.count = phdata['count']
-
-    db.session.add(ph)
+    phases.append(create_phase(
+        aggregate=True,
+        phase_type=FlightPhase.PT_CRUISE,
+        circling_direction=FlightPhase.CD_TOTAL,
+        alt_diff=phdata['alt_diff'],
+        duration=datetime.timedelta(seconds=phdata['duration']),
+        fraction=round(phdata['fraction'] * 100),
+        distance=phdata['distance'],
+        speed=phdata['speed'],
+        vario=phdata['vario'],
+        glide_rate=phdata['glide_rate'],
+        count=phdata['count']))
+
+    return phases
+
+
+def write_results(connection, flight_id, phases, traces):
+    """
+    Replaces the phases and traces of a flight in the database. Each table
+    is written with one DELETE and a single executemany() INSERT instead of
+    going through the ORM unit of work for every row.
+    """
+
+    phases_table = FlightPhase.__table__
+    traces_table = Trace.__table__
+
+    connection.execute(phases_table.delete()
+                       .where(phases_table.c.flight_id == flight_id))
+    connection.execute(traces_table.delete()
+                       .where(traces_table.c.flight_id == flight_id))
+
+    if phases:
+        connection.execute(phases_table.insert(), [
+            dict(phase, flight_id=flight_id) for phase in phases])
+
+    if traces:
+        # The turnpoints are sent as WKT and converted by PostGIS
+        insert = traces_table.insert().values(locations=db.func.ST_GeomFromText(
+            bindparam('locations_wkt'), 4326))
+
+        connection.execute(insert, [dict(
+            flight_id=flight_id,
+            contest_type=trace['contest_type'],
+            trace_type=trace['trace_type'],
+            times=trace['times'],
+            duration=trace['duration'],
+            distance=trace['distance'],
+            locations_wkt=Trace.locations_to_wkt(trace['locations']),
+        ) for trace in traces])
+
+
+def save_results(phases, traces, flight):
+    """
+    Stores the analysis results of the flight. Persistent flights are updated
+    immediately, new flights get their results written right after their
+    own INSERT (see write_pending_results()).
+    """
+
+    if flight.id is not None:
+        write_results(db.session.connection(), flight.id, phases, traces)
+        db.session.expire(flight, ['_phases', 'traces'])
+        return
+
+    flight._pending_results = (phases, traces)
+
+    # Make the phases readable before the flight is inserted. They are not
+    # added to the relationships, because the session would cascade them
+    # into the flush without a flight_id.
+    flight._pending_phases = [FlightPhase(**phase) for phase in phases]
+
+
+@listens_for(Flight, 'after_insert')
+def write_pending_results(mapper, connection, flight):
+    results = getattr(flight, '_pending_results', None)
+    if results is None:
+        return
+
+    del flight._pending_results
+    del flight._pending_phases
+    write_results(connection, flight.id, *results)
 
 
 def setlimits():
@@ -246,8 +320,22 @@ def setlimits():
     resource.setrlimit(resource.RLIMIT_AS, (mem_limit, mem_limit * 1.2))
 
 
-def analyse_flight(flight, full=512, triangle=1024, sprint=64):
-    path = files.filename_to_path(flight.igc_file.filename)
+def analyse_flight(flight, full=512, triangle=1024, sprint=64,
+                   trajectory=None):
+    """Analyses the IGC file of the flight and stores the results.
+
+    If a :class:`~skylines.lib.trajectory.FlightTrajectory` of the flight
+    is passed, the IGC file is taken from it, so that it is shared with
+    everything else that uses the trajectory afterwards."""
+
+    ranking_scores = RankingScore.scores_for_flight(flight)
+    statistics_key = FlightStatistics.key_for_flight(flight)
+
+    if trajectory is not None:
+        path = trajectory.local_path
+    else:
+        path = flight.igc_file.local_path
+
     current_app.logger.info('Analyzing ' + path)
 
     try:
@@ -285,8 +373,17 @@ def analyse_flight(flight, full=512, triangle=1024, sprint=64):
         else:
             flight.olc_plus_score = None
 
-    save_contests(root, flight)
-    save_phases(root, flight)
+    save_results(read_phases(root), read_contests(root, flight), flight)
+
+    if flight.id is not None:
+        PilotStats.update_flight_stats([flight.pilot_id, flight.co_pilot_id])
+
+        # the takeoff airport and date might have changed
+        db.session.flush()
+        RankingScore.update([ranking_scores],
+                            [RankingScore.scores_for_flight(flight)])
+        FlightStatistics.update(
+            [statistics_key, FlightStatistics.key_for_flight(flight)])
 
     flight.needs_analysis = False
     return True
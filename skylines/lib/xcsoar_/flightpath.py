@@ -1,7 +1,5 @@
 import xcsoar
-from skylines.lib import files
 
 
 def flight_path(igc_file, max_points=1000):
-    path = files.filename_to_path(igc_file.filename)
-    return list(xcsoar.flight_path(path, max_points=max_points))
+    return list(xcsoar.flight_path(igc_file.local_path, max_points=max_points))
@@ -11,7 +11,9 @@ import skylines.model.base
 # Import your model modules here.
 from .achievement import UnlockedAchievement
 from .aircraft_model import AircraftModel
+from .aircraft_lookup import LoggerAircraft, RegistrationModel
 from .airport import Airport
+from .airport_tile import AirportTile
 from .airspace import Airspace
 from .club import Club
 from .elevation import Elevation
@@ -23,6 +25,9 @@ from .follower import Follower
 from .geo import Location, Bounds
 from .igcfile import IGCFile
 from .mountain_wave_project import MountainWaveProject
+from .pilot_stats import PilotStats
+from .ranking import RankingScore
+from .statistics import FlightStatistics, YearStatistics
 from .timezone import TimeZone
 from .trace import Trace
 from .tracking import TrackingFix, TrackingSession
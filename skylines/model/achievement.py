@@ -8,7 +8,9 @@ from skylines.model import db
 from skylines.lib.achievements import (get_user_achievements,
                                        get_flight_achievements,
                                        get_achievement)
-from skylines.model.event import create_achievement_notification, Event
+from skylines.model.event import (create_achievement_notification, Event,
+                                  Notification)
+from skylines.model.follower import Follower
 
 
 class UnlockedAchievement(db.Model):
@@ -68,15 +70,18 @@ def unlock_user_achievements(user, ach_definitions):
     return newunlocked
 
 
-def unlock_flight_achievements(flight):
+def unlock_flight_achievements(flight, trajectory=None):
     """Calculate new flight achievements for the pilot and store them in
     database.
+
+    `trajectory` is the :class:`skylines.lib.trajectory.FlightTrajectory`
+    of the flight, if it has already been created by the caller.
     """
     pilot = flight.pilot
     assert pilot is not None
 
     unlocked_achievements = {a.name: a for a in pilot.achievements}
-    achievements = get_flight_achievements(flight)
+    achievements = get_flight_achievements(flight, trajectory)
 
     newunlocked = []
     for a in achievements:
@@ -104,3 +109,61 @@ def unlock_flight_achievements(flight):
             create_achievement_notification(newach)
 
     return newunlocked
+
+
+def insert_unlocked_achievements(unlocked):
+    """Store many unlocked achievements at once, together with their events
+    and notifications, using bulk inserts instead of the ORM.
+
+    `unlocked` is a list of (pilot_id, name, flight_id, time_achieved)
+    tuples. The events are dated at the time the achievement was achieved,
+    so that backfilled achievements don't flood the timeline.
+    """
+    if not unlocked:
+        return
+
+    now = datetime.utcnow()
+
+    db.session.execute(UnlockedAchievement.__table__.insert(), [
+        dict(pilot_id=pilot_id, name=name, flight_id=flight_id,
+             time_achieved=time_achieved, time_created=now)
+        for pilot_id, name, flight_id, time_achieved in unlocked])
+
+    pilot_ids = set(row[0] for row in unlocked)
+    names = set(row[1] for row in unlocked)
+
+    # (pilot, name) is unique, so use it to find the new rows
+    achievement_ids = dict(
+        ((pilot_id, name), id) for id, pilot_id, name
+        in db.session.query(UnlockedAchievement.id,
+                            UnlockedAchievement.pilot_id,
+                            UnlockedAchievement.name)
+        .filter(UnlockedAchievement.pilot_id.in_(pilot_ids))
+        .filter(UnlockedAchievement.name.in_(names)))
+
+    achievement_ids = [achievement_ids[(pilot_id, name)]
+                       for pilot_id, name, flight_id, time_achieved
+                       in unlocked]
+
+    db.session.execute(Event.__table__.insert(), [
+        dict(type=Event.Type.ACHIEVEMENT, time=time_achieved,
+             actor_id=pilot_id, flight_id=flight_id, achievement_id=id)
+        for id, (pilot_id, name, flight_id, time_achieved)
+        in zip(achievement_ids, unlocked)])
+
+    # Notify the pilots and their followers
+    recipients = dict((pilot_id, {pilot_id}) for pilot_id in pilot_ids)
+    followers = db.session.query(Follower.destination_id, Follower.source_id) \
+        .filter(Follower.destination_id.in_(pilot_ids))
+    for pilot_id, follower_id in followers:
+        recipients[pilot_id].add(follower_id)
+
+    events = db.session.query(Event.id, Event.actor_id) \
+        .filter(Event.achievement_id.in_(achievement_ids)).all()
+
+    db.session.execute(Notification.__table__.insert(), [
+        dict(event_id=event_id, recipient_id=recipient_id)
+        for event_id, pilot_id in events
+        for recipient_id in recipients[pilot_id]])
+
+    Notification.increment_unread_counts([row[0] for row in events])
@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+from sqlalchemy.types import Integer, String, Unicode
+
+from skylines.model import db
+
+
+class LoggerAircraft(db.Model):
+    """The aircraft registration and model of the latest flights recorded
+    by a flight logger. Used to guess the aircraft of new uploads."""
+
+    __tablename__ = 'logger_aircraft'
+
+    id = db.Column(Integer, autoincrement=True, primary_key=True)
+
+    # upper case, see key()
+    logger_manufacturer_id = db.Column(String(3), nullable=False)
+    logger_id = db.Column(String(3), nullable=False)
+
+    # IDs of loggers without a manufacturer code ("X...") are not unique,
+    # so they are only matched for flights of the same pilot
+    pilot_id = db.Column(
+        Integer, db.ForeignKey('users.id', ondelete='CASCADE'))
+
+    registration = db.Column(Unicode(32))
+    registration_flight_id = db.Column(Integer)
+
+    model_id = db.Column(
+        Integer, db.ForeignKey('models.id', ondelete='SET NULL'))
+    model_flight_id = db.Column(Integer)
+
+    __table_args__ = (
+        db.Index('ix_logger_aircraft_logger',
+                 logger_manufacturer_id, logger_id),
+    )
+
+    def __repr__(self):
+        return ('<LoggerAircraft: id=%d logger=%s%s>' % (
+            self.id, self.logger_manufacturer_id, self.logger_id)) \
+            .encode('unicode_escape')
+
+    @staticmethod
+    def key(logger_manufacturer_id, logger_id, pilot_id):
+        """Returns the normalised (manufacturer, logger, pilot) key of a
+        logger or None if the logger can't be identified."""
+
+        if logger_manufacturer_id is None or logger_id is None:
+            return None
+
+        if logger_manufacturer_id.upper().startswith('X'):
+            if pilot_id is None:
+                return None
+        else:
+            pilot_id = None
+
+        return (logger_manufacturer_id.upper(), logger_id.upper(), pilot_id)
+
+    @classmethod
+    def by_key(cls, key):
+        if key is None:
+            return None
+
+        logger_manufacturer_id, logger_id, pilot_id = key
+        return cls.query(logger_manufacturer_id=logger_manufacturer_id,
+                         logger_id=logger_id,
+                         pilot_id=pilot_id).first()
+
+    @classmethod
+    def by_igc_file(cls, igc_file):
+        return cls.by_key(cls.key(igc_file.logger_manufacturer_id,
+                                  igc_file.logger_id, igc_file.owner_id))
+
+
+class RegistrationModel(db.Model):
+    """The aircraft model of the latest flight with a registration."""
+
+    __tablename__ = 'registration_models'
+
+    # upper case
+    registration = db.Column(Unicode(32), primary_key=True)
+
+    model_id = db.Column(
+        Integer, db.ForeignKey('models.id', ondelete='CASCADE'),
+        nullable=False)
+    flight_id = db.Column(Integer)
+
+    def __repr__(self):
+        return ('<RegistrationModel: registration=%s model_id=%d>' % (
+            self.registration, self.model_id)).encode('unicode_escape')
+
+    @classmethod
+    def by_registration(cls, registration):
+        if registration is None:
+            return None
+
+        return cls.get(registration.upper())
+
+
+def update_aircraft_lookup(flight):
+    """Remembers the aircraft of the flight for guessing the aircraft of
+    future flights, unless newer flights have already been recorded."""
+
+    assert flight.id is not None
+
+    igc_file = flight.igc_file
+
+    key = LoggerAircraft.key(igc_file.logger_manufacturer_id,
+                             igc_file.logger_id, flight.pilot_id)
+
+    if key is not None and \
+            (flight.registration is not None or flight.model_id is not None):
+        logger = LoggerAircraft.by_key(key)
+        if logger is None:
+            logger = LoggerAircraft(logger_manufacturer_id=key[0],
+                                    logger_id=key[1], pilot_id=key[2])
+            db.session.add(logger)
+
+        _update_logger_aircraft(logger, flight.id,
+                                flight.registration, flight.model_id)
+
+    if flight.registration is not None and flight.model_id is not None:
+        registration = flight.registration.upper()
+        entry = RegistrationModel.get(registration)
+        if entry is None:
+            entry = RegistrationModel(registration=registration)
+            db.session.add(entry)
+
+        if entry.flight_id is None or entry.flight_id <= flight.id:
+            entry.model_id = flight.model_id
+            entry.flight_id = flight.id
+
+
+def rebuild_aircraft_lookup():
+    """Recreates the lookup tables from all flights."""
+
+    from skylines.model import Flight, IGCFile
+
+    loggers = {}
+    registrations = {}
+
+    query = db.session.query(Flight.id, Flight.pilot_id,
+                             Flight.registration, Flight.model_id,
+                             IGCFile.logger_manufacturer_id,
+                             IGCFile.logger_id) \
+        .join(Flight.igc_file) \
+        .filter(db.or_(Flight.registration != None,
+                       Flight.model_id != None)) \
+        .order_by(Flight.id) \
+        .yield_per(1000)
+
+    for flight_id, pilot_id, registration, model_id, \
+            logger_manufacturer_id, logger_id in query:
+        key = LoggerAircraft.key(logger_manufacturer_id, logger_id, pilot_id)
+        if key is not None:
+            logger = loggers.get(key)
+            if logger is None:
+                logger = loggers[key] = dict(
+                    logger_manufacturer_id=key[0], logger_id=key[1],
+                    pilot_id=key[2], registration=None,
+                    registration_flight_id=None, model_id=None,
+                    model_flight_id=None)
+
+            # the flights are sorted by ID, so the latest values win
+            if registration is not None:
+                logger['registration'] = registration
+                logger['registration_flight_id'] = flight_id
+
+            if model_id is not None:
+                logger['model_id'] = model_id
+                logger['model_flight_id'] = flight_id
+
+        if registration is not None and model_id is not None:
+            registrations[registration.upper()] = dict(
+                registration=registration.upper(), model_id=model_id,
+                flight_id=flight_id)
+
+    db.session.query(LoggerAircraft).delete()
+    db.session.query(RegistrationModel).delete()
+
+    if loggers:
+        db.session.execute(LoggerAircraft.__table__.insert(),
+                           loggers.values())
+
+    if registrations:
+        db.session.execute(RegistrationModel.__table__.insert(),
+                           registrations.values())
+
+    return len(loggers), len(registrations)
+
+
+def _update_logger_aircraft(logger, flight_id, registration, model_id):
+    if registration is not None and \
+            (logger.registration_flight_id is None or
+             logger.registration_flight_id <= flight_id):
+        logger.registration = registration
+        logger.registration_flight_id = flight_id
+
+    if model_id is not None and \
+            (logger.model_flight_id is None or
+             logger.model_flight_id <= flight_id):
+        logger.model_id = model_id
+        logger.model_flight_id = flight_id
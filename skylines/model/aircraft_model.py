@@ -1,6 +1,15 @@
+import time
+
 from sqlalchemy.types import Integer, Unicode
 
 from skylines.model import db
+from skylines.lib.aircraft_names import AircraftNameIndex
+
+# the name index is rebuilt after this many seconds to pick up new models
+NAME_INDEX_TIMEOUT = 10 * 60
+
+_name_index = None
+_name_index_time = 0
 
 
 class AircraftModel(db.Model):
@@ -30,3 +39,18 @@ class AircraftModel(db.Model):
     @classmethod
     def by_name(cls, name):
         return cls.query(name=name).first()
+
+    @classmethod
+    def guess_by_name(cls, name):
+        """Returns the id of the model that best matches the glider type
+        header of an IGC file."""
+
+        global _name_index, _name_index_time
+
+        now = time.time()
+        if _name_index is None or now - _name_index_time > NAME_INDEX_TIMEOUT:
+            _name_index = AircraftNameIndex(
+                db.session.query(cls.id, cls.name))
+            _name_index_time = now
+
+        return _name_index.guess(name)
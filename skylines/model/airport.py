@@ -36,6 +36,14 @@ class Airport(db.Model):
     frequency = Column(Float)
     type = Column(String(20))
 
+    __table_args__ = (
+        # for the search
+        db.Index('ix_airports_name_trgm', name, postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+        db.Index('ix_airports_icao_trgm', icao, postgresql_using='gin',
+                 postgresql_ops={'icao': 'gin_trgm_ops'}),
+    )
+
     def __unicode__(self):
         return self.name
 
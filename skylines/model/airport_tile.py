@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+import json
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy.sql.expression import or_, and_
+from sqlalchemy.types import Integer, DateTime, Text
+
+from skylines.model import db
+from skylines.lib.geo import get_tile
+
+
+class AirportTile(db.Model):
+    """Precomputed JSON lists of the airports within the Web Mercator map
+    tiles of zoom level `ZOOM`.
+
+    The tiles are generated by :meth:`rebuild` after each airport import.
+    Only the tiles whose airports have changed get a new `time_modified`,
+    which is part of the version of the cached tile responses."""
+
+    __tablename__ = 'airport_tiles'
+
+    ZOOM = 8
+
+    x = db.Column(Integer, primary_key=True, autoincrement=False)
+    y = db.Column(Integer, primary_key=True, autoincrement=False)
+
+    airports = db.Column(Text, nullable=False)
+
+    time_modified = db.Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return '<AirportTile: x=%d y=%d>' % (self.x, self.y)
+
+    @classmethod
+    def by_tile(cls, zoom, x, y):
+        """Returns the precomputed tiles that cover the tile (`x`, `y`) of
+        the zoom level. For zoom levels above `ZOOM` this is the tile that
+        contains the requested tile."""
+
+        if zoom >= cls.ZOOM:
+            shift = zoom - cls.ZOOM
+            return cls.query(x=x >> shift, y=y >> shift).all()
+
+        shift = cls.ZOOM - zoom
+        return cls.query() \
+            .filter(cls.x.between(x << shift, ((x + 1) << shift) - 1)) \
+            .filter(cls.y.between(y << shift, ((y + 1) << shift) - 1)) \
+            .order_by(cls.x, cls.y).all()
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes the tiles from all valid airports and stores the
+        tiles that have changed. Returns the number of changed tiles."""
+
+        from skylines.model import Airport
+        from skylines.api.airports import airport_to_dict
+
+        now = datetime.utcnow()
+
+        airports = Airport.query() \
+            .filter(or_(Airport.valid_until == None,
+                        Airport.valid_until > now)) \
+            .order_by(Airport.id)
+
+        tiles = defaultdict(list)
+        for airport in airports:
+            location = airport.location
+            tile = get_tile(location.latitude, location.longitude, cls.ZOOM)
+            tiles[tile].append(airport_to_dict(airport))
+
+        tiles = dict((tile, json.dumps(tile_airports, sort_keys=True))
+                     for tile, tile_airports in tiles.iteritems())
+
+        old_tiles = dict(((x, y), airports) for x, y, airports in
+                         db.session.query(cls.x, cls.y, cls.airports))
+
+        table = cls.__table__
+
+        removed = set(old_tiles) - set(tiles)
+        for x, y in removed:
+            db.session.execute(table.delete().where(
+                and_(table.c.x == x, table.c.y == y)))
+
+        added = []
+        changed = 0
+        for (x, y), airports in tiles.iteritems():
+            if (x, y) not in old_tiles:
+                added.append(dict(x=x, y=y, airports=airports,
+                                  time_modified=now))
+
+            elif old_tiles[(x, y)] != airports:
+                db.session.execute(table.update()
+                                   .where(and_(table.c.x == x, table.c.y == y))
+                                   .values(airports=airports,
+                                           time_modified=now))
+                changed += 1
+
+        if added:
+            db.session.execute(table.insert(), added)
+
+        return len(removed) + len(added) + changed
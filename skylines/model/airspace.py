@@ -4,8 +4,16 @@ from datetime import datetime
 
 from sqlalchemy.types import Integer, String, DateTime
 from geoalchemy2.types import Geometry
+from geoalchemy2.shape import to_shape
+from shapely.geometry import Point
+from shapely.prepared import prep
+from shapely.strtree import STRtree
 
 from skylines.model import db
+from skylines.model.geo import Location
+
+# in-process index of the airspace polygons, see Airspace.load_index()
+_index = None
 
 
 class Airspace(db.Model):
@@ -28,6 +36,75 @@ class Airspace(db.Model):
 
     @classmethod
     def by_location(cls, location):
-        '''Returns a query object of all airspaces at the location'''
+        '''Returns all airspaces at the location, either as a query object
+        or as a list of rows if the index has been loaded'''
+
+        if _index is not None:
+            return _index.lookup(location)
+
         return cls.query() \
             .filter(cls.the_geom.ST_Contains(location.make_point()))
+
+    @classmethod
+    def by_locations(cls, locations):
+        '''Returns a list with the airspaces at each of the locations.
+
+        Without the loaded index the airspaces that contain any of the
+        locations are selected by a single query and then assigned to the
+        locations in memory.'''
+
+        if not locations:
+            return []
+
+        index = _index
+        if index is None:
+            points = Location.make_multipoint(locations)
+            index = AirspaceIndex(cls.query()
+                                  .filter(cls.the_geom.ST_Intersects(points))
+                                  .order_by(cls.id))
+
+        return [index.lookup(location) for location in locations]
+
+    @classmethod
+    def load_index(cls):
+        '''Loads all airspaces into an in-process spatial index, which is
+        used by by_location() instead of database queries.
+
+        The index only holds plain rows of the columns that are needed by
+        the API, so it can be shared by all threads.'''
+
+        global _index
+        _index = AirspaceIndex(db.session.query(
+            cls.id, cls.name, cls.airspace_class, cls.base, cls.top,
+            cls.country_code, cls.the_geom).order_by(cls.id))
+
+
+class AirspaceIndex(object):
+    def __init__(self, airspaces):
+        """ `airspaces` is an iterable of Airspace objects or rows with a
+        `the_geom` column, which are returned by the lookups """
+
+        self.airspaces = {}
+
+        geometries = []
+        for i, airspace in enumerate(airspaces):
+            if airspace.the_geom is None:
+                continue
+
+            geometry = to_shape(airspace.the_geom)
+            geometries.append(geometry)
+            self.airspaces[id(geometry)] = (i, airspace, prep(geometry))
+
+        self.tree = STRtree(geometries)
+
+    def lookup(self, location):
+        point = Point(location.longitude, location.latitude)
+
+        result = []
+        for geometry in self.tree.query(point):
+            i, airspace, prepared = self.airspaces[id(geometry)]
+            if prepared.contains(point):
+                result.append((i, airspace))
+
+        result.sort()
+        return [row[1] for row in result]
@@ -23,6 +23,12 @@ class Club(db.Model):
 
     website = db.Column(Unicode(255))
 
+    __table_args__ = (
+        # for the search
+        db.Index('ix_clubs_name_trgm', name, postgresql_using='gin',
+                 postgresql_ops={'name': 'gin_trgm_ops'}),
+    )
+
     def __unicode__(self):
         return self.name
 
@@ -1,9 +1,11 @@
 from datetime import datetime
-from itertools import chain
 
+from sqlalchemy.sql.expression import select, union, literal, and_
+from sqlalchemy.sql.functions import count
 from sqlalchemy.types import Integer, DateTime
 
 from skylines.model import db
+from skylines.lib.sql import InsertFromSelect
 from .user import User
 from .club import Club
 from .follower import Follower
@@ -66,6 +68,12 @@ class Event(db.Model):
         Integer, db.ForeignKey('achievements.id', ondelete='CASCADE'))
     achievement = db.relationship('UnlockedAchievement')
 
+    # Index for paging the timeline and the notifications by (time, id)
+
+    __table_args__ = (
+        db.Index('ix_events_time_id', time, id),
+    )
+
     ##############################
 
     def __repr__(self):
@@ -94,6 +102,10 @@ class Notification(db.Model):
 
     time_read = db.Column(DateTime)
 
+    __table_args__ = (
+        db.Index('ix_notifications_recipient_id', recipient_id, time_read),
+    )
+
     ##############################
 
     def __repr__(self):
@@ -108,23 +120,120 @@ class Notification(db.Model):
 
     @classmethod
     def count_unread(cls, recipient):
-        return cls.query_unread(recipient).count()
+        """
+        Returns the number of unread notifications of the recipient.
+
+        The number is kept in `User.unread_notifications` and is only
+        counted again if it is unknown (NULL).
+        """
+
+        unread = db.session.query(User.unread_notifications) \
+            .filter(User.id == recipient.id).scalar()
+
+        if unread is None:
+            unread = cls.query_unread(recipient).count()
+            _set_unread_count(recipient.id, unread)
+
+        return unread
+
+    @classmethod
+    def has_unread(cls, recipient, filter_func=None):
+        """
+        Returns True if the recipient has unread notifications about the
+        events that are selected by the `filter_func`
+        """
+
+        if not cls.count_unread(recipient):
+            return False
+
+        query = cls.query_unread(recipient).join(Event)
+
+        if filter_func is not None:
+            query = filter_func(query)
+
+        return db.session.query(query.exists()).scalar()
+
+    @classmethod
+    def increment_unread_counts(cls, event_ids):
+        """
+        Add the new notifications of the events to the unread counters of
+        their recipients
+        """
+
+        notifications = select([cls.recipient_id, count().label('count')]) \
+            .where(cls.event_id.in_(event_ids)) \
+            .group_by(cls.recipient_id) \
+            .alias('notifications')
+
+        users = User.__table__
+        db.session.execute(
+            users.update()
+            .where(users.c.id == notifications.c.recipient_id)
+            .values(unread_notifications=(users.c.unread_notifications +
+                                          notifications.c.count)))
+
+    @classmethod
+    def invalidate_unread_counts(cls, *criterion):
+        """
+        Reset the unread counters of the recipients of the unread
+        notifications of all events matching the criterion, so that they
+        are counted again. This has to be called before these events are
+        deleted.
+        """
+
+        recipients = select([cls.recipient_id]) \
+            .where(cls.event_id == Event.id) \
+            .where(cls.time_read == None) \
+            .where(and_(*criterion))
+
+        User.query() \
+            .filter(User.id.in_(recipients)) \
+            .update(dict(unread_notifications=None),
+                    synchronize_session=False)
 
     ##############################
 
     def mark_read(self):
+        if self.time_read is None:
+            _set_unread_count(self.recipient_id,
+                              User.unread_notifications - 1)
+
         self.time_read = datetime.utcnow()
 
     @classmethod
     def mark_all_read(cls, recipient, filter_func=None):
-        query = cls.query(recipient=recipient) \
+        query = cls.query(recipient=recipient, time_read=None) \
             .outerjoin(Event) \
             .filter(Event.id == Notification.event_id)
 
         if filter_func is not None:
             query = filter_func(query)
 
-        query.update(dict(time_read=datetime.utcnow()))
+        marked = query.update(dict(time_read=datetime.utcnow()))
+
+        if filter_func is None:
+            _set_unread_count(recipient.id, 0)
+        elif marked:
+            _set_unread_count(recipient.id,
+                              User.unread_notifications - marked)
+
+
+def filter_events(**kw):
+    """
+    Returns a `filter_func` for `Notification.mark_all_read()` that selects
+    the events with the given attribute values (e.g. `flight_id`)
+    """
+
+    def filter_func(query):
+        return query.filter(and_(*[getattr(Event, key) == value
+                                   for key, value in kw.iteritems()]))
+
+    return filter_func
+
+
+def _set_unread_count(recipient_id, value):
+    User.query(id=recipient_id) \
+        .update(dict(unread_notifications=value), synchronize_session=False)
 
 
 GROUPABLE_EVENT_TYPES = [
@@ -157,6 +266,33 @@ class EventGroup:
         return getattr(self.subevents[0], name)
 
 
+def create_notifications(event, recipients, exclude=None):
+    '''
+    Create notifications of the event for the distinct users that are
+    selected by the `recipients` selects (of an `id` column each) with a
+    single INSERT ... SELECT, independent of the number of recipients
+    '''
+
+    # Make sure that the event has an id
+    db.session.flush()
+
+    if len(recipients) > 1:
+        recipients = union(*recipients)
+    else:
+        recipients = recipients[0]
+
+    recipients = recipients.alias('recipients')
+
+    query = select([literal(event.id), recipients.c.id]).distinct()
+    if exclude:
+        query = query.where(~recipients.c.id.in_(exclude))
+
+    db.session.execute(InsertFromSelect(
+        Notification.__table__, ['event_id', 'recipient_id'], query))
+
+    Notification.increment_unread_counts([event.id])
+
+
 def create_flight_comment_notifications(comment):
     '''
     Create notifications for the owner and pilots of the flight
@@ -181,6 +317,9 @@ def create_flight_comment_notifications(comment):
         item = Notification(event=event, recipient=recipient)
         db.session.add(item)
 
+    db.session.flush()
+    Notification.increment_unread_counts([event.id])
+
 
 def create_flight_notifications(flight):
     '''
@@ -198,20 +337,13 @@ def create_flight_notifications(flight):
     senders = {flight.pilot_id, flight.co_pilot_id, flight.igc_file.owner.id}
     senders.discard(None)
 
-    # Request followers/recipients of the flight-related users from the DB
-    followers = db.session.query(Follower.source_id.label('id')) \
-                          .filter(Follower.destination_id.in_(senders))
+    # Select the followers/recipients of the flight-related users
+    followers = select([Follower.source_id.label('id')]) \
+        .where(Follower.destination_id.in_(senders))
 
-    # Determine the recipients
-    recipients = set([follower.id for follower in followers])
-
-    # Don't send notifications to the senders if they follow each other
-    recipients.difference_update(senders)
-
-    # Create notifications for the recipients
-    for recipient in recipients:
-        item = Notification(event=event, recipient_id=recipient)
-        db.session.add(item)
+    # Create notifications for the recipients, but don't send notifications
+    # to the senders if they follow each other
+    create_notifications(event, [followers], exclude=senders)
 
 
 def create_follower_notification(followed, follower):
@@ -227,6 +359,9 @@ def create_follower_notification(followed, follower):
     item = Notification(event=event, recipient=followed)
     db.session.add(item)
 
+    db.session.flush()
+    Notification.increment_unread_counts([event.id])
+
 
 def create_new_user_event(user):
     """
@@ -254,13 +389,11 @@ def create_club_join_event(club, user):
     db.session.add(event)
 
     # Create the notifications for club members and followers
-    q1 = db.session.query(User.id).filter_by(club_id=club)
-    q2 = db.session.query(Follower.source_id).filter_by(destination_id=user.id)
+    members = select([User.id]).where(User.club_id == club)
+    followers = select([Follower.source_id.label('id')]) \
+        .where(Follower.destination_id == user.id)
 
-    recipients = set([row[0] for row in chain(q1, q2)])
-    for recipient in recipients:
-        item = Notification(event=event, recipient_id=recipient)
-        db.session.add(item)
+    create_notifications(event, [members, followers])
 
 
 def group_events(_events):
@@ -297,13 +430,11 @@ def create_achievement_notification(achievement):
     db.session.add(event)
 
     # Notify pilot
-    recipients = {event.actor.id}
+    pilot = select([User.id]).where(User.id == event.actor.id)
 
     # Notify his followers too
-    followers = db.session.query(Follower.source_id).filter_by(destination_id=event.actor.id)
-    recipients.update([f.source_id for f in followers])
+    followers = select([Follower.source_id.label('id')]) \
+        .where(Follower.destination_id == event.actor.id)
 
     # Send out notifications
-    for recipient_id in recipients:
-        item = Notification(event=event, recipient_id=recipient_id)
-        db.session.add(item)
+    create_notifications(event, [pilot, followers])
@@ -6,7 +6,7 @@ from sqlalchemy.dialects import postgresql
 from sqlalchemy.orm import deferred
 from sqlalchemy.types import Unicode, Integer, Float, DateTime, Date, Boolean
 from sqlalchemy.ext.hybrid import hybrid_property
-from sqlalchemy.sql.expression import case, and_, literal_column
+from sqlalchemy.sql.expression import case, and_, literal_column, select
 from geoalchemy2.types import Geometry
 from geoalchemy2.shape import to_shape, from_shape
 from shapely.geometry import LineString
@@ -79,12 +79,20 @@ class Flight(db.Model):
     olc_triangle_distance = db.Column(Integer)
     olc_plus_score = db.Column(Float)
 
+    # FlightPhase objects of a new flight, whose analysis results are only
+    # inserted together with the flight (see
+    # skylines.lib.xcsoar_.analysis.save_results())
+    _pending_phases = None
+
     igc_file_id = db.Column(
         Integer, db.ForeignKey('igc_files.id', ondelete='CASCADE'), nullable=False)
     igc_file = db.relationship('IGCFile', backref='flights', innerjoin=True)
 
     needs_analysis = db.Column(Boolean, nullable=False, default=True)
 
+    # number of flight comments, updated when comments are added or deleted
+    num_comments = db.Column(Integer, nullable=False, default=0)
+
     def __repr__(self):
         return ('<Flight: id=%s>' % self.id).encode('unicode_escape')
 
@@ -143,11 +151,21 @@ class Flight(db.Model):
 
     @classmethod
     def by_md5(cls, _md5):
-        file = IGCFile.by_md5(_md5)
-        if file is None:
-            return None
+        return cls.query().join(cls.igc_file) \
+            .filter(IGCFile.md5 == _md5).first()
+
+    @classmethod
+    def by_md5s(cls, md5s):
+        """Returns a dict of the flights with the given IGC file hashes,
+        indexed by the hash."""
 
-        return cls.query().filter_by(igc_file=file).first()
+        if not md5s:
+            return {}
+
+        query = db.session.query(cls, IGCFile.md5).join(cls.igc_file) \
+            .filter(IGCFile.md5.in_(md5s))
+
+        return dict((md5, flight) for flight, md5 in query)
 
     def is_writable(self, user):
         return user and \
@@ -158,6 +176,23 @@ class Flight(db.Model):
     def may_delete(self, user):
         return user and (self.igc_file.owner_id == user.id or user.is_manager())
 
+    @classmethod
+    def update_num_comments(cls):
+        """Recounts the comments of all flights. Returns the number of
+        flights whose comment counter was wrong."""
+
+        from skylines.model import FlightComment
+
+        flights = cls.__table__
+        comments = FlightComment.__table__
+
+        count = select([db.func.count(comments.c.id)]) \
+            .where(comments.c.flight_id == flights.c.id).as_scalar()
+
+        return db.session.execute(flights.update()
+                                  .where(flights.c.num_comments != count)
+                                  .values(num_comments=count)).rowcount
+
     @classmethod
     def get_largest(cls):
         '''Returns a query object ordered by distance'''
@@ -176,13 +211,20 @@ class Flight(db.Model):
     def speed(self):
         return self.get_contest_speed('olc_plus', 'classic')
 
+    @property
+    def all_phases(self):
+        if self._pending_phases is not None:
+            return self._pending_phases
+
+        return self._phases
+
     @property
     def has_phases(self):
-        return bool(self._phases)
+        return bool(self.all_phases)
 
     @property
     def phases(self):
-        return [p for p in self._phases if not p.aggregate]
+        return [p for p in self.all_phases if not p.aggregate]
 
     def delete_phases(self):
         from skylines.model.flight_phase import FlightPhase
@@ -191,7 +233,7 @@ class Flight(db.Model):
     @property
     def circling_performance(self):
         from skylines.model.flight_phase import FlightPhase
-        stats = [p for p in self._phases
+        stats = [p for p in self.all_phases
                  if (p.aggregate
                      and p.phase_type == FlightPhase.PT_CIRCLING
                      and p.duration.total_seconds() > 0)]
@@ -206,7 +248,7 @@ class Flight(db.Model):
     @property
     def cruise_performance(self):
         from skylines.model.flight_phase import FlightPhase
-        return [p for p in self._phases
+        return [p for p in self.all_phases
                 if p.aggregate and p.phase_type == FlightPhase.PT_CRUISE]
 
     def update_flight_path(self):
@@ -235,7 +277,11 @@ class Flight(db.Model):
         return True
 
 
-def get_elevations_for_flight(flight):
+def get_elevations_for_flight(flight, midnight=None):
+    """Returns (time, elevation) pairs for the points of the flight path
+    with ground elevation data. The times are in seconds after `midnight`,
+    which defaults to the midnight before the first point."""
+
     # Prepare column expressions
     locations = Flight.locations.ST_DumpPoints()
     location_id = extract_array_item(locations.path, 1)
@@ -260,13 +306,12 @@ def get_elevations_for_flight(flight):
     if len(q) == 0:
         return []
 
-    start_time = q[0][0]
-    start_midnight = start_time.replace(hour=0, minute=0, second=0,
-                                        microsecond=0)
+    if midnight is None:
+        midnight = q[0][0].replace(hour=0, minute=0, second=0, microsecond=0)
 
     elevations = []
     for time, elevation in q:
-        time_delta = time - start_midnight
+        time_delta = time - midnight
         time = time_delta.days * 86400 + time_delta.seconds
 
         elevations.append((time, elevation))
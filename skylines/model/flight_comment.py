@@ -1,5 +1,6 @@
 from datetime import datetime
 
+from sqlalchemy.event import listens_for
 from sqlalchemy.types import Unicode, Integer, DateTime
 
 from skylines.model import db
@@ -26,3 +27,24 @@ class FlightComment(db.Model):
         return ('<FlightComment: id=%d user_id=%d flight_id=%d>' % (self.id, self.user_id, self.flight_id)).encode('unicode_escape')
 
     text = db.Column(Unicode, nullable=False)
+
+
+def _add_to_num_comments(connection, flight_id, delta):
+    from skylines.model import Flight
+
+    flights = Flight.__table__
+    connection.execute(flights.update()
+                       .where(flights.c.id == flight_id)
+                       .values(num_comments=flights.c.num_comments + delta))
+
+
+# Bulk deletes and the cascades of deleted flights don't need to be counted,
+# `flights rebuild-comment-counts` repairs the counters otherwise
+@listens_for(FlightComment, 'after_insert')
+def increment_num_comments(mapper, connection, comment):
+    _add_to_num_comments(connection, comment.flight_id, 1)
+
+
+@listens_for(FlightComment, 'after_delete')
+def decrement_num_comments(mapper, connection, comment):
+    _add_to_num_comments(connection, comment.flight_id, -1)
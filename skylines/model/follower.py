@@ -3,6 +3,7 @@ from datetime import datetime
 from sqlalchemy.types import Integer, DateTime
 
 from skylines.model import db
+from skylines.model.pilot_stats import PilotStats
 
 
 class Follower(db.Model):
@@ -42,6 +43,11 @@ class Follower(db.Model):
             f = Follower(source=source, destination=destination)
             db.session.add(f)
 
+            PilotStats.increment(source.id, users_followed=1)
+            PilotStats.increment(destination.id, followers_attracted=1)
+
     @classmethod
     def unfollow(cls, source, destination):
-        cls.query(source=source, destination=destination).delete()
+        if cls.query(source=source, destination=destination).delete():
+            PilotStats.increment(source.id, users_followed=-1)
+            PilotStats.increment(destination.id, followers_attracted=-1)
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 
+from math import floor, ceil
+
 from sqlalchemy import func
 from sqlalchemy.sql.expression import cast
 from geoalchemy2.elements import WKTElement
@@ -30,6 +32,16 @@ class Location(object):
             point = db.func.ST_SetSRID(point, srid)
         return point
 
+    @staticmethod
+    def make_multipoint(locations, srid=4326):
+        '''Returns a MULTIPOINT geometry containing all the locations'''
+
+        wkt = 'MULTIPOINT({0})'.format(', '.join(
+            '({0} {1})'.format(location.longitude, location.latitude)
+            for location in locations))
+
+        return WKTElement(wkt, srid=srid)
+
     @staticmethod
     def from_wkb(wkb):
         coords = to_shape(wkb)
@@ -40,6 +52,16 @@ class Location(object):
         if self.longitude > 180:
             self.longitude -= 360
 
+    def quantize(self, precision):
+        """
+        Returns a new location with the coordinates rounded to multiples
+        of `precision` degrees
+        """
+
+        return Location(
+            latitude=round(self.latitude / precision) * precision,
+            longitude=round(self.longitude / precision) * precision)
+
     def __str__(self):
         return self.to_wkt()
 
@@ -123,6 +145,22 @@ class Bounds(object):
         self.southwest.normalize()
         self.northeast.normalize()
 
+    def quantize(self, precision):
+        """
+        Returns new bounds that are extended to the next multiples of
+        `precision` degrees and contain these bounds
+        """
+
+        sw = Location(
+            latitude=max(floor(self.southwest.latitude / precision) * precision, -90),
+            longitude=floor(self.southwest.longitude / precision) * precision)
+
+        ne = Location(
+            latitude=min(ceil(self.northeast.latitude / precision) * precision, 90),
+            longitude=ceil(self.northeast.longitude / precision) * precision)
+
+        return Bounds(sw, ne)
+
     def make_box(self, srid=4326):
         box = db.func.ST_MakeBox2D(self.southwest.make_point(srid=None),
                                    self.northeast.make_point(srid=None))
@@ -1,9 +1,7 @@
 # -*- coding: utf-8 -*-
 
-import re
 from datetime import datetime
 
-from sqlalchemy.sql.expression import and_
 from sqlalchemy.types import Integer, DateTime, String, Unicode, Date
 
 from skylines.model import db
@@ -48,10 +46,24 @@ class IGCFile(db.Model):
     def may_delete(self, user):
         return user and user.is_manager()
 
+    @property
+    def path(self):
+        """Path of the stored (possibly compressed) file"""
+        return files.find_file(self.md5, self.filename)
+
+    @property
+    def local_path(self):
+        """Path of an uncompressed copy for external tools"""
+        return files.local_file(self.md5, self.filename)
+
+    def open(self):
+        return files.open_file(self.md5, self.filename)
+
     def update_igc_headers(self):
-        path = files.filename_to_path(self.filename)
-        igc_headers = read_igc_headers(path)
-        if igc_headers is None:
+        try:
+            with self.open() as f:
+                igc_headers = read_igc_headers(f)
+        except IOError:
             return
 
         if 'manufacturer_id' in igc_headers:
@@ -73,85 +85,32 @@ class IGCFile(db.Model):
             self.competition_id = igc_headers['cid']
 
     def guess_registration(self):
-        from skylines.model.flight import Flight
+        from skylines.model import LoggerAircraft
 
         # try to find another flight with the same logger and use it's aircraft registration
-        if (self.logger_id is not None
-                and self.logger_manufacturer_id is not None):
-            logger_id = self.logger_id
-            logger_manufacturer_id = self.logger_manufacturer_id
-
-            result = Flight.query().join(IGCFile) \
-                .filter(db.func.upper(IGCFile.logger_manufacturer_id) == db.func.upper(logger_manufacturer_id)) \
-                .filter(db.func.upper(IGCFile.logger_id) == db.func.upper(logger_id)) \
-                .filter(Flight.registration == None) \
-                .order_by(Flight.id.desc())
-
-            if self.logger_manufacturer_id.startswith('X'):
-                result = result.filter(Flight.pilot == self.owner)
-
-            result = result.first()
-
-            if result and result.registration:
-                return result.registration
+        logger = LoggerAircraft.by_igc_file(self)
+        if logger and logger.registration:
+            return logger.registration
 
         return None
 
     def guess_model(self):
-        from skylines.model import Flight, AircraftModel
+        from skylines.model import \
+            AircraftModel, LoggerAircraft, RegistrationModel
 
         # first try to find the reg number in the database
-        if self.registration is not None:
-            glider_reg = self.registration
-
-            result = Flight.query() \
-                .filter(db.func.upper(Flight.registration) == db.func.upper(glider_reg)) \
-                .order_by(Flight.id.desc()) \
-                .first()
-
-            if result and result.model_id:
-                return result.model_id
+        entry = RegistrationModel.by_registration(self.registration)
+        if entry:
+            return entry.model_id
 
         # try to find another flight with the same logger and use it's aircraft type
-        if (self.logger_id is not None
-                and self.logger_manufacturer_id is not None):
-            logger_id = self.logger_id
-            logger_manufacturer_id = self.logger_manufacturer_id
-
-            result = Flight.query().join(IGCFile) \
-                .filter(db.func.upper(IGCFile.logger_manufacturer_id) == db.func.upper(logger_manufacturer_id)) \
-                .filter(db.func.upper(IGCFile.logger_id) == db.func.upper(logger_id)) \
-                .filter(Flight.model_id == None) \
-                .order_by(Flight.id.desc())
-
-            if self.logger_manufacturer_id.startswith('X'):
-                result = result.filter(Flight.pilot == self.owner)
-
-            result = result.first()
-
-            if result and result.model_id:
-                return result.model_id
+        logger = LoggerAircraft.by_igc_file(self)
+        if logger and logger.model_id:
+            return logger.model_id
 
+        # otherwise, try to guess the glider model by the glider type igc header
         if self.model is not None:
-            glider_type = self.model.lower()
-
-            # otherwise, try to guess the glider model by the glider type igc header
-            text_fragments = ['%{}%'.format(v) for v in re.sub(r'[^a-z]', ' ', glider_type).split()]
-            digit_fragments = ['%{}%'.format(v) for v in re.sub(r'[^0-9]', ' ', glider_type).split()]
-
-            if not text_fragments and not digit_fragments:
-                return None
-
-            glider_type_clean = re.sub(r'[^a-z0-9]', '', glider_type)
-
-            result = AircraftModel.query() \
-                .filter(and_(
-                    db.func.regexp_replace(db.func.lower(AircraftModel.name), '[^a-z]', ' ').like(db.func.any(text_fragments)),
-                    db.func.regexp_replace(db.func.lower(AircraftModel.name), '[^0-9]', ' ').like(db.func.all(digit_fragments)))) \
-                .order_by(db.func.levenshtein(db.func.regexp_replace(db.func.lower(AircraftModel.name), '[^a-z0-9]', ''), glider_type_clean))
-
-            if result.first():
-                return result.first().id
+            return AircraftModel.guess_by_name(self.model)
 
         # nothing found
         return None
@@ -1,12 +1,24 @@
 # -*- coding: utf-8 -*-
 
+import math
 from datetime import datetime
 
 from sqlalchemy.types import Integer, Float, String, DateTime
 from sqlalchemy.sql.expression import cast
 from geoalchemy2.types import Geography, Geometry
+from geoalchemy2.shape import to_shape
+from shapely.geometry import box
+from shapely.strtree import STRtree
 
 from skylines.model import db
+from skylines.model.geo import Location
+from skylines.lib.geo import METERS_PER_DEGREE, geographic_distance
+
+# radius in meters around a location that waves are returned for
+WAVE_RADIUS = 5000
+
+# in-process index of the wave locations, see MountainWaveProject.load_index()
+_index = None
 
 
 class MountainWaveProject(db.Model):
@@ -39,9 +51,89 @@ class MountainWaveProject(db.Model):
 
     @classmethod
     def by_location(cls, location):
-        '''Returns a query object of mountain waves around the location'''
+        '''Returns the mountain waves around the location, either as a
+        query object or as a list of rows if the index has been loaded'''
+
+        if _index is not None:
+            return _index.lookup(location)
+
         return cls.query() \
             .filter(db.func.ST_DWithin(
                 cast(location.make_point(), Geography),
                 cast(cls.location, Geography),
-                5000))
+                WAVE_RADIUS))
+
+    @classmethod
+    def by_locations(cls, locations):
+        '''Returns a list with the mountain waves around each of the
+        locations.
+
+        Without the loaded index the waves around any of the locations
+        are selected by a single query and then assigned to the locations
+        in memory.'''
+
+        if not locations:
+            return []
+
+        index = _index
+        if index is None:
+            points = Location.make_multipoint(locations)
+            index = WaveIndex(cls.query()
+                              .filter(db.func.ST_DWithin(
+                                  cast(points, Geography),
+                                  cast(cls.location, Geography),
+                                  WAVE_RADIUS))
+                              .order_by(cls.id))
+
+        return [index.lookup(location) for location in locations]
+
+    @classmethod
+    def load_index(cls):
+        '''Loads the locations of all waves into an in-process spatial
+        index, which is used by by_location() instead of database
+        queries.
+
+        The index only holds plain rows of the columns that are needed by
+        the API, so it can be shared by all threads.'''
+
+        global _index
+        _index = WaveIndex(db.session.query(
+            cls.id, cls.name, cls.main_wind_direction, cls.location)
+            .order_by(cls.id))
+
+
+class WaveIndex(object):
+    def __init__(self, waves):
+        """ `waves` is an iterable of MountainWaveProject objects or rows
+        with a `location` column, which are returned by the lookups """
+
+        self.waves = {}
+
+        points = []
+        for i, wave in enumerate(waves):
+            if wave.location is None:
+                continue
+
+            point = to_shape(wave.location)
+            points.append(point)
+            self.waves[id(point)] = \
+                (i, wave, Location(latitude=point.y, longitude=point.x))
+
+        self.tree = STRtree(points)
+
+    def lookup(self, location):
+        # search the candidates within a box around the location first
+        dlat = float(WAVE_RADIUS) / METERS_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(location.latitude)), 0.01)
+
+        area = box(location.longitude - dlon, location.latitude - dlat,
+                   location.longitude + dlon, location.latitude + dlat)
+
+        result = []
+        for point in self.tree.query(area):
+            i, wave, wave_location = self.waves[id(point)]
+            if geographic_distance(location, wave_location) <= WAVE_RADIUS:
+                result.append((i, wave))
+
+        result.sort()
+        return [row[1] for row in result]
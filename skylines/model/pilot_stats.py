@@ -0,0 +1,251 @@
+# -*- coding: utf-8 -*-
+
+from sqlalchemy.event import listens_for
+from sqlalchemy.sql.expression import case, select, union, distinct
+from sqlalchemy.types import Integer, BigInteger
+
+from skylines.model import db
+from skylines.model.user import User
+
+COUNTERS = ['tracks_uploaded', 'users_followed', 'followers_attracted',
+            'comments_made']
+
+FLIGHT_STATS = ['distance', 'takeoff_airport_count', 'takeoff_country_count',
+                'aircraft_model_count', 'pic_seconds', 'copilot_seconds']
+
+
+class PilotStats(db.Model):
+    """Denormalised activity statistics of a user, used for checking the
+    user achievements.
+
+    Every user has a row, which is inserted together with the user. The
+    counters are updated by the code that changes the counted records, the
+    flight statistics are updated with :meth:`update_flight_stats` when
+    flights change."""
+
+    __tablename__ = 'pilot_stats'
+
+    user_id = db.Column(
+        Integer, db.ForeignKey('users.id', ondelete='CASCADE'),
+        primary_key=True)
+
+    tracks_uploaded = db.Column(Integer, nullable=False, default=0)
+    users_followed = db.Column(Integer, nullable=False, default=0)
+    followers_attracted = db.Column(Integer, nullable=False, default=0)
+    comments_made = db.Column(Integer, nullable=False, default=0)
+
+    # statistics of all flights as pilot or co-pilot
+    distance = db.Column(BigInteger, nullable=False, default=0)
+    takeoff_airport_count = db.Column(Integer, nullable=False, default=0)
+    takeoff_country_count = db.Column(Integer, nullable=False, default=0)
+    aircraft_model_count = db.Column(Integer, nullable=False, default=0)
+    pic_seconds = db.Column(BigInteger, nullable=False, default=0)
+    copilot_seconds = db.Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<PilotStats: user_id=%d>' % self.user_id
+
+    @property
+    def total_distance(self):
+        """Total distance in km"""
+        return self.distance / 1000.0
+
+    @property
+    def pic_hours(self):
+        return self.pic_seconds / 3600.0
+
+    @property
+    def copilot_hours(self):
+        return self.copilot_seconds / 3600.0
+
+    @classmethod
+    def compute(cls, user):
+        """Returns new (transient) statistics of the user, computed from
+        scratch."""
+
+        stats = compute_pilot_stats([user.id]).get(user.id, {})
+        return cls(user_id=user.id, **_with_defaults(stats))
+
+    @classmethod
+    def compute_many(cls, user_ids=None):
+        """Returns new (transient) statistics of the given (or all active)
+        users as dict indexed by user id."""
+
+        return dict((user_id, cls(user_id=user_id, **_with_defaults(stats)))
+                    for user_id, stats
+                    in compute_pilot_stats(user_ids).iteritems())
+
+    @classmethod
+    def for_user(cls, user):
+        """Returns the statistics of the user. If the row is missing (e.g.
+        `users stats` has not been run after the migration yet) they are
+        computed without being stored."""
+
+        stats = cls.get(user.id)
+        if stats is None:
+            stats = cls.compute(user)
+
+        return stats
+
+    @classmethod
+    def increment(cls, user_id, **deltas):
+        """Adds the `deltas` to the counters of the user."""
+
+        if user_id is None:
+            return
+
+        values = dict((getattr(cls, name), getattr(cls, name) + delta)
+                      for name, delta in deltas.iteritems())
+
+        cls.query(user_id=user_id) \
+            .update(values, synchronize_session='evaluate')
+
+    @classmethod
+    def update_flight_stats(cls, user_ids):
+        """Recomputes the flight statistics of the given users, e.g. after
+        one of their flights has been analysed or its pilots changed."""
+
+        user_ids = set(id for id in user_ids if id is not None)
+        if not user_ids:
+            return
+
+        rows = cls.query().filter(cls.user_id.in_(user_ids)).all()
+        if not rows:
+            return
+
+        flight_stats = _compute_flight_stats([row.user_id for row in rows])
+        for row in rows:
+            stats = flight_stats.get(row.user_id, {})
+            for name in FLIGHT_STATS:
+                setattr(row, name, stats.get(name, 0))
+
+    @classmethod
+    def remove_flight_comments(cls, flight_ids):
+        """Subtracts the comments on the given flights from the counters
+        of their authors. Needs to be called before the flights are
+        deleted, because their comments are deleted by the database."""
+
+        from skylines.model import FlightComment
+
+        query = db.session.query(FlightComment.user_id, db.func.count()) \
+            .filter(FlightComment.flight_id.in_(flight_ids)) \
+            .group_by(FlightComment.user_id)
+
+        for user_id, count in query:
+            cls.increment(user_id, comments_made=-count)
+
+    @classmethod
+    def recompute(cls, user_ids):
+        """Recomputes all statistics of the given users from scratch, e.g.
+        after their records have been merged."""
+
+        stats = compute_pilot_stats(user_ids)
+
+        for row in cls.query().filter(cls.user_id.in_(user_ids)):
+            for name, value in _with_defaults(stats.get(row.user_id, {})) \
+                    .iteritems():
+                setattr(row, name, value)
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes the statistics of all users. Returns the number of
+        users."""
+
+        stats = compute_pilot_stats()
+
+        cls.query().delete()
+
+        rows = [dict(user_id=user_id, **_with_defaults(stats.get(user_id, {})))
+                for user_id, in db.session.query(User.id)]
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+
+        return len(rows)
+
+
+def compute_pilot_stats(user_ids=None):
+    """Computes the statistics of the given (or all) users with grouped
+    queries. Returns a dict of dicts indexed by user id; users without any
+    activity are missing."""
+
+    from skylines.model import IGCFile, Follower, FlightComment
+
+    result = {}
+
+    def add(name, column):
+        query = db.session.query(column, db.func.count()).group_by(column)
+        if user_ids is not None:
+            query = query.filter(column.in_(user_ids))
+
+        for user_id, count in query:
+            result.setdefault(user_id, {})[name] = count
+
+    add('tracks_uploaded', IGCFile.owner_id)
+    add('users_followed', Follower.source_id)
+    add('followers_attracted', Follower.destination_id)
+    add('comments_made', FlightComment.user_id)
+
+    for user_id, stats in _compute_flight_stats(user_ids).iteritems():
+        result.setdefault(user_id, {}).update(stats)
+
+    return result
+
+
+def _compute_flight_stats(user_ids=None):
+    from skylines.model import Flight, Airport
+
+    flights = Flight.__table__.alias('pilot_flights')
+
+    pilots = select([flights.c.pilot_id.label('user_id'),
+                     flights.c.id.label('flight_id')]) \
+        .where(flights.c.pilot_id != None)
+
+    co_pilots = select([flights.c.co_pilot_id.label('user_id'),
+                        flights.c.id.label('flight_id')]) \
+        .where(flights.c.co_pilot_id != None)
+
+    if user_ids is not None:
+        pilots = pilots.where(flights.c.pilot_id.in_(user_ids))
+        co_pilots = co_pilots.where(flights.c.co_pilot_id.in_(user_ids))
+
+    # every flight only once per user, even if pilot and co-pilot are equal
+    pairs = union(pilots, co_pilots).alias('pairs')
+
+    duration = Flight.landing_time - Flight.takeoff_time
+
+    query = db.session.query(
+        pairs.c.user_id,
+        db.func.sum(Flight.olc_classic_distance),
+        db.func.count(distinct(Flight.takeoff_airport_id)),
+        db.func.count(distinct(Airport.country_code)),
+        db.func.count(distinct(Flight.model_id)),
+        db.func.sum(case([(Flight.pilot_id == pairs.c.user_id, duration)])),
+        db.func.sum(case([(Flight.co_pilot_id == pairs.c.user_id, duration)]))) \
+        .select_from(Flight) \
+        .join(pairs, pairs.c.flight_id == Flight.id) \
+        .outerjoin(Airport, Airport.id == Flight.takeoff_airport_id) \
+        .group_by(pairs.c.user_id)
+
+    result = {}
+    for user_id, distance, airports, countries, models, pic, copilot \
+            in query:
+        result[user_id] = dict(
+            distance=distance or 0,
+            takeoff_airport_count=airports,
+            takeoff_country_count=countries,
+            aircraft_model_count=models,
+            pic_seconds=int(pic.total_seconds()) if pic else 0,
+            copilot_seconds=int(copilot.total_seconds()) if copilot else 0)
+
+    return result
+
+
+def _with_defaults(stats):
+    return dict((name, stats.get(name, 0)) for name in COUNTERS + FLIGHT_STATS)
+
+
+@listens_for(User, 'after_insert')
+def insert_pilot_stats(mapper, connection, user):
+    # a new user has no activity yet, so all values are zero
+    connection.execute(PilotStats.__table__.insert(),
+                       dict(_with_defaults({}), user_id=user.id))
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+from datetime import date
+
+from sqlalchemy.sql.expression import select, and_
+from sqlalchemy.types import Integer, SmallInteger, Float
+
+from skylines.model import db
+
+
+class RankingScore(db.Model):
+    """The number of flights and the total index score of a pilot, club or
+    takeoff airport per year, for the ranking pages.
+
+    The scores of the flights that have been analysed, changed or deleted
+    are added or subtracted by :meth:`update`."""
+
+    __tablename__ = 'ranking_scores'
+
+    class EntityType:
+        PILOT = 1
+        CLUB = 2
+        AIRPORT = 3
+
+    # `year` of the scores of all flights
+    ALL_TIME = 0
+
+    entity_type = db.Column(SmallInteger, primary_key=True)
+    entity_id = db.Column(Integer, primary_key=True)
+    year = db.Column(Integer, primary_key=True)
+
+    count = db.Column(Integer, nullable=False, default=0)
+    total = db.Column(Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_ranking_scores_total', entity_type, year, total),
+    )
+
+    def __repr__(self):
+        return '<RankingScore: type=%d id=%d year=%d>' % (
+            self.entity_type, self.entity_id, self.year)
+
+    @classmethod
+    def keys_for_flight(cls, flight):
+        """Returns the (entity_type, entity_id, year) keys of the scores
+        that the flight is counted for."""
+
+        years = [cls.ALL_TIME]
+        if flight.date_local is not None:
+            years.append(flight.date_local.year)
+
+        keys = set()
+        for entity_type, field in ENTITY_FIELDS.iteritems():
+            entity_id = getattr(flight, field)
+            if entity_id is not None:
+                keys.update((entity_type, entity_id, year) for year in years)
+
+        return keys
+
+    @classmethod
+    def scores_for_flight(cls, flight):
+        """Returns the (count, total) that the flight adds to the scores,
+        indexed by their (entity_type, entity_id, year) keys.
+
+        The index score is read from the database, so that it matches the
+        scores of :meth:`rebuild`. Flights that have not been inserted yet
+        don't add anything."""
+
+        from skylines.model import Flight
+
+        if flight.id is None:
+            return {}
+
+        total = db.session.query(Flight.index_score) \
+            .select_from(Flight) \
+            .outerjoin(Flight.model) \
+            .filter(Flight.id == flight.id) \
+            .scalar()
+
+        return dict((key, (1, total or 0))
+                    for key in cls.keys_for_flight(flight))
+
+    @classmethod
+    def update(cls, old_scores=(), new_scores=()):
+        """Applies the difference between the :meth:`scores_for_flight` of
+        some flights before and after they have been changed. The scores
+        of deleted flights are only in `old_scores`, the scores of new
+        flights only in `new_scores`."""
+
+        deltas = defaultdict(lambda: [0, 0])
+        for scores, sign in ((old_scores, -1), (new_scores, 1)):
+            for flight_scores in scores:
+                for key, (count, total) in flight_scores.iteritems():
+                    deltas[key][0] += sign * count
+                    deltas[key][1] += sign * total
+
+        deltas = dict((key, delta) for key, delta in deltas.iteritems()
+                      if delta != [0, 0])
+
+        if not deltas:
+            return
+
+        _lock_entities(deltas)
+
+        table = cls.__table__
+        for (entity_type, entity_id, year), (count, total) in \
+                deltas.iteritems():
+            key_filter = and_(table.c.entity_type == entity_type,
+                              table.c.entity_id == entity_id,
+                              table.c.year == year)
+
+            result = db.session.execute(table.update().where(key_filter)
+                                        .values(count=table.c.count + count,
+                                                total=table.c.total + total))
+
+            if result.rowcount == 0 and count > 0:
+                db.session.execute(table.insert(), dict(
+                    entity_type=entity_type, entity_id=entity_id,
+                    year=year, count=count, total=total))
+
+            # entities without flights are removed from the ranking
+            elif count < 0:
+                db.session.execute(table.delete().where(
+                    and_(key_filter, table.c.count <= 0)))
+
+    @classmethod
+    def recompute(cls, keys):
+        """Recomputes the scores of the given (entity_type, entity_id, year)
+        keys from the flights."""
+
+        keys = set(keys)
+
+        groups = defaultdict(set)
+        for entity_type, entity_id, year in keys:
+            groups[(entity_type, year)].add(entity_id)
+
+        if not groups:
+            return
+
+        _lock_entities(keys)
+
+        for (entity_type, year), entity_ids in groups.iteritems():
+            scores = compute_ranking_scores(entity_type, year, entity_ids)
+
+            cls.query(entity_type=entity_type, year=year) \
+                .filter(cls.entity_id.in_(entity_ids)) \
+                .delete(synchronize_session=False)
+
+            if scores:
+                db.session.execute(cls.__table__.insert(), [
+                    dict(entity_type=entity_type, entity_id=entity_id,
+                         year=year, count=count, total=total)
+                    for entity_id, (count, total) in scores.iteritems()])
+
+    @classmethod
+    def update_entities(cls, entity_type, entity_ids):
+        """Recomputes all scores of the given entities, e.g. after their
+        flights have been moved to another entity."""
+
+        years = set([cls.ALL_TIME])
+        years.update(year for year, in db.session.query(cls.year)
+                     .filter_by(entity_type=entity_type)
+                     .filter(cls.entity_id.in_(entity_ids))
+                     .distinct())
+
+        cls.recompute((entity_type, entity_id, year)
+                      for entity_id in entity_ids for year in years)
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes the scores of all entities from all flights. Returns
+        the number of scores."""
+
+        from skylines.model import Flight
+
+        cls.query().delete()
+
+        rows = []
+        for entity_type, field in ENTITY_FIELDS.iteritems():
+            field = getattr(Flight, field)
+            query = _score_query(field, Flight.year) \
+                .group_by(field, Flight.year)
+
+            all_time = defaultdict(lambda: [0, 0])
+            for entity_id, year, count, total in query:
+                rows.append(dict(entity_type=entity_type, entity_id=entity_id,
+                                 year=int(year), count=count,
+                                 total=total or 0))
+
+                all_time[entity_id][0] += count
+                all_time[entity_id][1] += total or 0
+
+            rows.extend(dict(entity_type=entity_type, entity_id=entity_id,
+                             year=cls.ALL_TIME, count=count, total=total)
+                        for entity_id, (count, total) in all_time.iteritems())
+
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+
+        return len(rows)
+
+
+ENTITY_FIELDS = {
+    RankingScore.EntityType.PILOT: 'pilot_id',
+    RankingScore.EntityType.CLUB: 'club_id',
+    RankingScore.EntityType.AIRPORT: 'takeoff_airport_id',
+}
+
+
+def _lock_entities(keys):
+    # serialise concurrent updates of the same entities (e.g. by the
+    # analysis of several flights of a pilot), the locks are released at
+    # the end of the transaction
+    for entity_type, entity_id in sorted(set(
+            (entity_type, entity_id) for entity_type, entity_id, year in keys)):
+        db.session.execute(select([
+            db.func.pg_advisory_xact_lock(entity_type, entity_id)]))
+
+
+def compute_ranking_scores(entity_type, year, entity_ids=None):
+    """Returns a dict of (count, total) tuples indexed by entity id for
+    the flights of the given (or all) entities in the year."""
+
+    from skylines.model import Flight
+
+    field = getattr(Flight, ENTITY_FIELDS[entity_type])
+
+    query = _score_query(field).group_by(field)
+
+    if entity_ids is not None:
+        query = query.filter(field.in_(entity_ids))
+
+    if year != RankingScore.ALL_TIME:
+        query = query.filter(Flight.date_local >= date(year, 1, 1)) \
+                     .filter(Flight.date_local <= date(year, 12, 31))
+
+    return dict((entity_id, (count, total or 0))
+                for entity_id, count, total in query)
+
+
+def _score_query(field, *columns):
+    from skylines.model import Flight
+
+    columns = (field,) + columns + \
+        (db.func.count('*'), db.func.sum(Flight.index_score))
+
+    return db.session.query(*columns) \
+        .outerjoin(Flight.model) \
+        .filter(field != None)
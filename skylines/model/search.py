@@ -1,9 +1,15 @@
 import shlex
+import threading
+import time
 
-from sqlalchemy import literal_column, cast, desc, Unicode
+from flask import current_app
+
+from sqlalchemy import literal_column, cast, desc, or_, Unicode
+from sqlalchemy.sql.expression import false
 from sqlalchemy.dialects.postgresql import array
 
 from skylines.model import db
+from skylines.lib.typeahead import PrefixIndex
 
 
 PATTERNS = [
@@ -13,6 +19,14 @@ PATTERNS = [
     ('%{}%', 1),   # Has token
 ]
 
+# the typeahead indexes are rebuilt after this many seconds to pick up new
+# and renamed records
+TYPEAHEAD_INDEX_TIMEOUT = 5 * 60
+
+_typeahead_indexes = {}
+_typeahead_updating = set()
+_typeahead_lock = threading.Lock()
+
 ##############################
 
 
@@ -63,7 +77,13 @@ def search_query(cls, tokens,
 
     # Filter out results that don't match the patterns at all (optional)
     if not include_misses:
-        query = query.filter(weight > 0)
+        # The default weight is positive for the rows that contain any of
+        # the tokens, which can be looked up in the trigram indexes instead
+        # of computing the weight of every row
+        if tokens and weight_func is weight_expression:
+            query = query.filter(match_expression(columns, tokens))
+        else:
+            query = query.filter(weight > 0)
 
     # Order by weight (optional)
     if ordered:
@@ -80,10 +100,11 @@ def combined_search_query(models, tokens, include_misses=False, ordered=True):
         tokens, include_misses=include_misses, ordered=False)
         for model in models]
 
-    # Build combined search query
+    # Build combined search query, the results of the models can't be
+    # duplicates of each other
     query = queries[0]
     if len(queries) > 1:
-        query = query.union(*queries[1:])
+        query = query.union_all(*queries[1:])
 
     # Order by weight (optional)
     if ordered:
@@ -94,6 +115,117 @@ def combined_search_query(models, tokens, include_misses=False, ordered=True):
 ##############################
 
 
+def typeahead(models, text, limit=10, group=None):
+    """
+    Returns up to `limit` (model, id, name) tuples of the records of the
+    models with a name that has a word starting with every word of the
+    text, for completing the text of a search field.
+
+    The lookups are answered by in-memory prefix indexes of the
+    searchable columns. If a group is given only the records of the
+    models with a `__typeahead_group_column__` in that group are returned,
+    e.g. the members of a club.
+
+    Until the first index of a model has been built the records are
+    searched in the database instead.
+    """
+
+    result = []
+    for model in models:
+        if group is not None and \
+                not hasattr(model, '__typeahead_group_column__'):
+            continue
+
+        index = get_typeahead_index(model)
+        if index is not None:
+            matches = index.lookup(text, limit - len(result), group)
+        else:
+            matches = typeahead_query(model, text, group) \
+                .limit(limit - len(result))
+
+        for id, name in matches:
+            result.append((model.__name__, id, name))
+
+        if len(result) >= limit:
+            break
+
+    return result
+
+
+def typeahead_query(model, text, group=None):
+    tokens = escape_tokens(text_to_tokens(text))
+
+    query = model.search_query(tokens).with_entities(model.id, model.name)
+    if not tokens:
+        query = query.filter(false())
+
+    if group is not None:
+        query = query.filter(
+            getattr(model, model.__typeahead_group_column__) == group)
+
+    return query
+
+
+def get_typeahead_index(model):
+    """
+    Returns the typeahead index of the model or None if it has not been
+    built yet.
+
+    If the index is older than TYPEAHEAD_INDEX_TIMEOUT it is rebuilt from
+    the database by a background thread, and the old index is returned
+    until the new one is ready.
+    """
+
+    index, index_time = _typeahead_indexes.get(model, (None, 0))
+    if index is None or time.time() - index_time > TYPEAHEAD_INDEX_TIMEOUT:
+        with _typeahead_lock:
+            if model not in _typeahead_updating:
+                _typeahead_updating.add(model)
+
+                thread = threading.Thread(
+                    target=_update_typeahead_index,
+                    args=(current_app._get_current_object(), model))
+                thread.daemon = True
+                thread.start()
+
+    return index
+
+
+def _update_typeahead_index(app, model):
+    try:
+        with app.app_context():
+            index = PrefixIndex(typeahead_entries(model))
+
+        _typeahead_indexes[model] = (index, time.time())
+
+    except Exception:
+        app.logger.exception(
+            'Building the typeahead index of {} failed'.format(model.__name__))
+
+    finally:
+        with _typeahead_lock:
+            _typeahead_updating.discard(model)
+
+
+def typeahead_entries(model):
+    # Read the searchable columns from the table (strings)
+    columns = [getattr(model, c) for c in model.__searchable_columns__]
+
+    group = getattr(model, '__typeahead_group_column__', None)
+    if group:
+        group = getattr(model, group)
+    else:
+        group = literal_column('NULL')
+
+    query = db.session.query(model.id, model.name, group, *columns)
+
+    for row in query:
+        text = u' '.join(unicode(value) for value in row[3:] if value)
+        yield row[0], row[1], row[2], text
+
+##############################
+
+
 def process_type_option(models, tokens):
     """
     This function looks for "type:<type>" in the tokens and filters the
@@ -217,6 +349,25 @@ def weight_expression(columns, tokens):
 
     return sum(expressions)
 
+
+def match_expression(columns, tokens):
+    """
+    Returns an expression that matches the rows with any of the tokens in
+    any of the columns, which are the rows with a positive
+    weight_expression(). Unlike the weight it can be answered by the
+    trigram indexes of the searchable columns.
+
+    Empty and whitespace-only tokens are ignored, because they would match
+    every row.
+    """
+
+    tokens = [token for token in tokens if token.strip()]
+    if not tokens:
+        return false()
+
+    return or_(*[column.ilike('%{}%'.format(token))
+                 for column in columns for token in tokens])
+
 ##############################
 
 
@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+
+from sqlalchemy.sql.expression import select, case, distinct, and_, tuple_
+from sqlalchemy.types import Integer, BigInteger
+
+from skylines.model import db
+
+# first key of the advisory locks of the statistics, must not collide with
+# the entity types of RankingScore
+LOCK_ID = 100
+
+
+class FlightStatistics(db.Model):
+    """The number, distance and duration of the flights per year, pilot,
+    club and takeoff airport, for the statistics pages.
+
+    Unknown pilots, clubs or airports are stored as 0. The rows of a
+    flight are recomputed by :meth:`update` when it is analysed, changed
+    or deleted."""
+
+    __tablename__ = 'flight_statistics'
+
+    year = db.Column(Integer, primary_key=True)
+    pilot_id = db.Column(Integer, primary_key=True)
+    club_id = db.Column(Integer, primary_key=True)
+    takeoff_airport_id = db.Column(Integer, primary_key=True)
+
+    flights = db.Column(Integer, nullable=False, default=0)
+    distance = db.Column(BigInteger, nullable=False, default=0)
+    duration = db.Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_flight_statistics_pilot_id', pilot_id),
+        db.Index('ix_flight_statistics_club_id', club_id),
+        db.Index('ix_flight_statistics_takeoff_airport_id',
+                 takeoff_airport_id),
+    )
+
+    def __repr__(self):
+        return '<FlightStatistics: year=%d pilot=%d club=%d airport=%d>' % (
+            self.year, self.pilot_id, self.club_id, self.takeoff_airport_id)
+
+    @staticmethod
+    def key_for_flight(flight):
+        """Returns the (year, pilot_id, club_id, takeoff_airport_id) key of
+        the statistics that the flight is counted for, or None if the flight
+        has not been analysed yet."""
+
+        if flight.date_local is None:
+            return None
+
+        return (flight.date_local.year, flight.pilot_id or 0,
+                flight.club_id or 0, flight.takeoff_airport_id or 0)
+
+    @classmethod
+    def keys_for_pilot(cls, pilot_id):
+        query = db.session.query(cls.year, cls.pilot_id, cls.club_id,
+                                 cls.takeoff_airport_id) \
+            .filter_by(pilot_id=pilot_id)
+
+        return set(tuple(key) for key in query)
+
+    @classmethod
+    def update(cls, keys):
+        """Recomputes the statistics of the given keys from the flights and
+        adds the differences to the totals of their years."""
+
+        keys = set(key for key in keys if key is not None)
+        years = sorted(set(key[0] for key in keys))
+
+        # serialise concurrent updates of the same years, the locks are
+        # released at the end of the transaction
+        for year in years:
+            db.session.execute(select([
+                db.func.pg_advisory_xact_lock(LOCK_ID, year)]))
+
+        # the pilots are counted once per year, no matter how many rows
+        # they have
+        pilots = set((key[0], key[1]) for key in keys if key[1])
+        old_pilots = _pilots_with_statistics(pilots)
+
+        totals = dict((year, [0, 0, 0]) for year in years)
+
+        rows = []
+        for key in keys:
+            query = db.session.query(cls).filter(*_key_filter(cls, key))
+
+            old = query.with_entities(
+                cls.flights, cls.distance, cls.duration).first()
+            if old is not None:
+                _add_totals(totals[key[0]], old, -1)
+
+            query.delete(synchronize_session=False)
+
+            row = _compute_statistics(key)
+            if row is not None:
+                rows.append(row)
+                _add_totals(totals[key[0]], (
+                    row['flights'], row['distance'], row['duration']), 1)
+
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+
+        new_pilots = _pilots_with_statistics(pilots)
+
+        for year, (flights, distance, duration) in totals.iteritems():
+            added = set(p for p in new_pilots - old_pilots if p[0] == year)
+            removed = set(p for p in old_pilots - new_pilots if p[0] == year)
+
+            YearStatistics.add(year, flights=flights,
+                               pilots=len(added) - len(removed),
+                               distance=distance, duration=duration)
+
+    @classmethod
+    def by_year(cls, pilot_id=None, club_id=None, takeoff_airport_id=None):
+        """Returns a query of the (year, flights, pilots, distance, duration)
+        statistics of the selected flights per year."""
+
+        query = db.session.query(
+            cls.year.label('year'),
+            db.func.sum(cls.flights).label('flights'),
+            _count_pilots(cls.pilot_id).label('pilots'),
+            db.func.sum(cls.distance).label('distance'),
+            db.func.sum(cls.duration).label('duration'))
+
+        if pilot_id is not None:
+            query = query.filter(cls.pilot_id == pilot_id)
+        if club_id is not None:
+            query = query.filter(cls.club_id == club_id)
+        if takeoff_airport_id is not None:
+            query = query.filter(cls.takeoff_airport_id == takeoff_airport_id)
+
+        return query.group_by(cls.year).order_by(cls.year.desc())
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes the statistics of all flights. Returns the number of
+        rows."""
+
+        from skylines.model import Flight
+
+        cls.query().delete()
+        YearStatistics.query().delete()
+
+        pilot_id = db.func.coalesce(Flight.pilot_id, 0)
+        club_id = db.func.coalesce(Flight.club_id, 0)
+        takeoff_airport_id = db.func.coalesce(Flight.takeoff_airport_id, 0)
+
+        query = _statistics_query(
+            Flight.year, pilot_id, club_id, takeoff_airport_id) \
+            .group_by(Flight.year, pilot_id, club_id, takeoff_airport_id)
+
+        rows = []
+        for year, pilot_id, club_id, takeoff_airport_id, flights, distance, \
+                duration in query:
+            rows.append(dict(
+                year=int(year), pilot_id=pilot_id, club_id=club_id,
+                takeoff_airport_id=takeoff_airport_id, flights=flights,
+                distance=distance or 0,
+                duration=int(duration.total_seconds()) if duration else 0))
+
+        if rows:
+            db.session.execute(cls.__table__.insert(), rows)
+
+        years = [dict(year=row.year, flights=row.flights, pilots=row.pilots,
+                      distance=row.distance, duration=row.duration)
+                 for row in cls.by_year()]
+
+        if years:
+            db.session.execute(YearStatistics.__table__.insert(), years)
+
+        return len(rows)
+
+
+class YearStatistics(db.Model):
+    """The totals of the :class:`FlightStatistics` of a year."""
+
+    __tablename__ = 'year_statistics'
+
+    year = db.Column(Integer, primary_key=True)
+
+    flights = db.Column(Integer, nullable=False, default=0)
+    pilots = db.Column(Integer, nullable=False, default=0)
+    distance = db.Column(BigInteger, nullable=False, default=0)
+    duration = db.Column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return '<YearStatistics: year=%d>' % self.year
+
+    @classmethod
+    def add(cls, year, **deltas):
+        """Adds the given `flights`, `pilots`, `distance` and `duration`
+        to the totals of the year. The year is removed when it has no
+        flights anymore."""
+
+        if not any(deltas.values()):
+            return
+
+        table = cls.__table__
+
+        result = db.session.execute(
+            table.update().where(table.c.year == year).values(**dict(
+                (name, getattr(table.c, name) + value)
+                for name, value in deltas.iteritems())))
+
+        if result.rowcount == 0:
+            if deltas.get('flights', 0) > 0:
+                db.session.execute(table.insert(), dict(year=year, **deltas))
+
+        elif deltas.get('flights', 0) < 0:
+            db.session.execute(table.delete().where(
+                and_(table.c.year == year, table.c.flights <= 0)))
+
+    @classmethod
+    def by_year(cls):
+        """Returns a query of the (year, flights, pilots, distance, duration)
+        statistics of all flights per year."""
+
+        return db.session.query(cls.year, cls.flights, cls.pilots,
+                                cls.distance, cls.duration) \
+            .order_by(cls.year.desc())
+
+
+def _key_filter(cls, key):
+    year, pilot_id, club_id, takeoff_airport_id = key
+    return [cls.year == year, cls.pilot_id == pilot_id,
+            cls.club_id == club_id,
+            cls.takeoff_airport_id == takeoff_airport_id]
+
+
+def _add_totals(totals, values, sign):
+    for i, value in enumerate(values):
+        totals[i] += sign * value
+
+
+def _pilots_with_statistics(pilots):
+    """Returns the (year, pilot_id) tuples of the given set that have
+    statistics rows."""
+
+    if not pilots:
+        return set()
+
+    cls = FlightStatistics
+    query = db.session.query(cls.year, cls.pilot_id) \
+        .filter(tuple_(cls.year, cls.pilot_id).in_(pilots)) \
+        .distinct()
+
+    return set(tuple(row) for row in query)
+
+
+def _flight_filter(column, value):
+    return column == value if value else column == None
+
+
+def _count_pilots(pilot_id):
+    # the flights of unknown pilots are stored as pilot 0
+    return db.func.count(distinct(case([(pilot_id != 0, pilot_id)])))
+
+
+def _statistics_query(*columns):
+    from skylines.model import Flight
+
+    columns += (db.func.count('*'),
+                db.func.sum(Flight.olc_classic_distance),
+                db.func.sum(Flight.duration))
+
+    return db.session.query(*columns)
+
+
+def _compute_statistics(key):
+    from skylines.model import Flight
+
+    year, pilot_id, club_id, takeoff_airport_id = key
+
+    flights, distance, duration = _statistics_query() \
+        .filter(_flight_filter(Flight.pilot_id, pilot_id)) \
+        .filter(_flight_filter(Flight.club_id, club_id)) \
+        .filter(_flight_filter(Flight.takeoff_airport_id, takeoff_airport_id)) \
+        .filter(Flight.date_local >= date(year, 1, 1)) \
+        .filter(Flight.date_local <= date(year, 12, 31)) \
+        .one()
+
+    if not flights:
+        return None
+
+    return dict(year=year, pilot_id=pilot_id, club_id=club_id,
+                takeoff_airport_id=takeoff_airport_id, flights=flights,
+                distance=distance or 0,
+                duration=int(duration.total_seconds()) if duration else 0)
@@ -1,9 +1,23 @@
 from pytz import timezone
 from sqlalchemy.types import Integer, String
 from geoalchemy2.types import Geometry
+from geoalchemy2.shape import to_shape
+from shapely.geometry import Point
+from shapely.prepared import prep
+from shapely.strtree import STRtree
 
 from skylines.model import db
 
+# time zones of recently resolved locations and airports
+_cache = {}
+_CACHE_SIZE = 10000
+
+# locations are rounded to about 1 km for the cache
+_CACHE_PRECISION = 2
+
+# in-process index of the time zone polygons, see TimeZone.load_index()
+_index = None
+
 
 class TimeZone(db.Model):
     __tablename__ = 'tz_world'
@@ -19,11 +33,68 @@ class TimeZone(db.Model):
         return ('<TimeZone: id=%d tzid=\'%s\'>' % (self.id, self.tzid)).encode('unicode_escape')
 
     @classmethod
-    def by_location(cls, location):
-        location = location.make_point(srid=None)
-        filter = db.func.ST_Contains(cls.the_geom, location)
-        zone = db.session.query(cls.tzid).filter(filter).scalar()
-        if zone is None:
-            return None
-
-        return timezone(unicode(zone))
+    def by_location(cls, location, airport=None):
+        """Returns the time zone of the location. Results are cached per
+        airport (if given) or per rounded location."""
+
+        if airport is not None and airport.id is not None:
+            key = ('airport', airport.id)
+        else:
+            key = (round(location.latitude, _CACHE_PRECISION),
+                   round(location.longitude, _CACHE_PRECISION))
+
+        if key in _cache:
+            return _cache[key]
+
+        if _index is not None:
+            zone = _index.lookup(location)
+        else:
+            location = location.make_point(srid=None)
+            filter = db.func.ST_Contains(cls.the_geom, location)
+            zone = db.session.query(cls.tzid).filter(filter).scalar()
+
+        if zone is not None:
+            zone = timezone(unicode(zone))
+
+        if len(_cache) >= _CACHE_SIZE:
+            _cache.clear()
+
+        _cache[key] = zone
+        return zone
+
+    @classmethod
+    def load_index(cls):
+        """Loads all time zone polygons into an in-process spatial index,
+        which is used by by_location() instead of database queries. This
+        is useful for processing large numbers of flights."""
+
+        global _index
+        _index = TimeZoneIndex(db.session.query(cls.tzid, cls.the_geom))
+
+
+class TimeZoneIndex(object):
+    def __init__(self, zones):
+        """ `zones` is an iterable of (tzid, geometry) tuples """
+
+        self.zones = {}
+
+        geometries = []
+        for tzid, geometry in zones:
+            if geometry is None:
+                continue
+
+            geometry = to_shape(geometry)
+            geometries.append(geometry)
+            self.zones[id(geometry)] = (tzid, prep(geometry))
+
+        self.tree = STRtree(geometries)
+
+    def lookup(self, location):
+        point = Point(location.longitude, location.latitude)
+
+        for geometry in self.tree.query(point):
+            tzid, prepared = self.zones[id(geometry)]
+            if prepared.contains(point):
+                return tzid
+
+        return None
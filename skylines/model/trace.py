@@ -50,10 +50,14 @@ class Trace(db.Model):
 
     @locations.setter
     def locations(self, locations):
+        self._locations = WKTElement(
+            self.locations_to_wkt(locations), srid=4326)
+
+    @staticmethod
+    def locations_to_wkt(locations):
         points = ['{} {}'.format(location.longitude, location.latitude)
                   for location in locations]
-        wkt = "LINESTRING({})".format(','.join(points))
-        self._locations = WKTElement(wkt, srid=4326)
+        return "LINESTRING({})".format(','.join(points))
 
 db.Index('traces_contest_idx',
          Trace.flight_id, Trace.contest_type, Trace.trace_type,
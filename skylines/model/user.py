@@ -3,6 +3,7 @@ import struct
 from datetime import datetime
 from hashlib import sha256
 
+from sqlalchemy import event, DDL
 from sqlalchemy.types import (
     Unicode, Integer, BigInteger, SmallInteger,
     DateTime, Boolean, Interval, String,
@@ -28,6 +29,7 @@ class User(db.Model):
 
     __tablename__ = 'users'
     __searchable_columns__ = ['name']
+    __typeahead_group_column__ = 'club_id'
 
     id = db.Column(Integer, autoincrement=True, primary_key=True)
 
@@ -82,6 +84,10 @@ class User(db.Model):
 
     admin = db.Column(Boolean, nullable=False, default=False)
 
+    # Number of unread notifications (NULL if it needs to be counted again)
+
+    unread_notifications = db.Column(Integer, default=0)
+
     ##############################
 
     def __init__(self, *args, **kw):
@@ -307,3 +313,12 @@ class User(db.Model):
 
 db.Index('users_lower_email_address_idx',
          db.func.lower(User.email_address), unique=True)
+
+# Trigram index for the search. The expression has to match the one of the
+# `name` property, which can't be expressed by db.Index() with an operator
+# class yet.
+event.listen(User.__table__, 'after_create', DDL(
+    "CREATE INDEX ix_users_name_trgm ON users USING gin "
+    "((CASE WHEN last_name IS NOT NULL "
+    "THEN first_name || ' ' || last_name "
+    "ELSE first_name END) gin_trgm_ops)").execute_if(dialect='postgresql'))
@@ -2,9 +2,11 @@ from __future__ import absolute_import
 from celery.utils.log import get_task_logger
 
 from skylines.lib.xcsoar_ import analysis
+from skylines.lib.trajectory import FlightTrajectory
 from skylines.worker.celery import celery
-from skylines.model import db, Flight
+from skylines.model import db, Flight, User, Notification
 from skylines.model.achievement import unlock_flight_achievements
+from skylines.model.event import filter_events
 
 logger = get_task_logger(__name__)
 
@@ -14,12 +16,29 @@ def analyse_flight(flight_id, full=2048, triangle=6144, sprint=512):
     logger.info("Analysing flight %d" % flight_id)
 
     flight = Flight.get(flight_id)
-    success = analysis.analyse_flight(flight, full, triangle, sprint)
+
+    # shared by the analysis and all achievement checks
+    trajectory = FlightTrajectory(flight)
+
+    success = analysis.analyse_flight(flight, full, triangle, sprint,
+                                      trajectory=trajectory)
 
     if not success:
         logger.warn("Analysis of flight %d failed." % flight_id)
         return
 
-    unlock_flight_achievements(flight)
+    unlock_flight_achievements(flight, trajectory)
+
+    db.session.commit()
+
+
+@celery.task
+def mark_notifications_read(recipient_id, **event_filter):
+    recipient = User.get(recipient_id)
+    if not recipient:
+        return
+
+    Notification.mark_all_read(recipient,
+                               filter_func=filter_events(**event_filter))
 
     db.session.commit()
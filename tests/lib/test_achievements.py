@@ -9,6 +9,7 @@ from shapely.geometry import LineString
 from skylines import model
 from skylines.lib import achievements, files
 from skylines.lib.xcsoar_ import analysis
+from skylines.model.pilot_stats import PilotStats
 
 
 HERE = os.path.dirname(__file__)
@@ -82,12 +83,13 @@ class TestFlightMetrics(object):
 
     def level_ground(self, elevation):
         # Patch get_elevations_for_flight to return constant ground elevation
-        from skylines.lib.xcsoar_ import flight_path
+        from skylines.lib import trajectory
+        from skylines.lib.igc import read_igc_fixes
 
-        def get_constant_elevation(flight):
-            path = flight_path(flight.igc_file)
-            return ((fix.seconds_of_day, elevation) for fix in path)
-        return mock.patch.object(achievements, "get_elevations_for_flight",
+        def get_constant_elevation(flight, midnight=None):
+            fixes = read_igc_fixes(flight.igc_file.path)
+            return ((time, elevation) for time in fixes['time'])
+        return mock.patch.object(trajectory, "get_elevations_for_flight",
                                  side_effect=get_constant_elevation)
 
     @staticmethod
@@ -141,7 +143,7 @@ class TestFlightMetrics(object):
 
 
 @pytest.mark.usefixtures("db")
-class TestPilotMetrics(object):
+class TestPilotStats(object):
     def setup(self):
         # Create a pilot
         self.pilot = model.User(first_name='Michael', last_name='Sommer')
@@ -175,7 +177,7 @@ class TestPilotMetrics(object):
 
     def test_total_distance(self):
         # When user has no flights, distance is 0 (not None)
-        c = achievements.PilotMetrics(self.pilot)
+        c = PilotStats.compute(self.pilot)
         assert c.total_distance == 0
 
         igc = self.create_sample_igc_file('f1.igc')
@@ -184,22 +186,22 @@ class TestPilotMetrics(object):
         model.db.session.add(flight)
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.total_distance == 89.999
 
         # Make sure users are not getting scores from other pilots
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.total_distance == 0
 
         # Copilots gets total distance counted too
         flight.co_pilot = self.follower
         model.db.session.flush()
 
-        c3 = achievements.PilotMetrics(self.follower)
+        c3 = PilotStats.compute(self.follower)
         assert c3.total_distance == 89.999
 
     def test_takeoff_airport_count(self):
-        c = achievements.PilotMetrics(self.pilot)
+        c = PilotStats.compute(self.pilot)
         assert c.takeoff_airport_count == 0
 
         ap1 = model.airport.Airport(name="Paluknys", country_code="LT")
@@ -235,14 +237,14 @@ class TestPilotMetrics(object):
 
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.takeoff_airport_count == 2
 
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.takeoff_airport_count == 1
 
     def test_takeoff_country_count(self):
-        c = achievements.PilotMetrics(self.pilot)
+        c = PilotStats.compute(self.pilot)
         assert c.takeoff_country_count == 0
 
         ap1 = model.airport.Airport(name="Paluknys", country_code="LT")
@@ -281,14 +283,14 @@ class TestPilotMetrics(object):
 
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.takeoff_airport_count == 2
 
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.takeoff_airport_count == 1
 
     def test_pic_hours(self):
-        c = achievements.PilotMetrics(self.pilot)
+        c = PilotStats.compute(self.pilot)
         assert c.pic_hours == 0
 
         igc1 = self.create_sample_igc_file('f1.igc')
@@ -299,10 +301,10 @@ class TestPilotMetrics(object):
 
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.pic_hours == 3.75
 
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.pic_hours == 0
 
     def test_copilot_hours(self):
@@ -322,14 +324,14 @@ class TestPilotMetrics(object):
 
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.copilot_hours == 0
 
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.copilot_hours == 8
 
     def test_model_count(self):
-        c = achievements.PilotMetrics(self.pilot)
+        c = PilotStats.compute(self.pilot)
         assert c.aircraft_model_count == 0
 
         pt1 = model.aircraft_model.AircraftModel(name="Jantar Std 3", kind=1)
@@ -364,8 +366,33 @@ class TestPilotMetrics(object):
 
         model.db.session.flush()
 
-        c1 = achievements.PilotMetrics(self.pilot)
+        c1 = PilotStats.compute(self.pilot)
         assert c1.aircraft_model_count == 2
 
-        c2 = achievements.PilotMetrics(self.follower)
+        c2 = PilotStats.compute(self.follower)
         assert c2.aircraft_model_count == 1
+
+    def test_created_with_user(self):
+        model.db.session.flush()
+
+        stats = PilotStats.get(self.pilot.id)
+        assert stats is not None
+        assert stats.tracks_uploaded == 0
+
+        PilotStats.increment(self.pilot.id, tracks_uploaded=1)
+        assert PilotStats.get(self.pilot.id).tracks_uploaded == 1
+
+    def test_remove_flight_comments(self):
+        igc = self.create_sample_igc_file('f1.igc')
+        flight = self.create_sample_flight(igc)
+        model.db.session.add(flight)
+
+        for text in [u'Nice flight!', u'Congratulations!']:
+            model.db.session.add(model.FlightComment(
+                user=self.follower, flight=flight, text=text))
+
+        model.db.session.flush()
+        PilotStats.increment(self.follower.id, comments_made=2)
+
+        PilotStats.remove_flight_comments([flight.id])
+        assert PilotStats.get(self.follower.id).comments_made == 0
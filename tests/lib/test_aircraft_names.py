@@ -0,0 +1,40 @@
+from skylines.lib.aircraft_names import AircraftNameIndex, levenshtein
+
+MODELS = [
+    (1, u'LS 8'),
+    (2, u'LS 8-18'),
+    (3, u'ASW 27'),
+    (4, u'ASW 28'),
+    (5, u'Discus 2b'),
+    (6, u'Discus CS'),
+    (7, u'Duo Discus'),
+]
+
+
+def test_levenshtein():
+    assert levenshtein('', '') == 0
+    assert levenshtein('abc', '') == 3
+    assert levenshtein('kitten', 'sitting') == 3
+    assert levenshtein('sitting', 'kitten') == 3
+
+
+def test_guess():
+    index = AircraftNameIndex(MODELS)
+
+    assert index.guess('LS8') == 1
+    assert index.guess('LS 8/18') == 2
+    assert index.guess('asw-27') == 3
+    assert index.guess('ASW28') == 4
+    assert index.guess('Discus2b') == 5
+    assert index.guess('Discus CS') == 6
+    assert index.guess('Duo') == 7
+
+
+def test_guess_no_match():
+    index = AircraftNameIndex(MODELS)
+
+    assert index.guess('') is None
+    assert index.guess('27') is None
+    assert index.guess('ASW 20') is None
+    assert index.guess('ASW28-18') is None
+    assert index.guess('Ventus') is None
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely.geometry import LineString
+
+from skylines import model
+from skylines.model import db, Flight, FlightPhase, Trace, Location
+from skylines.lib.xcsoar_ import analysis
+
+
+@pytest.mark.usefixtures("db")
+class TestSaveResults(object):
+    def setup(self):
+        self.pilot = model.User(first_name='Michael', last_name='Sommer')
+        db.session.add(self.pilot)
+
+        self.igc = model.IGCFile(filename='f.igc', md5='f', owner=self.pilot,
+                                 date_utc=datetime(2013, 7, 7, 13, 0))
+
+    def create_flight(self):
+        flight = Flight(igc_file=self.igc, pilot=self.pilot)
+        flight.timestamps = []
+        flight.locations = from_shape(LineString([(0, 0), (1, 1)]), srid=4326)
+        flight.takeoff_time = datetime(2013, 7, 7, 13, 0)
+        flight.landing_time = datetime(2013, 7, 7, 18, 0)
+        flight.date_local = date(2013, 7, 7)
+        return flight
+
+    def create_results(self):
+        phases = [
+            analysis.create_phase(
+                aggregate=False,
+                start_time=datetime(2013, 7, 7, 13, 0),
+                end_time=datetime(2013, 7, 7, 14, 0),
+                phase_type=FlightPhase.PT_CIRCLING,
+                duration=timedelta(hours=1),
+                count=1),
+            analysis.create_phase(
+                aggregate=True,
+                phase_type=FlightPhase.PT_CRUISE,
+                circling_direction=FlightPhase.CD_TOTAL,
+                duration=timedelta(hours=4),
+                count=3),
+        ]
+
+        traces = [dict(
+            contest_type='olc_plus',
+            trace_type='classic',
+            locations=[Location(latitude=0, longitude=0),
+                       Location(latitude=1, longitude=1)],
+            times=[datetime(2013, 7, 7, 13, 0), datetime(2013, 7, 7, 18, 0)],
+            duration=timedelta(hours=5),
+            distance=157000,
+        )]
+
+        return phases, traces
+
+    def test_new_flight(self):
+        # e.g. an upload, which analyses the flight before it is added
+        flight = self.create_flight()
+        analysis.save_results(*self.create_results(), flight=flight)
+
+        # the results are readable before the flight is inserted
+        assert flight.has_phases
+        assert len(flight.phases) == 1
+        assert len(flight.cruise_performance) == 1
+
+        db.session.add(flight)
+        assert not any(isinstance(obj, (FlightPhase, Trace))
+                       for obj in db.session.new)
+
+        db.session.flush()
+
+        assert FlightPhase.query(flight_id=flight.id).count() == 2
+        assert Trace.query(flight_id=flight.id).count() == 1
+
+        assert len(flight.phases) == 1
+        assert len(flight.traces) == 1
+
+    def test_existing_flight(self):
+        flight = self.create_flight()
+        db.session.add(flight)
+        db.session.flush()
+
+        phases, traces = self.create_results()
+        analysis.save_results(phases, traces, flight)
+        analysis.save_results(phases, traces, flight)
+
+        assert FlightPhase.query(flight_id=flight.id).count() == 2
+        assert Trace.query(flight_id=flight.id).count() == 1
+        assert len(flight.phases) == 1
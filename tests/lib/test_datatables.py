@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime
+
+from sqlalchemy.dialects import postgresql
+
+from skylines.lib.datatables import encode_cursor, decode_cursor, _seek_filter
+from skylines.model import Flight
+
+
+def test_cursor():
+    values = [date(2013, 6, 12), datetime(2013, 6, 12, 14, 30, 5, 123), 52.5,
+              None, u'Jörg', 1234]
+
+    cursor = encode_cursor(100, '0desc,2asc', values)
+    assert decode_cursor(cursor, 100, '0desc,2asc') == values
+
+
+def test_cursor_mismatch():
+    cursor = encode_cursor(100, '0desc', [date(2013, 6, 12), 1234])
+
+    assert decode_cursor(cursor, 150, '0desc') is None
+    assert decode_cursor(cursor, 100, '0asc') is None
+    assert decode_cursor(None, 100, '0desc') is None
+    assert decode_cursor('invalid', 100, '0desc') is None
+
+
+def test_seek_filter():
+    columns = [(Flight.date_local, True), (Flight.id, False)]
+    clause = _seek_filter(columns, [date(2013, 6, 12), 1234])
+
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert sql == ('flights.date_local < %(date_local_1)s OR '
+                   'flights.date_local = %(date_local_2)s AND '
+                   'flights.id > %(id_1)s')
+
+
+def test_seek_filter_null():
+    columns = [(Flight.olc_classic_distance, False), (Flight.id, False)]
+    clause = _seek_filter(columns, [None, 1234])
+
+    sql = str(clause.compile(dialect=postgresql.dialect()))
+    assert sql == ('flights.olc_classic_distance IS NULL AND '
+                   'flights.id > %(id_1)s')
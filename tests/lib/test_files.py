@@ -0,0 +1,137 @@
+import os
+import gzip
+import shutil
+import time
+import tempfile
+from StringIO import StringIO
+
+import mock
+import pytest
+
+from skylines.lib import files
+
+
+@pytest.fixture
+def root(request):
+    path = tempfile.mkdtemp()
+    request.addfinalizer(lambda: shutil.rmtree(path))
+
+    app_mock = mock.Mock()
+    app_mock.config = {
+        'SKYLINES_FILES_PATH': os.path.join(path, 'files'),
+        'SKYLINES_TEMPORARY_DIR': os.path.join(path, 'tmp'),
+    }
+    os.mkdir(app_mock.config['SKYLINES_FILES_PATH'])
+    patcher = mock.patch.object(files, 'current_app', app_mock)
+    patcher.start()
+    request.addfinalizer(patcher.stop)
+
+    return app_mock.config['SKYLINES_FILES_PATH']
+
+
+def test_key_to_path():
+    assert files.key_to_path('0123456789abcdef0123456789abcdef', '/igc') == \
+        '/igc/01/23/0123456789abcdef0123456789abcdef.igc'
+
+
+def test_add_file(root):
+    key = files.add_file(StringIO('foo'))
+    assert key == 'acbd18db4cc2f85cedef654fccc4a4d8'
+
+    path = os.path.join(root, 'ac', 'bd', key + '.igc')
+    assert files.find_file(key) == path
+    assert open(path).read() == 'foo'
+
+    # the file gets the default mode instead of the one of the temporary file
+    assert os.stat(path).st_mode & 0777 == 0666 & ~files._umask
+
+    # storing the same content again keeps a single file
+    assert files.add_file(StringIO('foo')) == key
+    assert os.listdir(root) == ['ac']
+
+    files.delete_file(key)
+    assert not os.path.exists(path)
+
+
+def test_find_legacy_file(root):
+    key = 'acbd18db4cc2f85cedef654fccc4a4d8'
+    legacy_path = os.path.join(root, 'foo.igc')
+    with open(legacy_path, 'w') as f:
+        f.write('foo')
+
+    assert files.find_file(key, 'foo.igc') == legacy_path
+    assert files.find_file(key, 'bar.igc') == files.key_to_path(key)
+
+    files.delete_file(key, 'foo.igc')
+    assert not os.path.exists(legacy_path)
+
+
+def test_compressed_file(root):
+    with mock.patch.dict(files.current_app.config,
+                         SKYLINES_FILES_COMPRESSION='gzip'):
+        key = files.add_file(StringIO('foo'))
+
+    assert key == 'acbd18db4cc2f85cedef654fccc4a4d8'
+
+    path = os.path.join(root, 'ac', 'bd', key + '.igc.gz')
+    assert files.find_file(key) == path
+    assert gzip.open(path).read() == 'foo'
+
+    with files.open_file(key) as f:
+        assert f.read() == 'foo'
+
+    local_path = files.local_file(key)
+    assert not files.is_compressed(local_path)
+    assert open(local_path).read() == 'foo'
+    assert files.local_file(key) == local_path
+
+    # an uncompressed upload of the same content is not stored again
+    assert files.add_file(StringIO('foo')) == key
+    assert not os.path.exists(files.key_to_path(key))
+
+    files.delete_file(key)
+    assert not os.path.exists(path)
+    assert not os.path.exists(local_path)
+
+
+def test_temporary_file(root):
+    path, key = files.write_temporary_file(StringIO('foo'))
+    assert key == 'acbd18db4cc2f85cedef654fccc4a4d8'
+    assert os.path.dirname(path) == root
+    assert open(path).read() == 'foo'
+
+    files.store_temporary_file(path, key)
+    assert not os.path.exists(path)
+    assert open(files.find_file(key)).read() == 'foo'
+
+    path, key = files.write_temporary_file(StringIO('bar'))
+    files.delete_temporary_file(path)
+    assert not os.path.exists(path)
+    assert not os.path.exists(files.find_file(key))
+
+
+def test_clean_cache(root):
+    with mock.patch.dict(files.current_app.config,
+                         SKYLINES_FILES_COMPRESSION='gzip'):
+        keys = [files.add_file(StringIO(data)) for data in ['foo', 'bar']]
+
+    paths = [files.local_file(key) for key in keys]
+
+    # recently used copies are kept
+    with mock.patch.dict(files.current_app.config,
+                         SKYLINES_FILES_CACHE_SIZE=0):
+        files.clean_cache()
+
+    assert all(os.path.exists(path) for path in paths)
+
+    # the least recently used copy is removed first
+    now = time.time()
+    os.utime(paths[0], (now - 7200, now - 7200))
+    os.utime(paths[1], (now - 3600, now - 3600))
+
+    with mock.patch.dict(files.current_app.config,
+                         SKYLINES_FILES_CACHE_SIZE=3):
+        files.clean_cache()
+
+    assert not os.path.exists(paths[0])
+    assert os.path.exists(paths[1])
@@ -0,0 +1,16 @@
+from skylines.lib.geo import get_tile
+
+
+def test_get_tile():
+    assert get_tile(0, 0, 0) == (0, 0)
+    assert get_tile(0.1, 0.1, 1) == (1, 0)
+    assert get_tile(-0.1, -0.1, 1) == (0, 1)
+
+    # Aachen
+    assert get_tile(50.7753, 6.0839, 8) == (132, 85)
+    assert get_tile(50.7753, 6.0839, 12) == (2117, 1375)
+
+
+def test_get_tile_limits():
+    assert get_tile(90, 180, 2) == (3, 0)
+    assert get_tile(-90, -180, 2) == (0, 3)
@@ -1,9 +1,13 @@
 # -*- coding: utf-8 -*-
 
+import os
 import pytest
 
 import datetime
-from skylines.lib.igc import read_igc_headers
+from skylines.lib.igc import read_igc_headers, read_igc_fixes
+
+HERE = os.path.dirname(__file__)
+DATADIR = os.path.join(HERE, '..', 'data')
 
 
 def test_empty_file():
@@ -68,5 +72,65 @@ def test_glider_information():
     assert headers['cid'] == 'TH'
 
 
+def test_fixes_empty_file():
+    fixes = read_igc_fixes([])
+    assert len(fixes) == 0
+
+
+def test_fixes_missing_file():
+    assert read_igc_fixes(os.path.join(DATADIR, 'missing.igc')) is None
+
+
+def test_fixes():
+    fixes = read_igc_fixes([
+        'AFLA6NG',
+        'HFDTE150812',
+        'B1101355206343N00006198WA0058700558',
+        'B1101455206259S00006295EV-005800559',
+        'B110155broken',
+    ])
+
+    assert len(fixes) == 2
+
+    assert fixes['time'].tolist() == [39695, 39705]
+    assert abs(fixes['latitude'][0] - 52.105717) < 1e-6
+    assert abs(fixes['longitude'][0] + 0.103300) < 1e-6
+    assert abs(fixes['latitude'][1] + 52.104317) < 1e-6
+    assert abs(fixes['longitude'][1] - 0.104917) < 1e-6
+    assert fixes['valid'].tolist() == [True, False]
+    assert fixes['pressure_altitude'].tolist() == [587, -58]
+    assert fixes['gps_altitude'].tolist() == [558, 559]
+
+
+def test_fixes_extensions():
+    fixes = read_igc_fixes([
+        'I023638ENL3940SIU',
+        'B1101355206343N00006198WA0058700558123',
+        'B1101455206259N00006295WA0058000559  ',
+    ])
+
+    assert fixes.dtype.names[-2:] == ('enl', 'siu')
+    assert fixes['enl'].tolist() == [123, 0]
+    assert fixes['siu'].tolist() == [0, 0]
+
+
+def test_fixes_midnight_rollover():
+    fixes = read_igc_fixes([
+        'B2359555206343N00006198WA0058700558',
+        'B0000055206259N00006295WA0058000559',
+    ])
+
+    assert fixes['time'].tolist() == [86395, 86405]
+
+
+def test_fixes_file():
+    fixes = read_igc_fixes(os.path.join(DATADIR, 'simple.igc'))
+
+    assert len(fixes) == 94
+    assert fixes.dtype.names[-2:] == ('fxa', 'siu')
+    assert fixes['time'][0] == 9 * 3600 + 7 * 60 + 49
+    assert fixes['gps_altitude'][0] == 141
+
+
 if __name__ == "__main__":
     pytest.main(__file__)
@@ -0,0 +1,25 @@
+from datetime import date, datetime
+
+import mock
+
+from skylines.lib.trajectory import FlightTrajectory
+
+
+def test_to_seconds():
+    flight = mock.Mock(igc_file=mock.Mock(date_utc=date(2013, 7, 7)))
+    trajectory = FlightTrajectory(flight)
+
+    assert trajectory.to_seconds(datetime(2013, 7, 7, 13, 30)) == 48600
+
+    # keeps counting after midnight, like the times of the fixes
+    assert trajectory.to_seconds(datetime(2013, 7, 8, 0, 30)) == 88200
+
+
+def test_to_seconds_without_igc_file():
+    flight = mock.Mock(igc_file=None,
+                       takeoff_time=datetime(2013, 7, 7, 23, 0))
+    trajectory = FlightTrajectory(flight)
+
+    assert trajectory.local_path is None
+    assert trajectory.to_seconds(datetime(2013, 7, 8, 1, 0)) == 90000
+    assert len(trajectory.times) == 0
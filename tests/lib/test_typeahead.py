@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+from skylines.lib.typeahead import PrefixIndex, normalise
+
+USERS = [
+    (1, u'Michael Sommer', 10, u'Michael Sommer'),
+    (2, u'Max Kellermann', 10, u'Max Kellermann'),
+    (3, u'Tobias Bieniek', 20, u'Tobias Bieniek'),
+    (4, u'Jörg Müller', None, u'Jörg Müller'),
+    (5, u'Aachen Merzbrück', None, u'Aachen Merzbrück EDKA'),
+]
+
+
+def test_normalise():
+    assert normalise(u'Jörg Müller') == [u'jorg', u'muller']
+    assert normalise('J\xc3\xb6rg') == [u'jorg']
+    assert normalise(u'  LS-8/18 ') == [u'ls', u'8', u'18']
+    assert normalise(u'') == []
+
+
+def test_lookup():
+    index = PrefixIndex(USERS)
+    assert len(index) == 5
+
+    assert index.lookup('m') == [
+        (2, u'Max Kellermann'), (5, u'Aachen Merzbrück'),
+        (1, u'Michael Sommer'), (4, u'Jörg Müller')]
+
+    assert index.lookup('som') == [(1, u'Michael Sommer')]
+    assert index.lookup('SOMMER') == [(1, u'Michael Sommer')]
+    assert index.lookup('mic som') == [(1, u'Michael Sommer')]
+    assert index.lookup('mic kel') == []
+    assert index.lookup('muller') == [(4, u'Jörg Müller')]
+    assert index.lookup(u'Mül') == [(4, u'Jörg Müller')]
+    assert index.lookup('edka') == [(5, u'Aachen Merzbrück')]
+    assert index.lookup('xyz') == []
+    assert index.lookup('') == []
+
+
+def test_lookup_limit():
+    index = PrefixIndex(USERS)
+
+    assert index.lookup('m', limit=2) == [
+        (2, u'Max Kellermann'), (5, u'Aachen Merzbrück')]
+
+
+def test_lookup_group():
+    index = PrefixIndex(USERS)
+
+    assert index.lookup('m', group=10) == [
+        (2, u'Max Kellermann'), (1, u'Michael Sommer')]
+    assert index.lookup('m', group=20) == []
+    assert index.lookup('tob', group=20) == [(3, u'Tobias Bieniek')]
+    assert index.lookup('m', group=30) == []
@@ -119,7 +119,7 @@ class TestAchievements(object):
         assert event2.achievement.time_achieved == datetime(2013, 7, 6, 17, 0)
 
     def test_user_upload_achievements(self):
-        from skylines.lib.achievements import PilotMetrics
+        from skylines.model.pilot_stats import PilotStats
 
         # Create two flights
         igc1 = self.create_sample_igc_file('f1.igc')
@@ -133,33 +133,33 @@ class TestAchievements(object):
         db.session.add(flight2)
         db.session.flush()
 
-        sadc = PilotMetrics(self.pilot)
+        sadc = PilotStats.compute(self.pilot)
         assert sadc.tracks_uploaded == 2
 
     def test_users_followed(self):
-        from skylines.lib.achievements import PilotMetrics
+        from skylines.model.pilot_stats import PilotStats
 
         db.session.flush()
 
-        sadc_pilot = PilotMetrics(self.pilot)
-        sadc_follower = PilotMetrics(self.follower)
+        sadc_pilot = PilotStats.compute(self.pilot)
+        sadc_follower = PilotStats.compute(self.follower)
 
         assert sadc_pilot.users_followed == 0
         assert sadc_follower.users_followed == 1
 
     def test_followers_attracted(self):
-        from skylines.lib.achievements import PilotMetrics
+        from skylines.model.pilot_stats import PilotStats
 
         db.session.flush()
 
-        sadc_pilot = PilotMetrics(self.pilot)
-        sadc_follower = PilotMetrics(self.follower)
+        sadc_pilot = PilotStats.compute(self.pilot)
+        sadc_follower = PilotStats.compute(self.follower)
 
         assert sadc_pilot.followers_attracted == 1
         assert sadc_follower.followers_attracted == 0
 
     def test_comments_made(self):
-        from skylines.lib.achievements import PilotMetrics
+        from skylines.model.pilot_stats import PilotStats
         from skylines.model.flight_comment import FlightComment
 
         # Create flight
@@ -171,8 +171,34 @@ class TestAchievements(object):
         FlightComment(user=self.pilot, flight=flight1, text='Nice flight!')
         db.session.flush()
 
-        sadc_pilot = PilotMetrics(self.pilot)
-        sadc_follower = PilotMetrics(self.follower)
+        sadc_pilot = PilotStats.compute(self.pilot)
+        sadc_follower = PilotStats.compute(self.follower)
 
         assert sadc_pilot.comments_made == 1
         assert sadc_follower.comments_made == 0
+
+    def test_insert_unlocked_achievements(self):
+        from skylines.model.achievement import insert_unlocked_achievements
+        igc = self.create_sample_igc_file('f1.igc')
+        flight = self.create_sample_flight(igc)
+        db.session.add(flight)
+        db.session.flush()
+
+        insert_unlocked_achievements(
+            [(self.pilot.id, 'duration-3', flight.id, flight.landing_time),
+             (self.pilot.id, 'upload-1', None, datetime(2013, 7, 8))])
+
+        assert ([(a.name, a.flight_id) for a in model.UnlockedAchievement
+                 .query(pilot_id=self.pilot.id)
+                 .order_by(model.UnlockedAchievement.name)] ==
+                [('duration-3', flight.id), ('upload-1', None)])
+
+        events = list(model.Event.query().order_by(model.Event.time))
+        assert ([(e.type, e.actor_id, e.flight_id, e.time) for e in events] ==
+                [(model.Event.Type.ACHIEVEMENT, self.pilot.id, flight.id,
+                  datetime(2013, 7, 7, 18, 0)),
+                 (model.Event.Type.ACHIEVEMENT, self.pilot.id, None,
+                  datetime(2013, 7, 8))])
+
+        assert model.Notification.count_unread(self.pilot) == 2
+        assert model.Notification.count_unread(self.follower) == 2
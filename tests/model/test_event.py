@@ -0,0 +1,103 @@
+from datetime import date, datetime
+
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely.geometry import LineString
+
+from skylines import model
+from skylines.model import db
+from skylines.model.event import (
+    create_flight_notifications, create_club_join_event, filter_events
+)
+
+
+@pytest.mark.usefixtures("db")
+class TestNotifications(object):
+    def setup(self):
+        self.club = model.Club(name=u'LV Aachen')
+        self.pilot = model.User(first_name='Michael', last_name='Sommer')
+        self.member = model.User(first_name='Max', last_name='Kellermann',
+                                 club=self.club)
+        self.followers = [model.User(first_name='Follower', last_name=str(i))
+                          for i in range(3)]
+
+        db.session.add_all([self.club, self.pilot, self.member] +
+                           self.followers)
+        db.session.flush()
+
+        for follower in self.followers + [self.member]:
+            model.Follower.follow(follower, self.pilot)
+
+    def create_flight(self):
+        igc = model.IGCFile(filename='f.igc', md5='f', owner=self.pilot,
+                            date_utc=datetime(2013, 7, 7, 13, 0))
+
+        flight = model.Flight(igc_file=igc, pilot=self.pilot,
+                              co_pilot=self.member)
+        flight.timestamps = []
+        flight.locations = from_shape(LineString([(0, 0), (1, 1)]), srid=4326)
+        flight.takeoff_time = datetime(2013, 7, 7, 13, 0)
+        flight.landing_time = datetime(2013, 7, 7, 18, 0)
+        flight.date_local = date(2013, 7, 7)
+        db.session.add(flight)
+        db.session.flush()
+        return flight
+
+    def test_flight_notifications(self):
+        create_flight_notifications(self.create_flight())
+
+        for follower in self.followers:
+            assert model.Notification.count_unread(follower) == 1
+
+        # the co-pilot follows the pilot, but is not notified
+        assert model.Notification.count_unread(self.pilot) == 0
+        assert model.Notification.count_unread(self.member) == 0
+
+    def test_club_join_notifications(self):
+        self.pilot.club = self.club
+        db.session.flush()
+
+        create_club_join_event(self.club, self.pilot)
+
+        for follower in self.followers:
+            assert model.Notification.count_unread(follower) == 1
+
+        # the member follows the pilot, but is notified only once
+        assert model.Notification.count_unread(self.member) == 1
+        assert model.Notification.count_unread(self.pilot) == 1
+
+    def test_unread_counts(self):
+        flight = self.create_flight()
+        create_flight_notifications(flight)
+
+        follower = self.followers[0]
+        notification = model.Notification.query(recipient=follower).one()
+        notification.mark_read()
+        db.session.flush()
+
+        assert model.Notification.count_unread(follower) == 0
+        assert model.Notification.count_unread(self.followers[1]) == 1
+
+        model.Notification.mark_all_read(self.followers[1])
+        assert model.Notification.count_unread(self.followers[1]) == 0
+
+        # the counters of the other recipients are counted again
+        model.Notification.invalidate_unread_counts(
+            model.Event.flight_id == flight.id)
+        assert db.session.query(model.User.unread_notifications) \
+            .filter_by(id=self.followers[2].id).scalar() is None
+        assert model.Notification.count_unread(self.followers[2]) == 1
+
+    def test_has_unread(self):
+        flight = self.create_flight()
+        create_flight_notifications(flight)
+
+        follower = self.followers[0]
+        assert model.Notification.has_unread(
+            follower, filter_func=filter_events(flight_id=flight.id))
+        assert not model.Notification.has_unread(
+            follower, filter_func=filter_events(actor_id=self.member.id))
+
+        model.Notification.mark_all_read(
+            follower, filter_func=filter_events(flight_id=flight.id))
+        assert not model.Notification.has_unread(follower)
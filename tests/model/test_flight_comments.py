@@ -0,0 +1,61 @@
+from datetime import date, datetime
+
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely.geometry import LineString
+
+from skylines import model
+from skylines.model import db
+
+
+@pytest.mark.usefixtures("db")
+class TestNumComments(object):
+    def setup(self):
+        self.pilot = model.User(first_name='Michael', last_name='Sommer')
+        db.session.add(self.pilot)
+
+        igc = model.IGCFile(filename='f.igc', md5='f', owner=self.pilot,
+                            date_utc=datetime(2013, 7, 7, 13, 0))
+
+        self.flight = model.Flight(igc_file=igc, pilot=self.pilot)
+        self.flight.timestamps = []
+        self.flight.locations = \
+            from_shape(LineString([(0, 0), (1, 1)]), srid=4326)
+        self.flight.takeoff_time = datetime(2013, 7, 7, 13, 0)
+        self.flight.landing_time = datetime(2013, 7, 7, 18, 0)
+        self.flight.date_local = date(2013, 7, 7)
+        db.session.add(self.flight)
+        db.session.flush()
+
+    def add_comment(self, text):
+        comment = model.FlightComment(user=self.pilot, flight=self.flight,
+                                      text=text)
+        db.session.add(comment)
+        db.session.flush()
+        return comment
+
+    def num_comments(self):
+        return db.session.query(model.Flight.num_comments) \
+            .filter_by(id=self.flight.id).scalar()
+
+    def test_add_and_delete(self):
+        assert self.num_comments() == 0
+
+        comment = self.add_comment(u'Nice flight!')
+        self.add_comment(u'Thanks!')
+        assert self.num_comments() == 2
+
+        db.session.delete(comment)
+        db.session.flush()
+        assert self.num_comments() == 1
+
+    def test_update_num_comments(self):
+        self.add_comment(u'Nice flight!')
+
+        model.Flight.query(id=self.flight.id) \
+            .update(dict(num_comments=5), synchronize_session=False)
+
+        assert model.Flight.update_num_comments() == 1
+        assert self.num_comments() == 1
+
+        assert model.Flight.update_num_comments() == 0
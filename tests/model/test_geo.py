@@ -48,3 +48,35 @@ class TestBounds():
         assert b.get_width() == 25
         assert b.get_height() == 0
         assert b.get_size() == 0
+
+    def test_quantize(self):
+        b = Bounds.from_bbox_string('6.05,49.52,7.01,51.0').quantize(0.1)
+
+        assert abs(b.southwest.latitude - 49.5) < 1e-9
+        assert abs(b.southwest.longitude - 6.0) < 1e-9
+        assert abs(b.northeast.latitude - 51.0) < 1e-9
+        assert abs(b.northeast.longitude - 7.1) < 1e-9
+
+        # Check that the latitudes stay within the valid range
+        b = Bounds.from_bbox_string('1,-89.99,2,89.99').quantize(0.5)
+
+        assert b.southwest.latitude == -90
+        assert b.northeast.latitude == 90
+
+
+class TestLocation():
+    def test_quantize(self):
+        location = Location(latitude=51.23456, longitude=-6.78949) \
+            .quantize(0.001)
+
+        assert abs(location.latitude - 51.235) < 1e-9
+        assert abs(location.longitude + 6.789) < 1e-9
+
+    def test_make_multipoint(self):
+        points = Location.make_multipoint([
+            Location(latitude=50.5, longitude=6.5),
+            Location(latitude=-33, longitude=151.25),
+        ])
+
+        assert points.desc == 'MULTIPOINT((6.5 50.5), (151.25 -33))'
+        assert points.srid == 4326
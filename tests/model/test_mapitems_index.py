@@ -0,0 +1,54 @@
+from collections import namedtuple
+
+from geoalchemy2.shape import from_shape
+from shapely.geometry import Point, box
+
+from skylines.model import Airspace, MountainWaveProject, Location
+from skylines.model.airspace import AirspaceIndex
+from skylines.model.mountain_wave_project import WaveIndex
+
+
+def test_airspace_lookup():
+    ctr = Airspace(name=u'CTR', the_geom=from_shape(box(6, 50, 7, 51)))
+    tma = Airspace(name=u'TMA', the_geom=from_shape(box(5, 49, 8, 52)))
+    empty = Airspace(name=u'Empty', the_geom=None)
+
+    index = AirspaceIndex([ctr, tma, empty])
+
+    assert index.lookup(Location(latitude=50.5, longitude=6.5)) == [ctr, tma]
+    assert index.lookup(Location(latitude=49.5, longitude=5.5)) == [tma]
+    assert index.lookup(Location(latitude=40.0, longitude=-74.0)) == []
+
+
+def test_wave_lookup():
+    wave = MountainWaveProject(name=u'Wave',
+                               location=from_shape(Point(6.0, 50.0)))
+    index = WaveIndex([wave, MountainWaveProject(name=u'Empty')])
+
+    # about 3.6 km and 7.1 km to the east
+    assert index.lookup(Location(latitude=50.0, longitude=6.05)) == [wave]
+    assert index.lookup(Location(latitude=50.0, longitude=6.1)) == []
+
+
+def test_lookup_rows():
+    # load_index() passes plain rows instead of model objects
+    Row = namedtuple('Row', ['id', 'name', 'the_geom'])
+    ctr = Row(1, u'CTR', from_shape(box(6, 50, 7, 51)))
+
+    index = AirspaceIndex([ctr])
+
+    assert index.lookup(Location(latitude=50.5, longitude=6.5)) == [ctr]
+
+
+def test_by_locations(monkeypatch):
+    from skylines.model import airspace
+
+    ctr = Airspace(name=u'CTR', the_geom=from_shape(box(6, 50, 7, 51)))
+    monkeypatch.setattr(airspace, '_index', AirspaceIndex([ctr]))
+
+    assert Airspace.by_locations([]) == []
+    assert Airspace.by_locations([
+        Location(latitude=50.5, longitude=6.5),
+        Location(latitude=40.0, longitude=-74.0),
+        Location(latitude=50.2, longitude=6.8),
+    ]) == [[ctr], [], [ctr]]
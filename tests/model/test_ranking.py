@@ -0,0 +1,89 @@
+from datetime import date, datetime
+
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely.geometry import LineString
+
+from skylines import model
+from skylines.model import db, RankingScore
+
+PILOT = RankingScore.EntityType.PILOT
+CLUB = RankingScore.EntityType.CLUB
+ALL_TIME = RankingScore.ALL_TIME
+
+
+def test_keys_for_flight():
+    flight = model.Flight(pilot_id=1, club_id=2, date_local=date(2013, 7, 7))
+
+    assert RankingScore.keys_for_flight(flight) == set([
+        (PILOT, 1, ALL_TIME), (PILOT, 1, 2013),
+        (CLUB, 2, ALL_TIME), (CLUB, 2, 2013),
+    ])
+
+
+@pytest.mark.usefixtures("db")
+class TestRankingScore(object):
+    def setup(self):
+        self.pilot = model.User(first_name='Michael', last_name='Sommer')
+        db.session.add(self.pilot)
+
+    def create_flight(self, fname, date_local, score):
+        igc = model.IGCFile(filename=fname, md5=str(hash(fname)),
+                            owner=self.pilot,
+                            date_utc=datetime(2013, 7, 7, 13, 0))
+
+        flight = model.Flight(igc_file=igc, pilot=self.pilot)
+        flight.timestamps = []
+        flight.locations = from_shape(LineString([(0, 0), (1, 1)]), srid=4326)
+        flight.takeoff_time = datetime(2013, 7, 7, 13, 0)
+        flight.landing_time = datetime(2013, 7, 7, 18, 0)
+        flight.date_local = date_local
+        flight.olc_plus_score = score
+        db.session.add(flight)
+        db.session.flush()
+        return flight
+
+    def scores(self):
+        return dict((score.year, (score.count, score.total))
+                    for score in RankingScore.query(entity_type=PILOT,
+                                                    entity_id=self.pilot.id))
+
+    def test_update(self):
+        flight1 = self.create_flight('f1.igc', date(2012, 7, 7), 100)
+        flight2 = self.create_flight('f2.igc', date(2013, 7, 7), 50)
+
+        RankingScore.update(new_scores=[
+            RankingScore.scores_for_flight(flight1),
+            RankingScore.scores_for_flight(flight2)])
+
+        assert self.scores() == {ALL_TIME: (2, 150), 2012: (1, 100),
+                                 2013: (1, 50)}
+
+        scores = RankingScore.scores_for_flight(flight2)
+        flight2.olc_plus_score = 80
+        RankingScore.update([scores],
+                            [RankingScore.scores_for_flight(flight2)])
+
+        assert self.scores() == {ALL_TIME: (2, 180), 2012: (1, 100),
+                                 2013: (1, 80)}
+
+        scores = RankingScore.scores_for_flight(flight1)
+        db.session.delete(flight1)
+        RankingScore.update([scores])
+
+        assert self.scores() == {ALL_TIME: (1, 80), 2013: (1, 80)}
+
+    def test_recompute(self):
+        flight = self.create_flight('f1.igc', date(2012, 7, 7), 100)
+
+        RankingScore.recompute(RankingScore.keys_for_flight(flight))
+
+        assert self.scores() == {ALL_TIME: (1, 100), 2012: (1, 100)}
+
+    def test_rebuild(self):
+        self.create_flight('f1.igc', date(2012, 7, 7), 100)
+        self.create_flight('f2.igc', date(2012, 8, 7), 50)
+
+        RankingScore.rebuild()
+
+        assert self.scores() == {ALL_TIME: (2, 150), 2012: (2, 150)}
@@ -1,8 +1,10 @@
+import time
+
 import pytest
 
-from skylines.model import User, Club, Airport
+from skylines.model import User, Club, Airport, search as search_module
 from skylines.model.search import (
-    combined_search_query, escape_tokens, text_to_tokens
+    combined_search_query, escape_tokens, text_to_tokens, typeahead
 )
 
 MODELS = [User, Club, Airport]
@@ -49,3 +51,26 @@ class TestSearch:
         assert search('exa*er').count() == 2
         assert search('exp*er').count() == 0
         assert search('xyz').count() == 0
+
+        # empty tokens don't match everything
+        assert search('""').count() == 0
+        assert search('"  "').count() == 0
+
+    def test_typeahead(self):
+        def names(text):
+            results = typeahead(MODELS, text)
+            return [(model, name) for model, id, name in results]
+
+        search_module._typeahead_indexes.clear()
+
+        # the database is searched until the index has been built
+        assert names('manager') == [('User', 'Example Manager')]
+
+        for i in range(50):
+            if User in search_module._typeahead_indexes:
+                break
+            time.sleep(0.1)
+
+        assert User in search_module._typeahead_indexes
+        assert names('ex us') == [('User', 'Example User')]
+        assert names('') == []
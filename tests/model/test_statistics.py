@@ -0,0 +1,84 @@
+from datetime import date, datetime, timedelta
+
+import pytest
+from geoalchemy2.shape import from_shape
+from shapely.geometry import LineString
+
+from skylines import model
+from skylines.model import db, FlightStatistics, YearStatistics
+
+
+def test_key_for_flight():
+    flight = model.Flight(pilot_id=1, date_local=date(2013, 7, 7))
+    assert FlightStatistics.key_for_flight(flight) == (2013, 1, 0, 0)
+
+    flight = model.Flight(pilot_id=1)
+    assert FlightStatistics.key_for_flight(flight) is None
+
+
+@pytest.mark.usefixtures("db")
+class TestFlightStatistics(object):
+    def setup(self):
+        self.pilot = model.User(first_name='Michael', last_name='Sommer')
+        db.session.add(self.pilot)
+
+        self.other = model.User(first_name='Sebastian', last_name='Kawa')
+        db.session.add(self.other)
+
+    def create_flight(self, fname, pilot, date_local, distance):
+        igc = model.IGCFile(filename=fname, md5=str(hash(fname)),
+                            owner=pilot,
+                            date_utc=datetime(2013, 7, 7, 13, 0))
+
+        flight = model.Flight(igc_file=igc, pilot=pilot)
+        flight.timestamps = []
+        flight.locations = from_shape(LineString([(0, 0), (1, 1)]), srid=4326)
+        flight.takeoff_time = datetime(2013, 7, 7, 13, 0)
+        flight.landing_time = datetime(2013, 7, 7, 15, 0)
+        flight.date_local = date_local
+        flight.olc_classic_distance = distance
+        db.session.add(flight)
+        db.session.flush()
+        return flight
+
+    def years(self):
+        return [tuple(row) for row in YearStatistics.by_year()]
+
+    def test_update(self):
+        flights = [
+            self.create_flight('f1.igc', self.pilot, date(2013, 7, 7), 100),
+            self.create_flight('f2.igc', self.pilot, date(2013, 8, 7), 200),
+            self.create_flight('f3.igc', self.other, date(2013, 8, 7), 300),
+        ]
+
+        FlightStatistics.update(
+            FlightStatistics.key_for_flight(flight) for flight in flights)
+
+        assert self.years() == [(2013, 3, 2, 600, 3 * 7200)]
+
+        key = FlightStatistics.key_for_flight(flights[2])
+        db.session.delete(flights[2])
+        FlightStatistics.update([key])
+
+        assert self.years() == [(2013, 2, 1, 300, 2 * 7200)]
+
+        row = FlightStatistics.by_year(pilot_id=self.pilot.id).one()
+        assert (row.flights, row.pilots, row.distance) == (2, 1, 300)
+        assert timedelta(seconds=int(row.duration)) == timedelta(hours=4)
+
+        keys = [FlightStatistics.key_for_flight(flight)
+                for flight in flights[:2]]
+        db.session.delete(flights[0])
+        db.session.delete(flights[1])
+        FlightStatistics.update(keys)
+
+        assert self.years() == []
+
+    def test_rebuild(self):
+        self.create_flight('f1.igc', self.pilot, date(2012, 7, 7), 100)
+        self.create_flight('f2.igc', self.other, date(2013, 8, 7), 200)
+
+        FlightStatistics.rebuild()
+
+        assert self.years() == [(2013, 1, 1, 200, 7200),
+                                (2012, 1, 1, 100, 7200)]
@@ -0,0 +1,19 @@
+from geoalchemy2.shape import from_shape
+from shapely.geometry import MultiPolygon, box
+
+from skylines.model import Location
+from skylines.model.timezone import TimeZoneIndex
+
+
+def test_index_lookup():
+    index = TimeZoneIndex([
+        ('Europe/Berlin', from_shape(MultiPolygon([box(6, 47, 15, 55)]))),
+        ('Europe/Paris', from_shape(MultiPolygon([box(-5, 42, 6, 51)]))),
+        ('Europe/Zurich', None),
+    ])
+
+    assert index.lookup(Location(latitude=50.9, longitude=7.1)) == \
+        'Europe/Berlin'
+    assert index.lookup(Location(latitude=48.8, longitude=2.3)) == \
+        'Europe/Paris'
+    assert index.lookup(Location(latitude=40.0, longitude=-74.0)) is None